@@ -0,0 +1,258 @@
+# answer_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from collection_version import read_collection_version
+from config import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ANSWER_CACHE_TTL_SECONDS,
+    CHROMA_PERSIST_DIRECTORY,
+)
+
+# Initial rows of the in-memory embedding matrix; it doubles when full
+_INITIAL_CAPACITY = 64
+
+
+class SemanticAnswerCache:
+    """
+    Stores pipeline results (answer, contexts, metadata) keyed by the
+    embedding of the question that produced them.
+
+    Entries live in SQLite; their normalized embeddings are also kept in an
+    in-memory NumPy matrix, so a lookup is a single matrix-vector product.
+    Entries are scoped by namespace, a key built from the settings of the
+    pipeline that produced them (see pipeline.pipeline_namespace), so
+    pipelines with another collection, embedding model, LLM or k can share
+    the file but never each other's answers. A namespace's entries are
+    dropped when its collection version changes, i.e. whenever ingestion
+    writes to that collection.
+    """
+
+    def __init__(self, path: str = ANSWER_CACHE_PATH,
+                 threshold: float = ANSWER_CACHE_SIMILARITY_THRESHOLD,
+                 ttl_seconds: float | None = ANSWER_CACHE_TTL_SECONDS,
+                 max_entries: int | None = ANSWER_CACHE_MAX_ENTRIES,
+                 persist_directory: str = CHROMA_PERSIST_DIRECTORY,
+                 namespace: str = ""):
+        """
+        Args:
+            max_entries: Maximum number of answers kept in this namespace.
+            namespace: The scope of this cache's entries within the file.
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.persist_directory = persist_directory
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(answers)")]
+        if columns and "namespace" not in columns:
+            # Written before entries were namespaced; nothing says which pipeline they belong to
+            self._conn.execute("DROP TABLE answers")
+            self._conn.execute("DROP TABLE IF EXISTS cache_meta")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, question TEXT NOT NULL,"
+            " embedding BLOB NOT NULL, result TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_answers_namespace_created ON answers (namespace, created_at)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+        # Rows [0, _size) of the buffers hold this namespace's entries in id
+        # order; evicted rows are only marked dead until the next compaction
+        self._matrix = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._created = np.empty(0, dtype=np.float64)
+        self._alive = np.empty(0, dtype=bool)
+        self._positions = {}
+        self._size = 0
+        self._dead = 0
+        self._data_version = None
+
+    # --- internal helpers (callers hold self._lock) ---
+
+    def _check_collection_version(self):
+        """Clears this namespace's entries if its collection changed since they were stored."""
+        current = read_collection_version(self.persist_directory)
+        key = f"collection_version|{self.namespace}"
+        row = self._conn.execute("SELECT value FROM cache_meta WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] != current:
+            self._conn.execute("DELETE FROM answers WHERE namespace = ?", (self.namespace,))
+            self._conn.execute("INSERT OR REPLACE INTO cache_meta (key, value) VALUES (?, ?)", (key, current))
+            self._conn.commit()
+            self._data_version = None
+
+    def _refresh_matrix(self):
+        """Reloads this namespace's embeddings if another connection changed the database."""
+        # data_version only moves when another connection commits; our own
+        # writes update the matrix in place
+        (data_version,) = self._conn.execute("PRAGMA data_version").fetchone()
+        if self._data_version is not None and data_version == self._data_version:
+            return
+        rows = self._conn.execute(
+            "SELECT id, embedding, created_at FROM answers WHERE namespace = ? ORDER BY id", (self.namespace,)
+        ).fetchall()
+        self._matrix = None
+        self._size = self._dead = 0
+        for row_id, embedding, created_at in rows:
+            self._append(row_id, np.frombuffer(embedding, dtype=np.float32), created_at)
+        self._data_version = data_version
+
+    def _append(self, row_id: int, vector: np.ndarray, created_at: float):
+        """Adds an entry to the in-memory matrix, growing or compacting it when full."""
+        if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+            # A new namespace, or one whose embedding model changed: start over
+            self._matrix = np.empty((_INITIAL_CAPACITY, vector.shape[0]), dtype=np.float32)
+            self._ids = np.empty(_INITIAL_CAPACITY, dtype=np.int64)
+            self._created = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+            self._alive = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+            self._positions = {}
+            self._size = self._dead = 0
+        if self._size == len(self._matrix):
+            live = self._alive[:self._size]
+            capacity = len(self._matrix) if self._dead * 2 >= self._size else 2 * len(self._matrix)
+            matrix = np.empty((capacity, self._matrix.shape[1]), dtype=np.float32)
+            count = int(live.sum())
+            matrix[:count] = self._matrix[:self._size][live]
+            ids = np.empty(capacity, dtype=np.int64)
+            ids[:count] = self._ids[:self._size][live]
+            created = np.empty(capacity, dtype=np.float64)
+            created[:count] = self._created[:self._size][live]
+            self._matrix, self._ids, self._created = matrix, ids, created
+            self._alive = np.zeros(capacity, dtype=bool)
+            self._alive[:count] = True
+            self._positions = {int(i): position for position, i in enumerate(ids[:count])}
+            self._size, self._dead = count, 0
+        position = self._size
+        self._matrix[position] = vector
+        self._ids[position] = row_id
+        self._created[position] = created_at
+        self._alive[position] = True
+        self._positions[row_id] = position
+        self._size += 1
+
+    def _forget(self, row_ids):
+        """Marks evicted entries dead in the in-memory matrix."""
+        for row_id in row_ids:
+            position = self._positions.pop(row_id, None)
+            if position is not None:
+                self._alive[position] = False
+                self._dead += 1
+
+    def _evict(self) -> list[int]:
+        """Deletes this namespace's expired entries, then its oldest ones beyond max_entries. Returns their IDs."""
+        evicted = []
+        if self.ttl_seconds is not None:
+            evicted += self._delete(
+                "SELECT id FROM answers WHERE namespace = ? AND created_at < ?",
+                (self.namespace, time.time() - self.ttl_seconds),
+            )
+        # The in-memory matrix knows how many entries the namespace has, without a COUNT(*)
+        live = self._size - self._dead - len(evicted)
+        if self.max_entries is not None and live > self.max_entries:
+            evicted += self._delete(
+                "SELECT id FROM answers WHERE namespace = ? ORDER BY created_at LIMIT ?",
+                (self.namespace, live - self.max_entries),
+            )
+        return evicted
+
+    def _delete(self, select: str, parameters: tuple) -> list[int]:
+        """Deletes the entries whose IDs select returns, and returns those IDs."""
+        row_ids = [row_id for (row_id,) in self._conn.execute(select, parameters).fetchall()]
+        self._conn.executemany("DELETE FROM answers WHERE id = ?", [(row_id,) for row_id in row_ids])
+        return row_ids
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    # --- public API ---
+
+    def lookup(self, embedding):
+        """
+        Returns the cached result for the most similar stored question, or
+        None if no live entry reaches the similarity threshold.
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            self._check_collection_version()
+            self._refresh_matrix()
+            if self._matrix is None or self._size == self._dead or self._matrix.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+
+            similarities = self._matrix[:self._size] @ query
+            similarities[~self._alive[:self._size]] = -1.0
+            if self.ttl_seconds is not None:
+                similarities[self._created[:self._size] < time.time() - self.ttl_seconds] = -1.0
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            row = self._conn.execute("SELECT result FROM answers WHERE id = ?", (int(self._ids[best]),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        result = json.loads(row[0])
+        result["similarity"] = float(similarities[best])
+        return result
+
+    def store(self, question: str, embedding, result: dict):
+        """Adds a pipeline result to the cache, evicting old entries as needed."""
+        vector = self._normalize(embedding)
+        created_at = time.time()
+        with self._lock:
+            self._check_collection_version()
+            self._refresh_matrix()
+            cursor = self._conn.execute(
+                "INSERT INTO answers (namespace, question, embedding, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, question, vector.tobytes(), json.dumps(result), created_at),
+            )
+            self._append(cursor.lastrowid, vector, created_at)
+            self._forget(self._evict())
+            self._conn.commit()
+
+    def clear(self):
+        """Removes every cached answer in this namespace."""
+        with self._lock:
+            self._conn.execute("DELETE FROM answers WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+            self._data_version = None
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters and the current number of cached answers in this namespace."""
+        with self._lock:
+            (size,) = self._conn.execute(
+                "SELECT COUNT(*) FROM answers WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": size,
+        }
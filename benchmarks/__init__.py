@@ -0,0 +1,3 @@
+# benchmarks/__init__.py
+# Offline benchmark and check scripts. Run them from the project root, e.g.
+#   python -m benchmarks.batch_query
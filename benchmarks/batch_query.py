@@ -0,0 +1,61 @@
+# benchmarks/batch_query.py
+# Compares answering the evaluation questions with a loop of
+# RAGPipeline.invoke calls against one RAGPipeline.batch call: embedding
+# requests, vector search requests and wall time, with fakes that add a
+# fixed latency per embedding request, per search and per LLM call.
+#
+#   python -m benchmarks.batch_query [--embed-latency 0.05] [--search-latency 0.01] [--llm-latency 0.3] [--concurrency 8]
+
+import argparse
+import time
+
+from benchmarks.fakes import CountingEmbeddings, FakeLatencyChatModel, build_vectorstore
+from evaluation_dataset import get_evaluation_dataset
+from pipeline import RAGPipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="invoke loop vs batch query benchmark.")
+    parser.add_argument("--embed-latency", type=float, default=0.05,
+                        help="Fake embedding latency per request, in seconds.")
+    parser.add_argument("--search-latency", type=float, default=0.01, help="Fake vector search latency per request.")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Fake LLM latency per call.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max LLM calls in flight during the batch.")
+    args = parser.parse_args()
+
+    embeddings = CountingEmbeddings(latency=args.embed_latency)
+    vectorstore = build_vectorstore(embeddings, latency=args.search_latency)
+    embeddings.document_calls = 0  # indexing the sample chunks is not counted
+    pipeline = RAGPipeline(embedding_function=embeddings, vectorstore=vectorstore,
+                           llm=FakeLatencyChatModel(latency=args.llm_latency))
+    questions = [item["question"] for item in get_evaluation_dataset()]
+
+    start = time.perf_counter()
+    looped = [pipeline.invoke(question) for question in questions]
+    loop_time = time.perf_counter() - start
+    loop_counts = (embeddings.query_calls + embeddings.document_calls, vectorstore.search_calls)
+
+    embeddings.query_calls = embeddings.document_calls = vectorstore.search_calls = 0
+    start = time.perf_counter()
+    batched = pipeline.batch(questions, max_concurrency=args.concurrency)
+    batch_time = time.perf_counter() - start
+    batch_counts = (embeddings.query_calls + embeddings.document_calls, vectorstore.search_calls)
+
+    assert [r["question"] for r in batched] == questions, "results are not in question order"
+    assert [r["context"] for r in batched] == [r["context"] for r in looped], "batch retrieved other chunks"
+    assert [r["answer"] for r in batched] == [r["answer"] for r in looped]
+
+    print(f"\n{len(questions)} questions; fake latency: embedding {args.embed_latency:.2f}s, "
+          f"search {args.search_latency:.2f}s, LLM {args.llm_latency:.2f}s")
+    print(f"{'':<24}{'embed calls':>12}{'searches':>10}{'wall s':>9}")
+    print(f"{'invoke loop':<24}{loop_counts[0]:>12}{loop_counts[1]:>10}{loop_time:>9.2f}")
+    print(f"{f'batch (limit {args.concurrency})':<24}{batch_counts[0]:>12}{batch_counts[1]:>10}{batch_time:>9.2f}"
+          f"  ({loop_time / batch_time:.1f}x faster)")
+    print("\nper-question timings of the batch, mean ms:")
+    for name in batched[0]["timings_ms"]:
+        mean = sum(r["timings_ms"][name] for r in batched) / len(batched)
+        print(f"  {name:<16}{mean:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/chunking.py
+# Compares the structure-aware chunker with the plain recursive splitter on
+# the fixture pages (plus any directory of saved pages): number of chunks,
+# characters indexed, overlap waste (characters indexed more than once),
+# tables cut across chunks, and the size of the vectors they would need.
+#
+#   python -m benchmarks.chunking [--chunk-size 600] [--chunk-overlap 300] [--dim 1536] [--dir DIR]
+
+import argparse
+import glob
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+from benchmarks.fixture_server import FIXTURE_DIR, fixture_names
+from chunking import CHUNKERS, TABLE_PATTERN, chunk_page
+from config import CHUNK_OVERLAP, CHUNK_SIZE
+from ingestion import preprocess_page
+
+BASE_URL = "https://ask.herts.ac.uk/"
+
+
+def load_pages(directories: list[str]) -> list[tuple[str, list]]:
+    """Returns the (text, outline) of the fixture pages and every .html file in directories."""
+    paths = [os.path.join(FIXTURE_DIR, f"{name}.html") for name in fixture_names()]
+    for directory in directories:
+        paths.extend(sorted(glob.glob(os.path.join(directory, "*.html"))))
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(preprocess_page(f.read(), BASE_URL + os.path.splitext(os.path.basename(path))[0]))
+    return pages
+
+
+def measure(pages, chunker: str, chunk_size: int, chunk_overlap: int) -> dict:
+    chunks = tables_cut = 0
+    page_chars = indexed_chars = 0
+    sections = 0
+    for text, outline in pages:
+        page_chunks = chunk_page(text, outline, chunker, chunk_size, chunk_overlap)
+        chunks += len(page_chunks)
+        page_chars += len(text)
+        indexed_chars += sum(len(chunk.text) for chunk in page_chunks)
+        sections += sum(bool(chunk.section) for chunk in page_chunks)
+        for table in TABLE_PATTERN.finditer(text):
+            if not any(c.start_index <= table.start() and table.end() <= c.end_index for c in page_chunks):
+                tables_cut += 1
+    return {
+        "chunks": chunks,
+        "indexed_chars": indexed_chars,
+        "mean_chars": indexed_chars / chunks if chunks else 0.0,
+        "overlap_waste": max(0.0, indexed_chars / page_chars - 1) if page_chars else 0.0,
+        "tables_cut": tables_cut,
+        "with_section": sections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Structure-aware vs recursive chunking benchmark.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP)
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimensions, for the vector size estimate.")
+    parser.add_argument("--dir", action="append", default=[], help="Extra directory of saved .html pages.")
+    args = parser.parse_args()
+
+    pages = load_pages(args.dir)
+    print(f"{len(pages)} pages, {sum(len(text) for text, _ in pages)} characters, "
+          f"chunk size {args.chunk_size}, overlap {args.chunk_overlap}")
+    print(f"{'chunker':<12}{'chunks':>8}{'chars':>9}{'mean':>7}{'overlap':>9}{'tables cut':>12}"
+          f"{'sectioned':>11}{'vectors KB':>12}")
+    for chunker in CHUNKERS:
+        r = measure(pages, chunker, args.chunk_size, args.chunk_overlap)
+        print(f"{chunker:<12}{r['chunks']:>8}{r['indexed_chars']:>9}{r['mean_chars']:>7.0f}"
+              f"{r['overlap_waste']:>9.1%}{r['tables_cut']:>12}{r['with_section']:>11}"
+              f"{r['chunks'] * args.dim * 4 / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/crawler.py
+# Crawls the local fixture server and checks the crawler: in-domain link
+# discovery from one seed, canonical-URL and content-hash deduplication,
+# the per-host politeness delay, and resuming an interrupted crawl from its
+# saved frontier without fetching any page twice. Finally ingests a crawl
+# into a temporary ChromaDB directory with a local embedding function.
+# Exits with status 1 if a check fails.
+#
+#   python -m benchmarks.crawler [--delay 0.2]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+import requests_cache
+
+from benchmarks.fixture_server import fixture_names, serve_fixtures
+from benchmarks.incremental_ingest import CountingEmbeddingFunction
+from crawler import Crawler
+from ingestion import iter_crawled_pages, rag_ingest_crawl
+
+# Links to the other fixture pages: temporary-id-slip-for-exams
+SEED = "replacement-id-cards-lost-damaged-stolen"
+
+
+def seed_urls(base_url: str) -> list[str]:
+    """The seed page plus the other fixtures linked in ways that must not be crawled twice."""
+    return [
+        f"{base_url}/{SEED}",
+        f"{base_url}/laundry-on-campus/?utm_source=newsletter#opening-hours",  # canonicalized
+        f"{base_url}/mirror/temporary-id-slip-for-exams",  # same content as a linked page
+        f"{base_url}/council-tax-exemption",
+    ]
+
+
+def crawl(crawler: Crawler) -> tuple[list[str], float]:
+    start = time.perf_counter()
+    urls = [page.url for page in iter_crawled_pages(crawler, use_http_cache=False)]
+    return urls, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawler checks against the local fixture server.")
+    parser.add_argument("--delay", type=float, default=0.2, help="Politeness delay between requests, in seconds.")
+    args = parser.parse_args()
+
+    failures = []
+    request_log = []
+    with serve_fixtures(request_log=request_log) as base_url, requests_cache.disabled():
+        with tempfile.TemporaryDirectory() as persist_directory:
+            crawler = Crawler(seed_urls(base_url), persist_directory, delay=args.delay)
+            urls, elapsed = crawl(crawler)
+        names = sorted(url.rsplit("/", 1)[-1] for url in urls)
+        gaps = [b[0] - a[0] for a, b in zip(request_log, request_log[1:])]
+        print(f"Crawl: {len(request_log)} requests in {elapsed:.2f}s, {len(urls)} pages yielded, "
+              f"frontier {crawler.frontier.counts()}")
+        print(f"  smallest gap between requests: {min(gaps) * 1000:.0f} ms (delay {args.delay * 1000:.0f} ms)")
+        if names != fixture_names():
+            failures.append(f"expected each fixture page once, got {names}")
+        if min(gaps) < args.delay * 0.9:
+            failures.append("requests to the host were closer together than the politeness delay")
+
+        # Stop after two pages, then resume from the saved frontier
+        request_log.clear()
+        with tempfile.TemporaryDirectory() as persist_directory:
+            first, _ = crawl(Crawler(seed_urls(base_url), persist_directory, delay=args.delay, max_pages=2))
+            resumed, _ = crawl(Crawler(seed_urls(base_url), persist_directory, delay=args.delay))
+        refetched = [path for path, count in Counter(path for _, path in request_log).items()
+                     if count > 1 and path != "/robots.txt"]
+        print(f"Interrupted crawl: {len(first)} pages, resumed crawl: {len(resumed)} pages, "
+              f"{len(refetched)} refetched")
+        if sorted(url.rsplit("/", 1)[-1] for url in first + resumed) != fixture_names():
+            failures.append(f"the two runs did not yield each fixture page once: {first + resumed}")
+        if refetched:
+            failures.append(f"pages fetched again after resuming: {refetched}")
+
+        with tempfile.TemporaryDirectory() as persist_directory:
+            embedding_function = CountingEmbeddingFunction()
+            collection = rag_ingest_crawl(seed_urls(base_url), "benchmark_collection", persist_directory,
+                                          crawler=Crawler(seed_urls(base_url), persist_directory, delay=args.delay),
+                                          embedding_function=embedding_function)
+            sources = {metadata["source"] for metadata in collection.get(include=["metadatas"])["metadatas"]}
+        print(f"Crawl ingestion: {collection.count()} chunks from {len(sources)} pages, "
+              f"{embedding_function.calls} embedding call(s)")
+        if len(sources) != len(fixture_names()):
+            failures.append(f"expected chunks from {len(fixture_names())} pages, got {sorted(sources)}")
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: every page crawled once, politely, across an interrupted and a resumed run.")
+
+
+if __name__ == "__main__":
+    main()
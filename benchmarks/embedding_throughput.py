@@ -0,0 +1,67 @@
+# benchmarks/embedding_throughput.py
+# Measures CPU embedding throughput (docs/sec) of a local sentence-transformers
+# model with each backend, on chunks of the fixture pages, and how closely the
+# ONNX / int8 vectors agree with the PyTorch ones. Downloads the model on the
+# first run; the ONNX backends need `pip install optimum[onnxruntime]`.
+#
+#   python -m benchmarks.embedding_throughput [--model all-mpnet-base-v2] [--docs 512]
+#       [--backends torch onnx onnx-int8] [--batch-size 32] [--threads 4]
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from benchmarks.fixture_server import FIXTURE_DIR, fixture_names
+from config import CHUNK_OVERLAP, CHUNK_SIZE
+from embeddings import LocalEmbeddings
+from ingestion import preprocess_html_content
+
+
+def fixture_chunks(count):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = []
+    for name in fixture_names():
+        with open(os.path.join(FIXTURE_DIR, f"{name}.html"), encoding="utf-8") as f:
+            chunks.extend(splitter.split_text(preprocess_html_content(f.read(), f"https://ask.herts.ac.uk/{name}")))
+    return [chunks[i % len(chunks)] for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local embedding throughput benchmark.")
+    parser.add_argument("--model", default="all-mpnet-base-v2")
+    parser.add_argument("--docs", type=int, default=512, help="Chunks to embed per backend.")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads; defaults to every core.")
+    args = parser.parse_args()
+
+    docs = fixture_chunks(args.docs)
+    reference = None
+    print(f"{args.docs} chunks of {CHUNK_SIZE} chars, model {args.model}, batch size {args.batch_size}")
+    for backend in args.backends:
+        embeddings = LocalEmbeddings(args.model, batch_size=args.batch_size, backend=backend, threads=args.threads)
+        start = time.perf_counter()
+        embeddings.embed_documents(docs[:args.batch_size])
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vectors = np.asarray(embeddings.embed_documents(docs))
+        elapsed = time.perf_counter() - start
+
+        agreement = ""
+        if reference is None:
+            reference = vectors
+        else:
+            # Vectors are normalized, so the row-wise dot product is the cosine similarity
+            cosines = np.sum(reference * vectors, axis=1)
+            agreement = f", cosine vs {args.backends[0]}: mean {cosines.mean():.4f} / min {cosines.min():.4f}"
+        print(f"{backend:<10} {args.docs / elapsed:8.1f} docs/s (load + warm-up {load_time:.1f}s){agreement}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/eval_concurrency.py
+# Compares the old one-question-at-a-time evaluation loop with the concurrent
+# runner in evaluate.py, against a fake LLM that adds a fixed latency.
+#
+#   python -m benchmarks.eval_concurrency [--latency 0.3] [--concurrency 8]
+
+import argparse
+import time
+
+from benchmarks.fakes import CountingEmbeddings, FakeLatencyChatModel, build_vectorstore
+from evaluate import generate_responses
+from evaluation_dataset import get_evaluation_dataset
+from pipeline import RAGPipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs concurrent evaluation benchmark.")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM latency per call, in seconds.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max questions in flight.")
+    args = parser.parse_args()
+
+    embeddings = CountingEmbeddings()
+    # One question is made to fail, to show it is recorded rather than fatal
+    llm = FakeLatencyChatModel(latency=args.latency, fail_when="TV Licence")
+    pipeline = RAGPipeline(embedding_function=embeddings, vectorstore=build_vectorstore(embeddings), llm=llm)
+    questions = [item["question"] for item in get_evaluation_dataset()]
+
+    start = time.perf_counter()
+    sequential = []
+    for question in questions:
+        try:
+            sequential.append(pipeline.invoke(question)["answer"])
+        except Exception:
+            sequential.append(None)
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    responses = generate_responses(pipeline, questions, max_concurrency=args.concurrency)
+    concurrent_time = time.perf_counter() - start
+
+    assert [r["question"] for r in responses] == questions, "results are not in dataset order"
+    assert [r["answer"] for r in responses] == sequential
+    failed = sum(r["error"] is not None for r in responses)
+
+    print(f"{len(questions)} questions, fake LLM latency {args.latency:.2f}s")
+    print(f"Sequential loop:          {sequential_time:6.2f}s")
+    print(f"Concurrent (limit {args.concurrency:>2}):   {concurrent_time:6.2f}s "
+          f"({sequential_time / concurrent_time:.1f}x faster)")
+    print(f"Failed questions recorded: {failed}")
+
+
+if __name__ == "__main__":
+    main()
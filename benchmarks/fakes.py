@@ -0,0 +1,156 @@
+# benchmarks/fakes.py
+# Local stand-ins for the OpenAI embedding model, the Chroma vector store and
+# the gpt-4o chat model, so benchmarks run offline and deterministically.
+
+import asyncio
+import time
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.vectorstores import InMemoryVectorStore
+
+SAMPLE_CHUNKS = [
+    ("The fee for a replacement ID card is £10. Lost or stolen ID cards should be reported to helpdesk@herts.ac.uk.",
+     "https://ask.herts.ac.uk/replacement-id-cards-lost-damaged-stolen"),
+    ("A temporary ID slip for exams is valid for 1 week from the date of issue.",
+     "https://ask.herts.ac.uk/temporary-id-slip-for-exams"),
+    ("The application fee for a Student Visa is £524.",
+     "https://ask.herts.ac.uk/student-visa-processing-times-and-application-fees"),
+    ("Full-time students on a course lasting at least six months are eligible for Council Tax exemption.",
+     "https://ask.herts.ac.uk/council-tax-exemption"),
+    ("Laundry facilities are available on both the College Lane and de Havilland campuses.",
+     "https://ask.herts.ac.uk/laundry-on-campus"),
+    ("Request a student letter through the Student Letters portal; it arrives in about 15 minutes.",
+     "https://ask.herts.ac.uk/student-letters-cae5998a-cefd-447d-ab93-526064295952"),
+]
+
+
+class CountingEmbeddings(Embeddings):
+    """
+    Deterministic hash embeddings that count every call made to them.
+    latency adds a fixed delay per call, standing in for the API round trip.
+    """
+
+    def __init__(self, size: int = 64, latency: float = 0.0):
+        self._inner = DeterministicFakeEmbedding(size=size)
+        self.latency = latency
+        self.query_calls = 0
+        self.document_calls = 0
+
+    def embed_documents(self, texts):
+        self.document_calls += 1
+        time.sleep(self.latency)
+        return self._inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        time.sleep(self.latency)
+        return self._inner.embed_query(text)
+
+
+class CountingVectorStore(InMemoryVectorStore):
+    """
+    In-memory vector store that counts similarity searches. latency adds a
+    fixed delay per search request, standing in for the ChromaDB round trip.
+    """
+
+    def __init__(self, embedding, latency: float = 0.0):
+        super().__init__(embedding)
+        self.latency = latency
+        self.search_calls = 0
+
+    def similarity_search(self, query, k=4, **kwargs):
+        self.search_calls += 1
+        time.sleep(self.latency)
+        return super().similarity_search(query, k=k, **kwargs)
+
+    def similarity_search_by_vectors(self, embeddings, k=4):
+        """Multi-query search, like ChromaDB's query(query_embeddings=[...]): one request."""
+        self.search_calls += 1
+        time.sleep(self.latency)
+        search = super().similarity_search_by_vector
+        return [search(embedding, k=k) for embedding in embeddings]
+
+
+def build_vectorstore(embedding=None, chunks=SAMPLE_CHUNKS, latency: float = 0.0):
+    """Returns a CountingVectorStore loaded with the sample Ask Herts chunks."""
+    store = CountingVectorStore(embedding or CountingEmbeddings(), latency)
+    store.add_texts(
+        [text for text, _ in chunks],
+        metadatas=[{"source": url, "chunk_index": 0} for _, url in chunks],
+        ids=[f"{url}#0" for _, url in chunks],
+    )
+    return store
+
+
+class FakeLatencyChatModel(BaseChatModel):
+    """
+    Chat model that answers with a fixed reply, standing in for a gpt-4o round
+    trip. The first token arrives after `latency` seconds and each further
+    word after `token_delay` more. Prompts containing fail_when raise an error.
+    """
+
+    reply: str = "The fee for a replacement ID card is £10."
+    latency: float = 0.2
+    token_delay: float = 0.0
+    fail_when: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency-chat"
+
+    def _result(self, messages):
+        if self.fail_when and any(self.fail_when in str(m.content) for m in messages):
+            raise RuntimeError(f"fake LLM failure for prompt containing {self.fail_when!r}")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    def _words(self):
+        words = self.reply.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency + self.token_delay * (len(self._words()) - 1))
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency + self.token_delay * (len(self._words()) - 1))
+        return self._result(messages)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._result(messages)
+        time.sleep(self.latency)
+        for i, word in enumerate(self._words()):
+            if i:
+                time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._result(messages)
+        await asyncio.sleep(self.latency)
+        for i, word in enumerate(self._words()):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+
+class FakeCrossEncoder:
+    """
+    Stand-in for a sentence-transformers CrossEncoder. A (question, passage)
+    pair scores the share of the question's words found in the passage, after
+    `latency` seconds per pair, standing in for CPU inference.
+    """
+
+    def __init__(self, latency: float = 0.002):
+        self.latency = latency
+        self.pairs_scored = 0
+
+    def predict(self, pairs, batch_size: int = 32, show_progress_bar: bool = False):
+        time.sleep(self.latency * len(pairs))
+        self.pairs_scored += len(pairs)
+        scores = []
+        for question, passage in pairs:
+            words = set(question.lower().split())
+            scores.append(len(words & set(passage.lower().split())) / len(words) if words else 0.0)
+        return scores
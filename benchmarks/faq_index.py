@@ -0,0 +1,91 @@
+# benchmarks/faq_index.py
+# Builds a FAQ index of pre-generated answers to the evaluation questions
+# with a slow fake LLM, then compares the latency of a FAQ question (a
+# lookup, no LLM call) with one the pipeline has to answer. Also checks that
+# a change to the collection invalidates the answers and that a refresh
+# regenerates them. Exits with status 1 if a check fails.
+#
+#   python -m benchmarks.faq_index [--latency 1.0]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import CountingEmbeddings, FakeLatencyChatModel, build_vectorstore
+from collection_version import bump_collection_version
+from evaluation_dataset import get_evaluation_dataset
+from faq_index import FAQIndex, refresh_faq_index
+from pipeline import RAGPipeline
+from retrieval_benchmark import percentile
+
+OTHER_QUESTIONS = ["Where is the laundry on campus?", "Am I eligible for council tax exemption?",
+                   "How do I request a student letter?"]
+
+
+def timed_invoke(pipeline, questions: list[str]) -> list[float]:
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        pipeline.invoke(question)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAQ answer index benchmark.")
+    parser.add_argument("--latency", type=float, default=1.0, help="Fake LLM latency per call, in seconds.")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as persist_directory:
+        path = os.path.join(persist_directory, "faq_index.sqlite")
+        embeddings = CountingEmbeddings()
+        pipeline = RAGPipeline(embedding_function=embeddings, vectorstore=build_vectorstore(embeddings),
+                               llm=FakeLatencyChatModel(latency=args.latency))
+        # The index the pipeline reads is the one refresh_faq_index fills: same file, same namespace
+        faq_index = pipeline.faq_index = FAQIndex(path, persist_directory=persist_directory,
+                                                  namespace=pipeline.namespace)
+        # The benchmark's curated list: the evaluation questions
+        questions = [item["question"] for item in get_evaluation_dataset()]
+
+        start = time.perf_counter()
+        stored = refresh_faq_index(persist_directory, questions, pipeline=pipeline, path=path)
+        build_time = time.perf_counter() - start
+        faq_latencies = timed_invoke(pipeline, questions)
+        faq_hits = faq_index.stats()["hits"]
+        other_latencies = timed_invoke(pipeline, OTHER_QUESTIONS)
+
+        print(f"\nBuilt {stored} FAQ answers in {build_time:.2f}s (fake LLM latency {args.latency:.2f}s)")
+        print(f"{'question':<22}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, latencies in (("FAQ (lookup)", faq_latencies), ("other (pipeline)", other_latencies)):
+            print(f"{name:<22}{len(latencies):>7}{percentile(latencies, 0.5) * 1000:>10.2f}"
+                  f"{percentile(latencies, 0.99) * 1000:>10.2f}")
+        if stored != len(questions) or faq_hits != len(questions):
+            failures.append(f"{faq_hits} of {len(questions)} FAQ questions answered from the index")
+        if faq_index.stats()["hits"] != faq_hits:
+            failures.append("a question outside the FAQ was answered from the index")
+
+        # Ingestion wrote new pages: the stored answers must not be served any more
+        bump_collection_version(persist_directory)
+        stale = faq_index.lookup(embeddings.embed_query(questions[0])) is not None
+        current_after_bump = faq_index.is_current()
+        restored = refresh_faq_index(persist_directory, pipeline=pipeline, path=path)
+        unchanged = refresh_faq_index(persist_directory, pipeline=pipeline, path=path)
+        print(f"After a collection change: stale answer served: {stale}, "
+              f"regenerated {restored}, second refresh regenerated {unchanged}")
+        if stale or current_after_bump:
+            failures.append("answers from an older collection version were still served")
+        if restored != len(questions) or unchanged is not None:
+            failures.append("refresh did not regenerate exactly once after the change")
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: FAQ questions skip the LLM and follow the collection version.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/fixture_server.py
+# A local HTTP server that serves the HTML pages in benchmarks/fixtures, so
+# ingestion can be benchmarked without touching ask.herts.ac.uk.
+
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def fixture_names():
+    """Returns the page names available in the fixture directory."""
+    return sorted(name[:-len(".html")] for name in os.listdir(FIXTURE_DIR) if name.endswith(".html"))
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serves /<name> and /<any>/<prefix>/<name> from fixtures/<name>.html, so one
+    fixture page can be requested under many distinct URLs. Responses carry an
+    ETag and Last-Modified, and a matching If-None-Match gets a 304.
+    """
+
+    def do_GET(self):
+        if self.server.request_log is not None:
+            self.server.request_log.append((time.monotonic(), self.path))
+        name = urlsplit(self.path).path.rstrip("/").rsplit("/", 1)[-1]
+        path = os.path.join(FIXTURE_DIR, f"{name}.html")
+        if not name or not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        time.sleep(self.server.latency)
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        last_modified = formatdate(os.path.getmtime(path), usegmt=True)
+
+        # Honour conditional GETs the way a real web server would
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_fixtures(latency: float = 0.0, request_log: list | None = None):
+    """
+    Runs the fixture server on a free local port for the duration of the block.
+
+    Args:
+        latency: Seconds to wait before answering each request.
+        request_log: Optional list to append a (time.monotonic(), path)
+            pair to for every request received.
+
+    Yields:
+        The server's base URL, e.g. "http://127.0.0.1:54321".
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.request_log = request_log
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
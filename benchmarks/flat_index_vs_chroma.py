@@ -0,0 +1,118 @@
+# benchmarks/flat_index_vs_chroma.py
+# Compares the memory-mapped flat index with ChromaDB on a synthetic
+# collection: cold-load time, query latency and resident memory per worker.
+# Every worker is a fresh process; flat-index workers map the same file, so
+# its pages are shared (RssFile) rather than copied (RssAnon).
+#
+#   python -m benchmarks.flat_index_vs_chroma [--chunks 3000] [--dim 1536] [--workers 4] [--queries 200]
+
+import argparse
+import multiprocessing
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+COLLECTION = "benchmark_collection"
+
+
+def memory_mb() -> dict:
+    """Returns this process's resident memory in MB, split into file-backed and anonymous pages where possible."""
+    fields = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "RssAnon", "RssFile"):
+                    fields[key] = int(value.split()[0]) / 1024
+    except OSError:
+        import resource
+
+        fields["VmRSS"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return fields
+
+
+def worker(backend: str, persist_directory: str, dim: int, queries: int, k: int, seed: int) -> dict:
+    """Opens the index in a fresh process, runs random vector queries and reports timings and memory."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((queries, dim)).astype(np.float32)
+
+    start = time.perf_counter()
+    if backend == "chroma":
+        from langchain_community.vectorstores import Chroma
+
+        store = Chroma(persist_directory=persist_directory, collection_name=COLLECTION)
+    else:
+        from flat_index import FlatVectorStore
+
+        store = FlatVectorStore.load(persist_directory)
+    store.similarity_search_by_vector(vectors[0].tolist(), k=k)
+    cold_load = time.perf_counter() - start
+
+    latencies = []
+    for vector in vectors:
+        start = time.perf_counter()
+        store.similarity_search_by_vector(vector.tolist(), k=k)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "cold_load_s": cold_load,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000,
+        **memory_mb(),
+    }
+
+
+def build_collection(persist_directory: str, chunks: int, dim: int, dtype: str):
+    import chromadb
+    import numpy as np
+
+    from flat_index import export_flat_index
+
+    rng = np.random.default_rng(0)
+    client = chromadb.PersistentClient(path=persist_directory)
+    collection = client.get_or_create_collection(COLLECTION)
+    for start in range(0, chunks, 1000):
+        count = min(1000, chunks - start)
+        collection.upsert(
+            ids=[f"chunk-{i}" for i in range(start, start + count)],
+            embeddings=rng.standard_normal((count, dim)).astype(np.float32),
+            documents=[f"Synthetic chunk {i} " + "lorem ipsum " * 50 for i in range(start, start + count)],
+            metadatas=[{"source": f"https://ask.herts.ac.uk/page-{i % 100}", "chunk_index": i}
+                       for i in range(start, start + count)],
+        )
+    export_flat_index(collection, persist_directory, dtype)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flat memory-mapped index vs ChromaDB benchmark.")
+    parser.add_argument("--chunks", type=int, default=3000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes per backend.")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per worker.")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as persist_directory:
+        print(f"Building a {args.chunks} x {args.dim} collection...")
+        build_collection(persist_directory, args.chunks, args.dim, args.dtype)
+
+        context = multiprocessing.get_context("spawn")
+        print(f"{'backend':<8}{'cold load s':>12}{'p50 ms':>9}{'p99 ms':>9}{'RSS MB':>9}{'anon MB':>9}{'file MB':>9}")
+        for backend in ("chroma", "flat"):
+            # max_tasks_per_child=1: every worker starts cold in a new process
+            with ProcessPoolExecutor(args.workers, mp_context=context, max_tasks_per_child=1) as pool:
+                futures = [pool.submit(worker, backend, persist_directory, args.dim, args.queries, args.k, seed)
+                           for seed in range(args.workers)]
+                results = [future.result() for future in futures]
+            mean = {key: statistics.mean(r.get(key, 0.0) for r in results) for key in results[0]}
+            print(f"{backend:<8}{mean['cold_load_s']:>12.3f}{mean['p50_ms']:>9.3f}{mean['p99_ms']:>9.3f}"
+                  f"{mean.get('VmRSS', 0.0):>9.1f}{mean.get('RssAnon', 0.0):>9.1f}{mean.get('RssFile', 0.0):>9.1f}")
+        print("(means per worker; anon pages are private to each worker, file pages of the flat index are shared)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/html_engine.py
+# Compares the lxml HTML engine with the legacy BeautifulSoup engine on the
+# fixture pages (plus benchmarks/fixtures/html_engine, or any directory of
+# saved pages): checks that both produce byte-identical text, counts pages
+# the lxml engine hands back to the legacy one, and reports pages/sec.
+# Exits with status 1 on any difference.
+#
+#   python -m benchmarks.html_engine [--repeat 50] [--dir DIR]
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+import html_engine
+from benchmarks.fixture_server import FIXTURE_DIR, fixture_names
+from ingestion import preprocess_html_content
+
+EDGE_CASE_DIR = os.path.join(FIXTURE_DIR, "html_engine")
+BASE_URL = "https://ask.herts.ac.uk/"
+
+
+def load_pages(directories: list[str]) -> list[tuple[str, str, str]]:
+    """Returns (name, url, html) for the fixture pages and every .html file in directories."""
+    paths = [os.path.join(FIXTURE_DIR, f"{name}.html") for name in fixture_names()]
+    for directory in directories:
+        paths.extend(sorted(glob.glob(os.path.join(directory, "*.html"))))
+    pages = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8") as f:
+            pages.append((name, BASE_URL + name, f.read()))
+    return pages
+
+
+def pages_per_second(pages: list[tuple[str, str, str]], engine: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, url, html in pages:
+            preprocess_html_content(html, url, engine=engine)
+    return len(pages) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="lxml vs BeautifulSoup HTML preprocessing benchmark.")
+    parser.add_argument("--repeat", type=int, default=50, help="Passes over the pages per engine.")
+    parser.add_argument("--dir", action="append", default=[EDGE_CASE_DIR],
+                        help="Extra directory of saved .html pages; may be given more than once.")
+    args = parser.parse_args()
+
+    pages = load_pages(args.dir)
+    mismatches, fallbacks = [], []
+    for name, url, html in pages:
+        try:
+            html_engine.extract_text(html, url)
+        except html_engine.UnsupportedMarkup as e:
+            fallbacks.append(f"{name}: {e}")
+        if preprocess_html_content(html, url, engine="lxml") != preprocess_html_content(html, url, engine="html.parser"):
+            mismatches.append(name)
+
+    print(f"{len(pages)} pages, {len(fallbacks)} handed to the legacy engine, {len(mismatches)} mismatched")
+    for fallback in fallbacks:
+        print(f"  fallback  {fallback}")
+
+    legacy = pages_per_second(pages, "html.parser", args.repeat)
+    fast = pages_per_second(pages, "lxml", args.repeat)
+    print(f"{'engine':<12}{'pages/sec':>11}")
+    print(f"{'html.parser':<12}{legacy:>11.1f}")
+    print(f"{'lxml':<12}{fast:>11.1f}")
+    print(f"speedup     {fast / legacy:>10.2f}x")
+
+    if mismatches:
+        print("\nMISMATCH (lxml output differs from html.parser):")
+        for name in mismatches:
+            print(f"  - {name}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
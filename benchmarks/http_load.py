@@ -0,0 +1,107 @@
+# benchmarks/http_load.py
+# Load test of the HTTP query service (server.py) against a pipeline with a
+# slow fake LLM. Reports latency percentiles, throughput, how many requests
+# were coalesced onto an in-flight call and how many were refused with 503.
+#
+#   python -m benchmarks.http_load [--requests 400] [--clients 50] [--latency 0.3]
+
+import argparse
+import asyncio
+import random
+import time
+
+from aiohttp import ClientSession, web
+
+from benchmarks.fakes import CountingEmbeddings, FakeLatencyChatModel, build_vectorstore
+from pipeline import RAGPipeline
+from server import create_app
+
+# A few popular questions repeated with different spacing/case, as real traffic would be
+POPULAR = [
+    "replacement id card fees?",
+    "How long is a temporary ID slip valid?",
+    "Where is the laundry on campus?",
+    "Am I eligible for council tax exemption?",
+]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run_load(base_url, questions, clients):
+    latencies, statuses = [], {}
+    queue = asyncio.Queue()
+    for question in questions:
+        queue.put_nowait(question)
+
+    async def client(session):
+        while not queue.empty():
+            question = queue.get_nowait()
+            start = time.perf_counter()
+            async with session.post(f"{base_url}/query", json={"question": question}) as response:
+                await response.read()
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+                if response.status == 200:
+                    latencies.append(time.perf_counter() - start)
+
+    async with ClientSession() as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+        async with session.get(f"{base_url}/stats") as response:
+            stats = await response.json()
+    return sorted(latencies), statuses, elapsed, stats
+
+
+async def main_async(args):
+    embeddings = CountingEmbeddings()
+    llm = FakeLatencyChatModel(reply="The fee for a replacement ID card is £10.", latency=args.latency)
+    pipeline = RAGPipeline(embedding_function=embeddings, vectorstore=build_vectorstore(embeddings), llm=llm)
+
+    app = create_app(pipeline, max_concurrency=args.max_concurrency, max_pending=args.max_pending)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    rng = random.Random(0)
+    questions = []
+    for i in range(args.requests):
+        if rng.random() < args.repeat_share:
+            question = rng.choice(POPULAR)
+            questions.append(question.upper() if rng.random() < 0.3 else f"  {question} ")
+        else:
+            questions.append(f"Unique question number {i} about campus services?")
+
+    try:
+        latencies, statuses, elapsed, stats = await run_load(f"http://127.0.0.1:{port}", questions, args.clients)
+    finally:
+        await runner.cleanup()
+
+    print(f"{args.requests} requests from {args.clients} clients in {elapsed:.2f} s "
+          f"({args.requests / elapsed:.1f} req/s)")
+    print(f"status codes: {dict(sorted(statuses.items()))}")
+    print(f"latency (200s): p50 {percentile(latencies, 0.50) * 1000:7.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms, p99 {percentile(latencies, 0.99) * 1000:7.1f} ms")
+    print(f"pipeline calls: {stats['pipeline_calls']}, coalesced: {stats['coalesced']}, "
+          f"rejected: {stats['rejected']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the HTTP query service.")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent HTTP clients.")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM latency per call.")
+    parser.add_argument("--repeat-share", type=float, default=0.5, help="Share of requests for popular questions.")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
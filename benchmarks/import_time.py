@@ -0,0 +1,82 @@
+# benchmarks/import_time.py
+# Measures what worker and test processes pay at startup: the cost of
+# importing pipeline / retrieval / evaluate (now side-effect free) versus
+# importing and building a pipeline, which is what every import used to do.
+# Each case runs in a fresh interpreter; interpreter startup is subtracted.
+# Everything runs in a temporary directory with the pipeline's caches off, so
+# the benchmark leaves no ./cache files behind.
+#
+#   python -m benchmarks.import_time [--runs 5]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_snippet(code: str, runs: int, env: dict, cwd: str) -> float:
+    """Returns the median wall time, in seconds, of running code in a new interpreter."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time and cold-start benchmark.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per case.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        persist_directory = os.path.join(tmp, "chroma_db")
+        pipeline_options = dict(persist_directory=persist_directory, use_answer_cache=False, use_faq_index=False,
+                                use_retrieval_cache=False)
+        # Building the OpenAI clients needs a key but makes no network calls
+        env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "sk-offline-benchmark",
+               "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))}
+        build = f"import pipeline; pipeline.get_pipeline(**{pipeline_options!r})"
+        cases = {
+            "import pipeline": "import pipeline",
+            "import retrieval": "import retrieval",
+            "import evaluate": "import evaluate",
+            "import + build pipeline (old import cost)": build,
+        }
+
+        startup = time_snippet("pass", args.runs, env, tmp)
+        print(f"Interpreter startup: {startup * 1000:8.1f} ms (subtracted below)")
+        for label, code in cases.items():
+            elapsed = time_snippet(code, args.runs, env, tmp) - startup
+            print(f"{label:<42} {elapsed * 1000:8.1f} ms")
+
+        # In-process: first get_pipeline() call builds, later calls hit the registry
+        os.environ.setdefault("OPENAI_API_KEY", env["OPENAI_API_KEY"])
+        from pipeline import get_pipeline
+
+        # The query embedding cache is always on and lives under ./cache
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            start = time.perf_counter()
+            first = get_pipeline(**pipeline_options)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            second = get_pipeline(**pipeline_options)
+            warm = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+        assert first is second
+
+    print(f"{'get_pipeline() cold start (in-process)':<42} {cold * 1000:8.1f} ms")
+    print(f"{'get_pipeline() cached':<42} {warm * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/incremental_ingest.py
+# Ingests the fixture site twice into a temporary ChromaDB directory and
+# counts embedding calls. The second, "nightly refresh" run of an unchanged
+# site must make none.
+#
+#   python -m benchmarks.incremental_ingest
+
+import hashlib
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+from benchmarks.fixture_server import fixture_names, serve_fixtures
+from ingestion import rag_ingest_urls
+
+
+class CountingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Deterministic local ChromaDB embedding function that counts embedded texts."""
+
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+
+    def __call__(self, input: Documents) -> Embeddings:
+        self.calls += 1
+        self.texts += len(input)
+        return [[byte / 255.0 for byte in hashlib.sha256(text.encode("utf-8")).digest()[:8]] for text in input]
+
+
+def main():
+    with serve_fixtures() as base_url, tempfile.TemporaryDirectory() as persist_directory:
+        urls = [f"{base_url}/{name}" for name in fixture_names()]
+        for label in ("Initial ingestion", "Unchanged refresh"):
+            embedding_function = CountingEmbeddingFunction()
+            start = time.perf_counter()
+            collection = rag_ingest_urls(urls, "benchmark_collection", persist_directory,
+                                         incremental=True, embedding_function=embedding_function)
+            elapsed = time.perf_counter() - start
+            print(f"{label}: {elapsed:.2f}s, {embedding_function.calls} embedding call(s), "
+                  f"{embedding_function.texts} chunk(s) embedded, {collection.count()} chunk(s) stored")
+
+        assert embedding_function.calls == 0, "an unchanged site should not be re-embedded"
+    print("OK: unchanged refresh made zero embedding calls.")
+
+
+if __name__ == "__main__":
+    main()
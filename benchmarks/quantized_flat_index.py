@@ -0,0 +1,222 @@
+# benchmarks/quantized_flat_index.py
+# Compares the flat index stored at full precision with compressed codes
+# (int8 or binary, optionally with fewer dimensions) whose matches are
+# re-scored with full-precision vectors read from ChromaDB. On a synthetic
+# collection: size on disk, resident memory and query latency per worker,
+# and agreement of the top k with exact search. Loading the synthetic
+# vectors into ChromaDB takes about a minute at the default size. On the evaluation dataset, over a temporary index of
+# the fixture pages built with the offline embedding stub: recall@k, MRR and
+# nDCG. Exits with status 1 if a compressed index loses too much recall.
+#
+#   python -m benchmarks.quantized_flat_index [--chunks 20000] [--dim 1536] [--dimensions 512] [--rescore-factor 4]
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+from benchmarks.flat_index_vs_chroma import memory_mb
+from flat_index import (
+    FLAT_CODES_FILENAME,
+    FLAT_MATRIX_FILENAME,
+    FlatVectorStore,
+    export_flat_index,
+)
+
+
+def variants(dim: int, dimensions: int) -> list[tuple[str, str, str | None, int | None]]:
+    """(name, dtype, quantization, dimensions) of each index compared; the first is the exact baseline."""
+    return [
+        ("float32", "float32", None, None),
+        ("float16", "float16", None, None),
+        ("int8", "float32", "int8", None),
+        (f"int8 {dimensions}d", "float32", "int8", dimensions),
+        ("binary", "float32", "binary", None),
+        (f"binary {dimensions}d", "float32", "binary", dimensions),
+    ]
+
+
+def synthetic_vectors(rng, count: int, dim: int, rank: int = 64, noise: float = 0.3) -> np.ndarray:
+    """Low-rank vectors plus noise: neighbours are meaningful, unlike independent random vectors."""
+    latent = rng.standard_normal((count, rank)) * np.linspace(1.0, 0.2, rank)
+    basis = rng.standard_normal((rank, dim)) / np.sqrt(dim)
+    vectors = latent @ basis
+    vectors += rng.standard_normal((count, dim)) * noise * np.linalg.norm(vectors, axis=1, keepdims=True) / np.sqrt(dim)
+    return vectors.astype(np.float32)
+
+
+def disk_mb(persist_directory: str) -> tuple[float, float]:
+    """Size of the full-precision matrix and of the compressed codes, in MB; 0 for the one not written."""
+    sizes = []
+    for filename in (FLAT_MATRIX_FILENAME, FLAT_CODES_FILENAME):
+        path = os.path.join(persist_directory, filename)
+        sizes.append(os.path.getsize(path) / 2 ** 20 if os.path.exists(path) else 0.0)
+    return sizes[0], sizes[1]
+
+
+def read_per_query_mb(persist_directory: str, k: int, rescore_factor: int) -> float:
+    """Index bytes a query reads: the whole matrix, or the codes plus the float32 vectors re-scored."""
+    store = FlatVectorStore.load(persist_directory, rescore_factor=rescore_factor)
+    if store.codes is None:
+        return store.matrix.nbytes / 2 ** 20
+    return (store.codes.nbytes + min(len(store), k * rescore_factor) * store.info["vector_dimensions"] * 4) / 2 ** 20
+
+
+def worker(persist_directory: str, queries: np.ndarray, k: int, rescore_factor: int) -> dict:
+    """Opens the index in a fresh process, runs the queries and reports the hits, timings and memory."""
+    store = FlatVectorStore.load(persist_directory, rescore_factor=rescore_factor)
+    start = time.perf_counter()
+    store.search_vector(queries[0], k)
+    cold_load = time.perf_counter() - start
+
+    latencies, hits = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits.append([store.ids[i] for i, _ in store.search_vector(query, k)])
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "hits": hits,
+        "cold_load_s": cold_load,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000,
+        **memory_mb(),
+    }
+
+
+def build_collection(persist_directory: str, ids: list[str], vectors: np.ndarray, metadatas: list[dict]):
+    """Loads the vectors into a ChromaDB collection, which compressed indexes re-score from."""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=persist_directory)
+    collection = client.create_collection("synthetic_collection", metadata={"hnsw:space": "cosine"})
+    batch = client.get_max_batch_size()
+    for start in range(0, len(ids), batch):
+        collection.add(ids=ids[start:start + batch], embeddings=vectors[start:start + batch],
+                       metadatas=metadatas[start:start + batch])
+    return collection
+
+
+def synthetic_comparison(args) -> dict:
+    """Size, memory, latency and agreement with exact search of every variant on a synthetic collection."""
+    rng = np.random.default_rng(args.seed)
+    vectors = synthetic_vectors(rng, args.chunks, args.dim)
+    # Perturbed copies of random chunks
+    queries = vectors[rng.choice(args.chunks, size=args.queries)] + synthetic_vectors(rng, args.queries, args.dim) * 0.5
+    ids = [f"chunk-{i}" for i in range(args.chunks)]
+    metadatas = [{"source": f"https://ask.herts.ac.uk/page-{i % 100}"} for i in range(args.chunks)]
+    context = multiprocessing.get_context("spawn")
+
+    results, exact = {}, None
+    with tempfile.TemporaryDirectory() as persist_directory:
+        start = time.perf_counter()
+        collection = build_collection(persist_directory, ids, vectors, metadatas)
+        print(f"\n--- Synthetic collection: {args.chunks} x {args.dim} (loaded into ChromaDB in "
+              f"{time.perf_counter() - start:.0f} s), {args.queries} queries, k={args.k}, "
+              f"re-scoring {args.k * args.rescore_factor} candidates ---")
+        print(f"{'index':<14}{'matrix MB':>10}{'codes MB':>10}{'read/query MB':>15}{'RSS MB':>9}{'anon MB':>9}"
+              f"{'p50 ms':>9}{'p99 ms':>9}{f'overlap@{args.k}':>12}")
+        for name, dtype, quantization, dimensions in variants(args.dim, args.dimensions):
+            # Each variant replaces the previous one next to the collection
+            export_flat_index(collection, persist_directory, dtype, quantization, dimensions)
+            matrix_mb, codes_mb = disk_mb(persist_directory)
+            read_mb = read_per_query_mb(persist_directory, args.k, args.rescore_factor)
+            # max_tasks_per_child=1: a cold worker that maps only what its searches touch
+            with ProcessPoolExecutor(1, mp_context=context, max_tasks_per_child=1) as pool:
+                result = pool.submit(worker, persist_directory, queries, args.k, args.rescore_factor).result()
+            if exact is None:
+                exact = result["hits"]
+            overlap = statistics.mean(len(set(hits) & set(truth)) / len(truth)
+                                      for hits, truth in zip(result["hits"], exact))
+            results[name] = {**result, "overlap": overlap}
+            print(f"{name:<14}{matrix_mb:>10.1f}{codes_mb:>10.1f}{read_mb:>15.2f}{result.get('VmRSS', 0.0):>9.1f}"
+                  f"{result.get('RssAnon', 0.0):>9.1f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}{overlap:>12.3f}")
+    print("(read/query: the index data a search must have in memory to be fast. The rest of the matrix can stay on\n"
+          " disk, though with a warm page cache RSS also counts the neighbouring pages the kernel maps along.\n"
+          " Compressed indexes have no matrix; their RSS includes the ChromaDB client that re-scoring opens)")
+    return results
+
+
+def evaluation_comparison(args) -> dict:
+    """recall@k, MRR and nDCG of every variant on the evaluation questions answerable from the fixture pages."""
+    import chromadb
+
+    from config import CHROMA_COLLECTION_NAME
+    from embeddings import get_embedding_provider
+    from evaluation_dataset import get_evaluation_dataset
+    from retrieval_benchmark import STUB_EMBEDDING_MODEL, build_stub_index, run_benchmark
+    from retrievers import build_retriever
+
+    cutoffs = sorted({1, 3, args.k})
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = set(build_stub_index(tmp))
+        dataset = [{**item, "sources": [s for s in item["sources"] if s in corpus]}
+                   for item in get_evaluation_dataset() if corpus & set(item["sources"])]
+        collection = chromadb.PersistentClient(path=tmp).get_collection(CHROMA_COLLECTION_NAME)
+        data = collection.get(include=["embeddings"])
+        embedding = get_embedding_provider(STUB_EMBEDDING_MODEL)
+        dim = len(data["embeddings"][0])
+
+        print(f"\n--- Evaluation dataset: {len(dataset)} questions, {len(data['ids'])} chunks x {dim}, "
+              f"vector search only ---")
+        print(f"{'index':<14}{f'recall@{args.k}':>10}{'MRR':>8}{f'nDCG@{args.k}':>9}{'p50 ms':>9}")
+        for name, dtype, quantization, dimensions in variants(dim, min(args.dimensions, dim // 2)):
+            export_flat_index(collection, tmp, dtype, quantization, dimensions)
+            store = FlatVectorStore.load(tmp, embedding, rescore_factor=args.rescore_factor)
+            results[name] = run_benchmark(build_retriever(store, args.k), dataset, cutoffs)
+            r = results[name]
+            print(f"{name:<14}{r[f'recall@{args.k}']:>10.3f}{r['mrr']:>8.3f}{r[f'ndcg@{args.k}']:>9.3f}"
+                  f"{r['p50_ms']:>9.2f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized flat index with full-precision re-scoring benchmark.")
+    parser.add_argument("--chunks", type=int, default=20000, help="Chunks in the synthetic collection.")
+    parser.add_argument("--dim", type=int, default=1536, help="Dimensions of the synthetic vectors.")
+    parser.add_argument("--dimensions", type=int, default=512, help="Dimensions kept by the truncated variants.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rescore-factor", type=int, default=4, help="Candidates re-scored per result.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-overlap", type=float, default=0.9,
+                        help="Fail if a full-dimension int8 or binary index agrees less with exact search.")
+    parser.add_argument("--max-recall-drop", type=float, default=0.05,
+                        help="Fail if a full-dimension int8 or binary index loses more evaluation recall@k.")
+    parser.add_argument("--synthetic-only", action="store_true", help="Skip the evaluation dataset (needs ChromaDB).")
+    args = parser.parse_args()
+
+    failures = []
+    synthetic = synthetic_comparison(args)
+    for name in ("int8", "binary"):
+        if synthetic[name]["overlap"] < args.min_overlap:
+            failures.append(f"{name}: overlap@{args.k} with exact search {synthetic[name]['overlap']:.3f} "
+                            f"(threshold {args.min_overlap})")
+
+    if not args.synthetic_only:
+        evaluation = evaluation_comparison(args)
+        baseline = evaluation["float32"][f"recall@{args.k}"]
+        for name in ("int8", "binary"):
+            results = evaluation[name]
+            if baseline - results[f"recall@{args.k}"] > args.max_recall_drop:
+                failures.append(f"{name}: recall@{args.k} {results[f'recall@{args.k}']:.3f} vs {baseline:.3f} "
+                                f"at full precision")
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: compressed indexes keep the recall of the full-precision index.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/query_embedding_cache.py
+# Measures query embedding time with and without the on-disk query embedding
+# cache, using a fake embedding model with a fixed network-like latency.
+#
+#   python -m benchmarks.query_embedding_cache [--latency 0.15] [--repeats 200]
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.fakes import CountingEmbeddings
+from embedding_cache import CachedQueryEmbeddings
+
+QUESTIONS = ["replacement id card fees?", "I want to get studnet letter?",
+             "on campus laundry facilities?", "council tax excemptions"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query embedding cache benchmark.")
+    parser.add_argument("--latency", type=float, default=0.15, help="Fake embedding latency per call, in seconds.")
+    parser.add_argument("--repeats", type=int, default=200, help="Cached lookups to time.")
+    args = parser.parse_args()
+
+    inner = CountingEmbeddings(latency=args.latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CachedQueryEmbeddings(inner, "fake-model", path=os.path.join(tmp, "cache.sqlite"), max_entries=3)
+
+        miss_times = []
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            cache.embed_query(question)
+            miss_times.append(time.perf_counter() - start)
+
+        # Same questions, differently cased/spaced: they normalize to the same keys.
+        # With max_entries=3 the first question was evicted, so only the last three hit.
+        hit_times = []
+        for i in range(args.repeats):
+            question = "  " + QUESTIONS[1 + i % 3].upper()
+            start = time.perf_counter()
+            cache.embed_query(question)
+            hit_times.append(time.perf_counter() - start)
+
+        stats = cache.stats()
+        assert inner.query_calls == len(QUESTIONS), "cached questions reached the embedding model"
+        assert stats["size"] == 3
+
+    print(f"Uncached embed: median {statistics.median(miss_times) * 1000:8.3f} ms")
+    print(f"Cached embed:   median {statistics.median(hit_times) * 1000:8.3f} ms, "
+          f"p99 {sorted(hit_times)[int(len(hit_times) * 0.99) - 1] * 1000:.3f} ms")
+    print(f"Cache stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/reranker.py
+# Measures the cross-encoder reranking stage on a temporary index of the
+# fixture pages (built with the offline embedding stub): recall@m and MRR of
+# the top m chunks with and without reranking, rerank latency with a cold
+# and a warm score cache, and how often the latency budget forces a fallback
+# to the retrieval order. Uses a fake word-overlap cross-encoder unless
+# --model names a real one (downloaded on first use).
+#
+#   python -m benchmarks.reranker [--candidates 20] [--top-n 5] [--budget-ms 300] [--model NAME]
+
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+from benchmarks.fakes import FakeCrossEncoder
+from config import CHROMA_COLLECTION_NAME, RERANK_BATCH_SIZE, RERANK_CANDIDATES, RERANK_TOP_N
+from evaluation_dataset import get_evaluation_dataset
+from reranker import CrossEncoderReranker
+from retrieval_benchmark import (
+    STUB_EMBEDDING_MODEL,
+    build_stub_index,
+    open_retriever,
+    percentile,
+    recall_at_k,
+    reciprocal_rank,
+)
+
+
+def rerank_pass(reranker, retrieved: list[tuple[dict, list]]) -> tuple[list[float], list[list]]:
+    """Reranks every question's candidates, returning the latencies and the kept chunks."""
+    latencies, kept = [], []
+    for item, docs in retrieved:
+        start = time.perf_counter()
+        kept.append(reranker.rerank(item["question"], docs))
+        latencies.append(time.perf_counter() - start)
+    return latencies, kept
+
+
+def quality(retrieved: list[tuple[dict, list]], ranked_docs: list[list], m: int) -> tuple[float, float]:
+    recall = mrr = 0.0
+    for (item, _), docs in zip(retrieved, ranked_docs):
+        sources = [doc.metadata.get("source") for doc in docs]
+        expected = set(item["sources"])
+        recall += recall_at_k(sources, expected, m)
+        mrr += reciprocal_rank(sources[:m], expected)
+    return recall / len(retrieved), mrr / len(retrieved)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-encoder reranking benchmark.")
+    parser.add_argument("--candidates", type=int, default=RERANK_CANDIDATES, help="Chunks retrieved per question.")
+    parser.add_argument("--top-n", type=int, default=RERANK_TOP_N, help="Chunks kept after reranking.")
+    parser.add_argument("--batch-size", type=int, default=RERANK_BATCH_SIZE)
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="Rerank latency budget per question.")
+    parser.add_argument("--pair-latency-ms", type=float, default=2.0,
+                        help="Simulated CPU time per pair for the fake cross-encoder.")
+    parser.add_argument("--model", help="Score with this sentence-transformers cross-encoder instead of the fake.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = set(build_stub_index(tmp))
+        dataset = [{**item, "sources": [s for s in item["sources"] if s in corpus]}
+                   for item in get_evaluation_dataset() if corpus & set(item["sources"])]
+        retriever = open_retriever(tmp, CHROMA_COLLECTION_NAME, STUB_EMBEDDING_MODEL, args.candidates)
+        retrieved = [(item, retriever.invoke(item["question"])) for item in dataset]
+
+    model = None if args.model else FakeCrossEncoder(latency=args.pair_latency_ms / 1000)
+    reranker = CrossEncoderReranker(model_name=args.model or "fake-word-overlap", top_n=args.top_n,
+                                    candidates=args.candidates, batch_size=args.batch_size,
+                                    latency_budget_ms=None, model=model)
+    model = reranker.model  # loads a real model before the timed passes
+    cold, reranked = rerank_pass(reranker, retrieved)
+    warm, _ = rerank_pass(reranker, retrieved)
+
+    # The same questions against a fresh cache, with the latency budget enforced
+    budgeted = CrossEncoderReranker(model_name=reranker.model_name, top_n=args.top_n, candidates=args.candidates,
+                                    batch_size=args.batch_size, latency_budget_ms=args.budget_ms,
+                                    model=model)
+    budget_latencies, budgeted_docs = rerank_pass(budgeted, retrieved)
+
+    m = args.top_n
+    print(f"\n--- Reranking ({len(dataset)} questions, {args.candidates} candidates -> top {m}, "
+          f"{reranker.model_name}) ---")
+    print(f"{'order':<22}{f'recall@{m}':>11}{'MRR':>8}")
+    for name, ranked in (("retrieval", [docs for _, docs in retrieved]), ("reranked", reranked),
+                         (f"budget {args.budget_ms:g} ms", budgeted_docs)):
+        recall, mrr = quality(retrieved, ranked, m)
+        print(f"{name:<22}{recall:>11.3f}{mrr:>8.3f}")
+    print(f"\n{'rerank latency':<22}{'p50 ms':>9}{'p99 ms':>9}")
+    for name, latencies in (("cold cache", cold), ("warm cache", warm),
+                            (f"budget {args.budget_ms:g} ms", budget_latencies)):
+        print(f"{name:<22}{percentile(latencies, 0.5) * 1000:>9.2f}{percentile(latencies, 0.99) * 1000:>9.2f}")
+    stats = reranker.stats()
+    print(f"\nscore cache: {stats['size']} pairs, hit rate {stats['hit_rate']:.0%} over both passes")
+    print(f"budget fallbacks: {budgeted.stats()['fallbacks']} of {len(dataset)} questions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/retrieval_cache.py
+# Measures the retrieval result cache on a workload of repeated popular
+# questions, against a fake vector store with a fixed search latency:
+# searches made and retrieval latency with no cache, with a cold cache, from
+# a second worker sharing the on-disk tier, and after the collection version
+# changes. Exits with status 1 if the cache serves stale or different chunks.
+#
+#   python -m benchmarks.retrieval_cache [--search-latency 0.02] [--repeats 5]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import CountingEmbeddings, build_vectorstore
+from collection_version import bump_collection_version
+from evaluation_dataset import get_evaluation_dataset
+from retrieval_benchmark import percentile
+from retrieval_cache import CachedRetriever, RetrievalCache
+from retrievers import build_retriever
+
+POPULAR = 5
+
+
+def workload(repeats: int) -> list[str]:
+    """Every evaluation question once, plus the first POPULAR questions asked repeats more times."""
+    questions = [item["question"] for item in get_evaluation_dataset()]
+    return questions + questions[:POPULAR] * repeats
+
+
+def run(retriever, store, questions: list[str]) -> tuple[list[float], int, list[list[str]]]:
+    """Returns the latencies, the number of searches and the chunk IDs retrieved for each question."""
+    searches = store.search_calls
+    latencies, ids = [], []
+    for question in questions:
+        start = time.perf_counter()
+        docs = retriever.invoke(question)
+        latencies.append(time.perf_counter() - start)
+        ids.append([doc.id for doc in docs])
+    return latencies, store.search_calls - searches, ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval result cache benchmark.")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="Fake vector search latency per query.")
+    parser.add_argument("--repeats", type=int, default=5, help="Extra times each popular question is asked.")
+    args = parser.parse_args()
+
+    failures = []
+    questions = workload(args.repeats)
+    embeddings = CountingEmbeddings()
+    store = build_vectorstore(embeddings, latency=args.search_latency)
+    plain = build_retriever(store, k=4)
+
+    with tempfile.TemporaryDirectory() as persist_directory:
+        path = os.path.join(persist_directory, "retrieval_cache.sqlite")
+        cache = RetrievalCache(path, persist_directory=persist_directory)
+        cached = CachedRetriever(retriever=plain, cache=cache, namespace="k4")
+        # A second worker process: its own in-process LRU, the same file
+        worker = RetrievalCache(path, persist_directory=persist_directory)
+        other = CachedRetriever(retriever=plain, cache=worker, namespace="k4")
+
+        baseline = run(plain, store, questions)
+        phases = [("no cache", baseline), ("cache, first worker", run(cached, store, questions)),
+                  ("cache, second worker", run(other, store, questions))]
+        bump_collection_version(persist_directory)
+        phases.append(("after ingestion", run(cached, store, questions)))
+        stats, worker_stats = cache.stats(), worker.stats()
+
+    print(f"\n{len(questions)} lookups ({len(set(questions))} distinct questions), "
+          f"fake search latency {args.search_latency * 1000:.0f} ms")
+    print(f"{'phase':<24}{'searches':>10}{'p50 ms':>9}{'mean ms':>9}")
+    for name, (latencies, searches, ids) in phases:
+        print(f"{name:<24}{searches:>10}{percentile(latencies, 0.5) * 1000:>9.2f}"
+              f"{sum(latencies) / len(latencies) * 1000:>9.2f}")
+        if ids != baseline[2]:
+            failures.append(f"{name}: the cache returned different chunks")
+    print(f"\nfirst worker: {stats['memory_hits']} memory hits, {stats['disk_hits']} disk hits, "
+          f"{stats['misses']} misses, hit rate {stats['hit_rate']:.0%}")
+    print(f"second worker: {worker_stats['memory_hits']} memory hits, {worker_stats['disk_hits']} disk hits, "
+          f"{worker_stats['misses']} misses, hit rate {worker_stats['hit_rate']:.0%}")
+
+    distinct = len(set(questions))
+    if phases[1][1][1] != distinct or phases[2][1][1] != 0:
+        failures.append("repeated questions were searched again")
+    if phases[3][1][1] != distinct:
+        failures.append("results from before the collection changed were served")
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: each distinct question searched once per collection version, across workers.")
+
+
+if __name__ == "__main__":
+    main()
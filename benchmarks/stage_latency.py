@@ -0,0 +1,67 @@
+# benchmarks/stage_latency.py
+# Runs questions through a pipeline with a slow fake LLM and reports where the
+# time goes, from the per-stage histograms that tracing.py records. Prints one
+# structured trace line and the Prometheus metrics text as well.
+#
+#   python -m benchmarks.stage_latency [--runs 20] [--latency 0.2] [--stream]
+
+import argparse
+import logging
+
+from benchmarks.fakes import CountingEmbeddings, FakeLatencyChatModel, build_vectorstore
+from pipeline import RAGPipeline
+from tracing import REGISTRY, STAGE_SECONDS, TRACE_LOGGER_NAME
+
+QUESTIONS = ["replacement id card fees?", "How long is a temporary ID slip valid?",
+             "Where is the laundry on campus?", "Am I eligible for council tax exemption?"]
+
+
+class FirstRecord(logging.Handler):
+    """Keeps the first trace line logged."""
+
+    def __init__(self):
+        super().__init__()
+        self.message = None
+
+    def emit(self, record):
+        if self.message is None:
+            self.message = record.getMessage()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency breakdown of the RAG pipeline.")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency per call.")
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="Fake embedding latency per call.")
+    parser.add_argument("--stream", action="store_true", help="Stream the answers instead of invoking.")
+    parser.add_argument("--metrics", action="store_true", help="Also print the Prometheus metrics text.")
+    args = parser.parse_args()
+
+    trace_logger = logging.getLogger(TRACE_LOGGER_NAME)
+    trace_logger.setLevel(logging.INFO)
+    first = FirstRecord()
+    trace_logger.addHandler(first)
+
+    embeddings = CountingEmbeddings(latency=args.embed_latency)
+    llm = FakeLatencyChatModel(latency=args.latency, token_delay=0.01)
+    pipeline = RAGPipeline(embedding_function=embeddings, vectorstore=build_vectorstore(embeddings), llm=llm)
+
+    for i in range(args.runs):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        if args.stream:
+            for _ in pipeline.stream(question):
+                pass
+        else:
+            pipeline.invoke(question)
+
+    print(f"\nexample trace: {first.message}\n")
+    print(f"{'stage':<15}{'calls':>8}{'mean ms':>12}")
+    for (stage_name,), series in sorted(STAGE_SECONDS.snapshot().items(), key=lambda item: -item[1]["sum"]):
+        print(f"{stage_name:<15}{series['count']:>8}{series['sum'] / series['count'] * 1000:>12.2f}")
+    if args.metrics:
+        print()
+        print(REGISTRY.render())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/streaming_ttft.py
+# Measures time-to-first-token of RAGPipeline.stream / astream against the
+# blocking invoke, using a fake chat model that streams its reply word by word.
+#
+#   python -m benchmarks.streaming_ttft [--latency 0.5] [--token-delay 0.02]
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.fakes import CountingEmbeddings, FakeLatencyChatModel, build_vectorstore
+from pipeline import RAGPipeline
+
+REPLY = ("The fee for a replacement ID card is £10. Lost or stolen cards should be reported to "
+         "helpdesk@herts.ac.uk as soon as possible, and a stolen card with a crime reference number "
+         "is replaced free of charge at the Ask Herts Helpdesk.")
+
+
+def time_stream(pipeline, question):
+    start = time.perf_counter()
+    sources_at, first_token_at, text = None, None, []
+    for event in pipeline.stream(question):
+        if event["type"] == "sources":
+            sources_at = time.perf_counter() - start
+        elif first_token_at is None:
+            first_token_at = time.perf_counter() - start
+        if event["type"] == "token":
+            text.append(event["text"])
+    return sources_at, first_token_at, time.perf_counter() - start, "".join(text)
+
+
+async def time_astream(pipeline, question):
+    start = time.perf_counter()
+    first_token_at, text = None, []
+    async for event in pipeline.astream(question):
+        if event["type"] == "token":
+            if first_token_at is None:
+                first_token_at = time.perf_counter() - start
+            text.append(event["text"])
+    return first_token_at, time.perf_counter() - start, "".join(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming time-to-first-token benchmark.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake LLM delay before the first token.")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Fake LLM delay between tokens.")
+    args = parser.parse_args()
+
+    embeddings = CountingEmbeddings()
+    llm = FakeLatencyChatModel(reply=REPLY, latency=args.latency, token_delay=args.token_delay)
+    pipeline = RAGPipeline(embedding_function=embeddings, vectorstore=build_vectorstore(embeddings), llm=llm)
+    question = "replacement id card fees?"
+
+    start = time.perf_counter()
+    answer = pipeline.invoke(question)["answer"]
+    invoke_total = time.perf_counter() - start
+
+    sources_at, ttft, stream_total, streamed = time_stream(pipeline, question)
+    attft, astream_total, astreamed = asyncio.run(time_astream(pipeline, question))
+    assert streamed == answer == astreamed, "streamed answer differs from invoke"
+
+    print(f"invoke:  first token = full answer at {invoke_total * 1000:7.1f} ms")
+    print(f"stream:  sources at {sources_at * 1000:7.1f} ms, first token at {ttft * 1000:7.1f} ms, "
+          f"done at {stream_total * 1000:7.1f} ms")
+    print(f"astream: first token at {attft * 1000:7.1f} ms, done at {astream_total * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
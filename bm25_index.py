@@ -0,0 +1,185 @@
+# bm25_index.py
+
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+from langchain_core.documents import Document
+
+from config import BM25_B, BM25_K1
+
+# Stored next to the ChromaDB files; updated by ingestion whenever the collection changes.
+BM25_INDEX_FILENAME = "bm25_index.json"
+
+# Keeps e-mail addresses, URLs, prices ("£524") and codes ("07:00-23:00") as single terms
+_TOKEN_RE = re.compile(r"[\w£$€][\w£$€@.:/+'-]*")
+_TRAILING_PUNCTUATION = ".:/'-"
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into lower-case BM25 terms. Compound terms such as e-mail
+    addresses are kept whole and also split into their word parts, and a
+    price like "£524" also yields "524", so both exact and partial queries match.
+    """
+    terms = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        term = match.group().rstrip(_TRAILING_PUNCTUATION)
+        if not term:
+            continue
+        terms.append(term)
+        parts = re.findall(r"\w+", term)
+        if len(parts) > 1 or (parts and parts[0] != term):
+            terms.extend(parts)
+    return terms
+
+
+def _index_texts(documents: list[str], postings: dict, doc_lengths: list[int]):
+    """Appends documents to postings and doc_lengths, numbering them after the ones already there."""
+    for doc_index, text in enumerate(documents, start=len(doc_lengths)):
+        terms = tokenize(text)
+        doc_lengths.append(len(terms))
+        for term, frequency in Counter(terms).items():
+            postings[term].append([doc_index, frequency])
+
+
+class BM25Index:
+    """
+    An Okapi BM25 inverted index over the ingested chunks. It stores the chunk
+    texts and metadata too, so hits can be returned as Documents without a
+    round trip to ChromaDB.
+    """
+
+    def __init__(self, ids: list[str], documents: list[str], metadatas: list[dict],
+                 postings: dict, doc_lengths: list[int], k1: float = BM25_K1, b: float = BM25_B,
+                 collection_version: str | None = None):
+        """
+        Args:
+            collection_version: The collection version the index reflects
+                (see collection_version.py), if known.
+        """
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.collection_version = collection_version
+        self.avg_doc_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+        n = len(ids)
+        self.idf = {term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5)) for term, docs in postings.items()}
+
+    @classmethod
+    def build(cls, ids: list[str], documents: list[str], metadatas: list[dict]):
+        """Builds an index from parallel lists of chunk IDs, texts and metadata."""
+        postings = defaultdict(list)
+        doc_lengths = []
+        _index_texts(documents, postings, doc_lengths)
+        return cls(list(ids), list(documents), [dict(m or {}) for m in metadatas], dict(postings), doc_lengths)
+
+    @classmethod
+    def from_collection(cls, collection):
+        """Builds an index over every chunk stored in a ChromaDB collection."""
+        data = collection.get(include=["documents", "metadatas"])
+        return cls.build(data["ids"], data["documents"], data["metadatas"])
+
+    def updated(self, ids: list[str], documents: list[str], metadatas: list[dict], removed_ids=()):
+        """
+        Returns a copy of the index without the chunks in removed_ids and
+        with the given chunks added, replacing any with the same ID. Only
+        the added texts are tokenized.
+        """
+        replaced = set(removed_ids) | set(ids)
+        kept = [i for i, chunk_id in enumerate(self.ids) if chunk_id not in replaced]
+        positions = {old: new for new, old in enumerate(kept)}
+        postings = defaultdict(list)
+        for term, docs in self.postings.items():
+            remaining = [[positions[doc_index], frequency] for doc_index, frequency in docs if doc_index in positions]
+            if remaining:
+                postings[term] = remaining
+        doc_lengths = [self.doc_lengths[i] for i in kept]
+        _index_texts(documents, postings, doc_lengths)
+        return BM25Index(
+            [self.ids[i] for i in kept] + list(ids),
+            [self.documents[i] for i in kept] + list(documents),
+            [self.metadatas[i] for i in kept] + [dict(m or {}) for m in metadatas],
+            dict(postings), doc_lengths, k1=self.k1, b=self.b,
+        )
+
+    def save(self, path: str):
+        """Writes the index to path as JSON, replacing any previous file atomically."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1, "b": self.b, "ids": self.ids, "documents": self.documents,
+                "metadatas": self.metadatas, "doc_lengths": self.doc_lengths, "postings": self.postings,
+                "collection_version": self.collection_version,
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """Reads an index written by save."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["ids"], data["documents"], data["metadatas"], data["postings"],
+                   data["doc_lengths"], k1=data["k1"], b=data["b"],
+                   collection_version=data.get("collection_version"))
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Returns up to k (chunk position, score) pairs, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_index, frequency in self.postings[term]:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_index] / (self.avg_doc_length or 1)
+                scores[doc_index] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def search_documents(self, query: str, k: int) -> list[Document]:
+        """Like search, but returns the matching chunks as Documents."""
+        return [
+            Document(id=self.ids[i], page_content=self.documents[i], metadata=dict(self.metadatas[i]))
+            for i, _ in self.search(query, k)
+        ]
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_bm25_index(persist_directory: str):
+    """Returns the BM25 index that ingestion saved in persist_directory, or None if there is none."""
+    index_path = os.path.join(persist_directory, BM25_INDEX_FILENAME)
+    if not os.path.exists(index_path):
+        return None
+    return BM25Index.load(index_path)
+
+
+def refresh_bm25_index(collection, persist_directory: str, changed_ids, removed_ids, base_version: str,
+                       version: str) -> BM25Index:
+    """
+    Brings the BM25 index saved in persist_directory in step with the
+    collection after ingestion wrote changed_ids and deleted removed_ids,
+    and saves it as of collection version `version`.
+
+    If the saved index reflects base_version, the collection version before
+    those writes, only the changed chunks are read from the collection.
+    Otherwise the index is rebuilt from the whole collection.
+    """
+    index = load_bm25_index(persist_directory)
+    if index is None or index.collection_version != base_version:
+        index = BM25Index.from_collection(collection)
+    else:
+        changed_ids = list(changed_ids)
+        data = {"ids": [], "documents": [], "metadatas": []}
+        if changed_ids:
+            data = collection.get(ids=changed_ids, include=["documents", "metadatas"])
+        index = index.updated(data["ids"], data["documents"], data["metadatas"], [*changed_ids, *removed_ids])
+    index.collection_version = version
+    index.save(os.path.join(persist_directory, BM25_INDEX_FILENAME))
+    return index
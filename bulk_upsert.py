@@ -0,0 +1,197 @@
+# bulk_upsert.py
+
+import logging
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from config import (
+    EMBED_BATCH_MAX_CHUNKS,
+    EMBED_BATCH_MAX_TOKENS,
+    EMBED_MAX_CONCURRENCY,
+    EMBED_MAX_RETRIES,
+    EMBEDDING_MODEL_NAME,
+)
+from tokenization import make_token_counter
+
+
+def _status_code(error: Exception):
+    """The HTTP status code an error carries, either on itself or on its response."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for HTTP 429 / rate limit errors and transient 5xx or connection errors from the embedding API."""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    try:
+        import openai
+    except ImportError:
+        return False
+    # Timeouts and dropped connections carry no status code
+    return isinstance(error, (openai.RateLimitError, openai.APIConnectionError))
+
+
+def retry_after_seconds(error: Exception):
+    """Returns the server's Retry-After hint in seconds, if the error carries one."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+class BatchUpserter:
+    """
+    Streams chunks into a ChromaDB collection in token-budgeted batches.
+
+    Chunks are buffered until the next one would push the batch past
+    max_batch_tokens or max_batch_size. The batch is then embedded and
+    upserted on a worker thread, with at most max_concurrency batches in
+    flight. Rate-limited batches are retried with exponential backoff.
+    Only the current batch and the in-flight ones are held in memory, and a
+    failed batch is logged and dropped without affecting the others.
+
+    Pages are tracked as a unit: the on_written callback given to add_page
+    runs (in the caller's thread) once every chunk of that page has been
+    written, and never runs if any of its batches failed.
+    """
+
+    def __init__(self, collection, embedding_function,
+                 max_batch_tokens: int = EMBED_BATCH_MAX_TOKENS,
+                 max_batch_size: int = EMBED_BATCH_MAX_CHUNKS,
+                 max_concurrency: int = EMBED_MAX_CONCURRENCY,
+                 max_retries: int = EMBED_MAX_RETRIES,
+                 token_counter=None):
+        self.collection = collection
+        self.embedding_function = embedding_function
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.count_tokens = token_counter or make_token_counter(EMBEDDING_MODEL_NAME)
+
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._in_flight = {}
+        self._ids, self._texts, self._metadatas, self._pages = [], [], [], []
+        self._batch_tokens = 0
+        # page key -> [chunks not yet written, failed flag, on_written callback]
+        self._page_state = {}
+        self._next_page_key = 0
+
+        self.stats = {"chunks_written": 0, "chunks_failed": 0, "batches_written": 0,
+                      "batches_failed": 0, "retries": 0, "tokens": 0}
+
+    # --- batching ---
+
+    def add_page(self, ids: list[str], texts: list[str], metadatas: list[dict], on_written=None):
+        """
+        Queues the chunks of one page for embedding and upserting.
+
+        Args:
+            on_written: Optional callable run once all of the page's chunks
+                are stored. A page with no chunks counts as written at once.
+        """
+        if not ids:
+            if on_written:
+                on_written()
+            return
+
+        page_key = self._next_page_key
+        self._next_page_key += 1
+        self._page_state[page_key] = [len(ids), False, on_written]
+
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            tokens = self.count_tokens(text)
+            if self._ids and (self._batch_tokens + tokens > self.max_batch_tokens
+                              or len(self._ids) >= self.max_batch_size):
+                self.flush()
+            self._ids.append(chunk_id)
+            self._texts.append(text)
+            self._metadatas.append(metadata)
+            self._pages.append(page_key)
+            self._batch_tokens += tokens
+
+    def flush(self):
+        """Submits the buffered chunks as one batch, waiting for a free slot if needed."""
+        if not self._ids:
+            return
+        while len(self._in_flight) >= self.max_concurrency:
+            self._reap(block=True)
+
+        batch = (self._ids, self._texts, self._metadatas)
+        future = self._pool.submit(self._write_batch, *batch, self._batch_tokens)
+        self._in_flight[future] = (self._ids, self._pages)
+        self._ids, self._texts, self._metadatas, self._pages = [], [], [], []
+        self._batch_tokens = 0
+        self._reap(block=False)
+
+    def close(self) -> dict:
+        """Writes the remaining chunks, waits for every batch and returns the stats."""
+        try:
+            self.flush()
+            while self._in_flight:
+                self._reap(block=True)
+        finally:
+            self._pool.shutdown(wait=True)
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- workers ---
+
+    def _write_batch(self, ids, texts, metadatas, tokens):
+        """Embeds and upserts one batch, retrying on rate limits. Runs on a worker thread."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                embeddings = self.embedding_function(texts)
+                self.collection.upsert(ids=ids, documents=texts, metadatas=metadatas, embeddings=embeddings)
+                return tokens, attempt
+            except Exception as e:
+                if attempt == self.max_retries or not is_rate_limit_error(e):
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+                logging.warning(f"Embedding batch of {len(ids)} chunks rate limited; retrying in {delay:.1f}s "
+                                f"(attempt {attempt + 1}/{self.max_retries}).")
+                time.sleep(delay)
+
+    def _reap(self, block: bool):
+        """Collects finished batches and fires the callbacks of completed pages."""
+        if not self._in_flight:
+            return
+        done, _ = wait(list(self._in_flight), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            ids, pages = self._in_flight.pop(future)
+            try:
+                tokens, retries = future.result()
+                self.stats["chunks_written"] += len(ids)
+                self.stats["batches_written"] += 1
+                self.stats["retries"] += retries
+                self.stats["tokens"] += tokens
+                failed = False
+                logging.info(f"Upserted batch of {len(ids)} chunks ({tokens} tokens).")
+            except Exception as e:
+                self.stats["chunks_failed"] += len(ids)
+                self.stats["batches_failed"] += 1
+                failed = True
+                logging.error(f"Failed to embed/upsert batch of {len(ids)} chunks "
+                              f"({ids[0]} .. {ids[-1]}): {e}", exc_info=True)
+
+            for page_key in pages:
+                state = self._page_state[page_key]
+                state[0] -= 1
+                state[1] = state[1] or failed
+                if state[0] == 0:
+                    del self._page_state[page_key]
+                    if not state[1] and state[2]:
+                        state[2]()
@@ -0,0 +1,145 @@
+# chunking.py
+
+import re
+from typing import NamedTuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from config import CHUNK_OVERLAP, CHUNK_SIZE, CHUNKER, MAX_TABLE_CHUNK_SIZE
+
+CHUNKERS = ("structured", "recursive")
+
+# The table markers written by preprocess_html_content, in pandas and raw form
+TABLE_PATTERN = re.compile(
+    r"--- Start of Table ---.*?--- End of Table ---"
+    r"|--- Start of Raw Table Content ---.*?--- End of Raw Table Content ---",
+    re.DOTALL,
+)
+
+
+class Chunk(NamedTuple):
+    """A chunk of a page: text is exactly page_text[start_index:end_index]."""
+    text: str
+    start_index: int
+    end_index: int
+    section: str
+
+
+def _blocks(text: str, outline) -> list[tuple[int, int, str, str]]:
+    """
+    Cuts the page text at headings, list items and tables into
+    (start, end, kind, section) blocks, where section is the title of the
+    heading the block falls under.
+    """
+    tables = [match.span() for match in TABLE_PATTERN.finditer(text)]
+    cuts = {0: "text"}
+    for start, end in tables:
+        cuts[start] = "table"
+        cuts.setdefault(end, "text")
+    titles = {}
+    for offset, kind, title in outline or ():
+        # Headings and items inside a table belong to the table
+        if 0 <= offset < len(text) and not any(start <= offset < end for start, end in tables):
+            cuts[offset] = kind
+            if kind == "heading":
+                titles[offset] = title
+
+    blocks, section = [], ""
+    offsets = sorted(cuts)
+    for start, end in zip(offsets, offsets[1:] + [len(text)]):
+        section = titles.get(start, section)
+        if text[start:end].strip():
+            blocks.append((start, end, cuts[start], section))
+    return blocks
+
+
+def _trimmed(text: str, start: int, end: int, section: str) -> Chunk:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return Chunk(text[start:end], start, end, section)
+
+
+def structured_chunks(text: str, outline=None, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                      max_table_size: int = MAX_TABLE_CHUNK_SIZE) -> list[Chunk]:
+    """
+    Splits a preprocessed page along its structure.
+
+    Chunks start at headings: a section (a heading and the blocks up to the
+    next one) joins the current chunk only if it fits in whole. Within a
+    section, blocks (list items, tables and the text between them) are
+    packed into chunks of up to chunk_size characters without overlap, and
+    are never cut: a table longer than chunk_size becomes a chunk of its own.
+    Only blocks longer than chunk_size (or tables longer than max_table_size)
+    are split, with the recursive splitter and chunk_overlap. A chunk's
+    section is the title of the heading it starts under.
+
+    Args:
+        outline: (offset, kind, title) tuples for the page's headings and
+            list items, as filled in by html_engine.extract_text. Without
+            one, only tables are recognised.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                              length_function=len, add_start_index=True)
+    chunks = []
+    current = None  # (start, end, section) of the chunk being packed
+
+    def flush():
+        nonlocal current
+        if current:
+            chunks.append(_trimmed(text, *current))
+        current = None
+
+    def fits(start, end):
+        return len(text[start:end].strip()) <= chunk_size
+
+    sections = []
+    for block in _blocks(text, outline):
+        if block[2] == "heading" or not sections:
+            sections.append([])
+        sections[-1].append(block)
+
+    for blocks in sections:
+        if current and fits(current[0], blocks[-1][1]):
+            current = (current[0], blocks[-1][1], current[2])
+            continue
+        flush()
+        for start, end, kind, section in blocks:
+            if not fits(start, end) and (kind != "table" or len(text[start:end].strip()) > max_table_size):
+                flush()
+                for doc in splitter.create_documents([text[start:end]]):
+                    piece_start = start + doc.metadata["start_index"]
+                    chunks.append(_trimmed(text, piece_start, piece_start + len(doc.page_content), section))
+                continue
+            if current and not fits(current[0], end):
+                flush()
+            current = (current[0], end, current[2]) if current else (start, end, section)
+    flush()
+    return chunks
+
+
+def recursive_chunks(text: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> list[Chunk]:
+    """Splits a page with the plain recursive character splitter, ignoring its structure."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                              length_function=len, add_start_index=True)
+    chunks = []
+    for doc in splitter.create_documents([text]):
+        start = doc.metadata["start_index"]
+        chunks.append(Chunk(doc.page_content, start, start + len(doc.page_content), ""))
+    return chunks
+
+
+def chunk_page(text: str, outline=None, chunker: str = CHUNKER, chunk_size: int = CHUNK_SIZE,
+               chunk_overlap: int = CHUNK_OVERLAP) -> list[Chunk]:
+    """
+    Splits a preprocessed page into chunks.
+
+    Args:
+        chunker: "structured" (see structured_chunks) or "recursive".
+    """
+    if chunker == "structured":
+        return structured_chunks(text, outline, chunk_size, chunk_overlap)
+    if chunker == "recursive":
+        return recursive_chunks(text, chunk_size, chunk_overlap)
+    raise ValueError(f"Unknown chunker {chunker!r}; expected one of {CHUNKERS}.")
@@ -0,0 +1,39 @@
+# collection_version.py
+
+import json
+import os
+import time
+import uuid
+
+from config import CHROMA_PERSIST_DIRECTORY
+
+# Stored next to the ChromaDB files; rewritten whenever ingestion changes the collection.
+VERSION_FILENAME = "collection_version.json"
+
+
+def read_collection_version(persist_directory: str = CHROMA_PERSIST_DIRECTORY) -> str:
+    """
+    Returns the current version stamp of the collection in persist_directory,
+    or "0" if ingestion has never recorded one.
+    """
+    try:
+        with open(os.path.join(persist_directory, VERSION_FILENAME), encoding="utf-8") as f:
+            return json.load(f)["version"]
+    except (FileNotFoundError, KeyError, ValueError):
+        return "0"
+
+
+def bump_collection_version(persist_directory: str = CHROMA_PERSIST_DIRECTORY) -> str:
+    """
+    Records a new version stamp for the collection. Caches keyed on the
+    version treat everything stored under an older stamp as stale.
+    """
+    version = uuid.uuid4().hex
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, VERSION_FILENAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "updated_at": time.time()}, f)
+    # Atomic swap, so readers never see a half-written file
+    os.replace(tmp_path, path)
+    return version
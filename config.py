@@ -32,6 +32,24 @@ URLS = [
 CHROMA_PERSIST_DIRECTORY = "./askhertsdbopenai"
 # The name of the collection within ChromaDB.
 CHROMA_COLLECTION_NAME = "herts_info_collection"
+# Vector store queried by the pipeline: "chroma", or "flat" for the memory-mapped
+# NumPy index (flat_index.py) that ingestion exports next to the collection.
+VECTOR_STORE_BACKEND = "chroma"
+# Precision of the flat index vectors: "float32", or "float16" for half the size.
+FLAT_INDEX_DTYPE = "float32"
+# Compressed codes stored instead of the flat index matrix: None, "int8" (a quarter
+# of the float32 size) or "binary" (one bit per dimension). Their best matches are
+# re-scored with full-precision vectors fetched from ChromaDB by chunk ID.
+# On 20,000 x 1536 vectors (benchmarks/quantized_flat_index.py), with the fetch
+# from ChromaDB included, int8 queries take about 15 ms against 12 ms for float32;
+# binary ones take about 6 ms. The index shrinks from 117 MB to 29 MB (int8) or 4 MB (binary).
+FLAT_INDEX_QUANTIZATION = None
+# Dimensions kept in the compressed codes (None keeps all). OpenAI text-embedding-3
+# vectors can be truncated like this; most local models' vectors cannot. With
+# 512 of 1536 dimensions, int8 queries take about 6.5 ms, at 96% overlap with exact search.
+FLAT_INDEX_DIMENSIONS = None
+# The compressed scan keeps k times this many candidates for re-scoring.
+FLAT_INDEX_RESCORE_FACTOR = 4
 
 # --- RAG Model Settings ---
 # The embedding model to be used for both ingestion and retrieval.
@@ -39,11 +57,175 @@ EMBEDDING_MODEL_NAME = "text-embedding-3-small"
 # The language model to be used for generating answers.
 LLM_MODEL_NAME = "gpt-4o"
 
+# --- Embedding Provider Settings ---
+# "openai", "local" (sentence-transformers running on this machine) or "hashing"
+# (offline keyword-hash stub, e.g. "hashing-512", for tests and CI). None
+# picks OpenAI for text-embedding-* models and the local backend for anything
+# else, e.g. "BAAI/bge-large-en-v1.5" or "all-mpnet-base-v2".
+EMBEDDING_PROVIDER = None
+# Texts per forward pass of a local model.
+LOCAL_EMBEDDING_BATCH_SIZE = 32
+# CPU threads used by a local model; None uses every core.
+LOCAL_EMBEDDING_THREADS = None
+# "torch", "onnx" or "onnx-int8" (dynamically quantized ONNX). The ONNX
+# backends need `pip install optimum[onnxruntime]`.
+LOCAL_EMBEDDING_BACKEND = "torch"
+# Instruction set targeted by int8 quantization: "avx512_vnni", "avx512", "avx2" or "arm64".
+LOCAL_EMBEDDING_QUANTIZATION = "avx2"
+# Where quantized copies of local models are written when the model repo has none.
+LOCAL_EMBEDDING_MODEL_DIR = "./cache/models"
+
 # --- Text Splitter Settings ---
 CHUNK_SIZE = 600
 CHUNK_OVERLAP = 300
+# "structured" splits pages at headings, list items and tables and packs
+# them into chunks without overlap; CHUNK_OVERLAP then only applies inside
+# blocks longer than CHUNK_SIZE (see chunking.py). "recursive" is the plain
+# character splitter.
+CHUNKER = "structured"
+# Tables up to this many characters are kept in one chunk.
+MAX_TABLE_CHUNK_SIZE = 3000
 
 # --- Retriever Settings ---
 # The number of top documents to retrieve from the vector store.
 K_RETRIEVER = 8
+# Fuse dense vector hits with BM25 keyword hits (reciprocal rank fusion).
+# Needs the BM25 index that ingestion.py writes next to the ChromaDB files.
+HYBRID_RETRIEVAL = True
+# Chunks fetched from each of the vector and BM25 searches before fusion.
+HYBRID_CANDIDATES = 20
+# Reciprocal rank fusion constant; larger values flatten the rank weighting.
+RRF_K = 60
+# BM25 term-frequency saturation and length normalization parameters.
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# --- Reranker Settings ---
+# Rerank retrieved chunks with a local cross-encoder on the CPU (see
+# reranker.py): the retriever fetches RERANK_CANDIDATES chunks and the
+# RERANK_TOP_N best-scoring ones go into the prompt.
+RERANK_ENABLED = False
+RERANKER_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_CANDIDATES = 20
+RERANK_TOP_N = 5
+# (question, chunk) pairs scored per forward pass.
+RERANK_BATCH_SIZE = 16
+# When scoring a question's candidates takes longer than this, the retrieval
+# order is kept instead. Set to None to always wait for the scores.
+RERANK_LATENCY_BUDGET_MS = 300
+# (question, chunk) scores kept in memory; the least recently used are evicted.
+RERANK_CACHE_SIZE = 20000
+
+# --- Prompt Context Settings ---
+# Maximum tokens of retrieved context put into the prompt, counted locally
+# with the LLM's tokenizer. Overlapping chunks from the same page are merged
+# first. Set to None to keep every merged passage.
+CONTEXT_TOKEN_BUDGET = 1500
+# A passage is dropped when its word-shingle overlap with a higher-ranked
+# passage reaches this fraction.
+CONTEXT_DEDUP_THRESHOLD = 0.8
+
+
+# --- Evaluation Settings ---
+# How many evaluation questions are sent through the pipeline at the same time.
+EVAL_MAX_CONCURRENCY = 4
+# LLM calls in flight at once when RAGPipeline.batch answers a list of questions.
+BATCH_MAX_CONCURRENCY = 8
+
+# --- Cache Settings ---
+# Disk-backed cache of question embeddings, so repeated questions skip the
+# embedding API. Set the path to None to disable it.
+QUERY_EMBEDDING_CACHE_PATH = "./cache/query_embeddings.sqlite"
+# Maximum number of cached questions; the least recently used are evicted.
+QUERY_EMBEDDING_CACHE_SIZE = 10000
+# Cache hits record their last-used time in memory and write it to disk in
+# one batch at most this often (or before the next insert), not on every hit.
+CACHE_RECENCY_FLUSH_SECONDS = 30.0
+# Semantic answer cache: a question whose embedding is at least this
+# cosine-similar to a cached question reuses its stored answer and contexts.
+# Set the path to None to disable it.
+ANSWER_CACHE_PATH = "./cache/answer_cache.sqlite"
+ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.95
+# Cached answers expire after this many seconds.
+ANSWER_CACHE_TTL_SECONDS = 7 * 24 * 3600
+# Maximum number of cached answers; the oldest are evicted first.
+ANSWER_CACHE_MAX_ENTRIES = 5000
+# Pre-generated answers to a curated set of frequent questions, built by
+# `python faq_index.py` and checked before the answer cache. A question at
+# least this cosine-similar to a canonical one gets its stored answer with
+# no LLM call. The answers are dropped when ingestion changes the collection
+# and regenerated by the next faq_index.py (or ingestion.py) run. Set the path
+# to None to disable it.
+FAQ_INDEX_PATH = "./cache/faq_index.sqlite"
+FAQ_SIMILARITY_THRESHOLD = 0.9
+# Retrieval result cache: the chunks retrieved for a normalized question are
+# reused until ingestion changes the collection. An in-process LRU sits in
+# front of a SQLite file that all worker processes share. Set the path to
+# None to keep only the in-process tier.
+RETRIEVAL_CACHE_ENABLED = True
+RETRIEVAL_CACHE_PATH = "./cache/retrieval_cache.sqlite"
+# Questions kept in each process's LRU.
+RETRIEVAL_CACHE_MEMORY_ENTRIES = 1000
+# Questions kept on disk; the least recently used are evicted.
+RETRIEVAL_CACHE_MAX_ENTRIES = 20000
+
+# --- Ingestion Settings ---
+# HTML preprocessing engine: "lxml" (about 1.5x faster; falls back to the legacy engine for
+# pages it cannot reproduce exactly) or "html.parser" (the legacy BeautifulSoup
+# engine). Both produce the same text.
+HTML_ENGINE = "lxml"
+# Fetch pages on a thread pool and preprocess them on a process pool.
+INGEST_PARALLEL = True
+# Concurrent HTTP requests (and pooled connections).
+INGEST_FETCH_WORKERS = 8
+# Preprocessing processes; None uses one per CPU core.
+INGEST_PARSE_WORKERS = None
+# Fetched pages allowed to wait for preprocessing before fetchers block.
+INGEST_QUEUE_SIZE = 32
+# Re-embed only new or changed chunks, using a manifest of content hashes kept
+# next to the ChromaDB files. Set to False to re-embed every page on every run.
+INGEST_INCREMENTAL = True
+# Embedding requests during ingestion are batched up to this many tokens
+# (counted locally with tiktoken) or chunks, whichever comes first.
+EMBED_BATCH_MAX_TOKENS = 50000
+EMBED_BATCH_MAX_CHUNKS = 512
+# Embedding batches in flight at once.
+EMBED_MAX_CONCURRENCY = 4
+# Retries, with exponential backoff, for batches that hit rate limits (HTTP 429).
+EMBED_MAX_RETRIES = 6
+
+# --- Crawler Settings ---
+# `python ingestion.py --crawl` starts from URLS and follows links to discover
+# more pages (see crawler.py). Hosts it may follow links to; None allows the
+# hosts of the seed URLs.
+CRAWL_ALLOWED_HOSTS = None
+# Minimum seconds between two requests to the same host. A longer Crawl-delay
+# in the host's robots.txt wins.
+CRAWL_DELAY_SECONDS = 1.0
+# Link hops followed from the seed URLs; None follows links without limit.
+CRAWL_MAX_DEPTH = 3
+# Pages fetched per run. A crawl that stops at the cap resumes from its saved
+# frontier on the next run.
+CRAWL_MAX_PAGES = 500
+
+# --- Tracing Settings ---
+# Record per-stage timings and token counts of every pipeline call (see tracing.py).
+TRACING_ENABLED = True
+
+# --- Server Settings ---
+# Address of the HTTP query service (server.py).
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+# Pipeline calls (retrieval + LLM) running at once; further requests wait.
+SERVER_MAX_CONCURRENCY = 8
+# Requests allowed to wait for a slot before new ones are refused with HTTP 503.
+SERVER_MAX_PENDING = 64
 
+# --- Experiment Settings ---
+# Where experiments.py keeps the parsed pages and one index per variant.
+EXPERIMENT_DIR = "./experiments"
+# Variants evaluated at the same time.
+EXPERIMENT_MAX_PARALLEL_VARIANTS = 4
+# USD per million prompt / completion tokens of LLM_MODEL_NAME, for cost estimates.
+LLM_PRICE_PER_1M_INPUT_TOKENS = 2.50
+LLM_PRICE_PER_1M_OUTPUT_TOKENS = 10.00
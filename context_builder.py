@@ -0,0 +1,146 @@
+# context_builder.py
+
+from config import CONTEXT_DEDUP_THRESHOLD, CONTEXT_TOKEN_BUDGET, LLM_MODEL_NAME
+from tokenization import get_encoding
+
+# Shortest suffix/prefix match accepted as chunk overlap when offsets are missing
+MIN_OVERLAP_CHARS = 20
+# A passage cut to fit the budget must keep at least this many tokens, else it is dropped
+MIN_TRUNCATED_TOKENS = 40
+
+def count_tokens(text: str, model_name: str = LLM_MODEL_NAME) -> int:
+    """Counts tokens with the tokenizer of the LLM model_name."""
+    return len(get_encoding(model_name).encode(text, disallowed_special=()))
+
+
+def _suffix_prefix_overlap(left: str, right: str) -> int:
+    """Returns the length of the longest suffix of left that is also a prefix of right."""
+    for size in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge_source(docs_with_rank):
+    """
+    Merges the chunks of one page into passages. Chunks are ordered by their
+    start offset (falling back to chunk_index) and joined wherever they
+    overlap or touch, so text shared by neighbouring chunks appears once.
+    """
+    def position(item):
+        meta = item[1].metadata
+        return (meta.get("start_index", -1), meta.get("chunk_index", 0))
+
+    passages = []
+    for rank, doc in sorted(docs_with_rank, key=position):
+        meta = doc.metadata
+        start = meta.get("start_index")
+        text = doc.page_content
+        if passages:
+            last = passages[-1]
+            if start is not None and last["end"] is not None and start <= last["end"]:
+                # Offsets known: append only the part past the end of the passage
+                overlap = last["end"] - start
+                if start + len(text) > last["end"]:
+                    last["text"] += text[overlap:]
+                    last["end"] = start + len(text)
+                last["rank"] = min(last["rank"], rank)
+                last["chunk_indices"].append(meta.get("chunk_index"))
+                continue
+            last_index = last["chunk_indices"][-1]
+            if start is None and isinstance(last_index, int) and meta.get("chunk_index") == last_index + 1:
+                # No offsets: neighbouring chunks share their overlap verbatim
+                overlap = _suffix_prefix_overlap(last["text"], text)
+                if overlap:
+                    last["text"] += text[overlap:]
+                    last["rank"] = min(last["rank"], rank)
+                    last["chunk_indices"].append(meta.get("chunk_index"))
+                    continue
+        passages.append({
+            "text": text,
+            "rank": rank,
+            "source": meta.get("source"),
+            "start_index": start,
+            "end": start + len(text) if start is not None else None,
+            "chunk_indices": [meta.get("chunk_index")],
+        })
+    return passages
+
+
+def _shingles(text: str, size: int = 5) -> set:
+    words = text.lower().split()
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _is_near_duplicate(shingles: set, kept: list, threshold: float) -> bool:
+    for other in kept:
+        overlap = len(shingles & other)
+        if not overlap:
+            continue
+        # Jaccard similarity, or containment of the smaller passage in the larger
+        if overlap / len(shingles | other) >= threshold or overlap / min(len(shingles), len(other)) >= threshold:
+            return True
+    return False
+
+
+def build_context(docs, token_budget: int | None = CONTEXT_TOKEN_BUDGET,
+                  dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD, model_name: str = LLM_MODEL_NAME) -> dict:
+    """
+    Turns retrieved chunks into the context block of the prompt.
+
+    Overlapping chunks from the same source are merged into single passages,
+    near-duplicate passages are dropped, and passages are added in retrieval
+    rank order until token_budget (counted with the LLM's tokenizer) is used
+    up, truncating the last one if worthwhile.
+
+    Args:
+        model_name: The LLM the context is for; its tokenizer counts the budget.
+
+    Returns:
+        A dict with the context "text", the "passages" used (text, source,
+        chunk indices) and token stats: "tokens_before" (what joining every
+        chunk verbatim would cost), "tokens" and "tokens_saved".
+    """
+    verbatim = "\n\n".join(doc.page_content for doc in docs)
+    tokens_before = count_tokens(verbatim, model_name)
+
+    # 1. Merge overlapping chunks page by page
+    by_source = {}
+    for rank, doc in enumerate(docs):
+        by_source.setdefault(doc.metadata.get("source"), []).append((rank, doc))
+    passages = [p for group in by_source.values() for p in _merge_source(group)]
+    passages.sort(key=lambda p: p["rank"])
+
+    # 2. Drop near-duplicates and 3. fill the token budget in rank order
+    kept, kept_shingles, used = [], [], 0
+    separator_tokens = count_tokens("\n\n", model_name)
+    for passage in passages:
+        shingles = _shingles(passage["text"])
+        if _is_near_duplicate(shingles, kept_shingles, dedup_threshold):
+            continue
+        tokens = count_tokens(passage["text"], model_name)
+        cost = tokens + (separator_tokens if kept else 0)
+        if token_budget is not None and used + cost > token_budget:
+            remaining = token_budget - used - (separator_tokens if kept else 0)
+            if remaining >= MIN_TRUNCATED_TOKENS:
+                encoding = get_encoding(model_name)
+                passage["text"] = encoding.decode(encoding.encode(passage["text"], disallowed_special=())[:remaining])
+                kept.append(passage)
+            break
+        kept.append(passage)
+        kept_shingles.append(shingles)
+        used += cost
+
+    text = "\n\n".join(p["text"] for p in kept)
+    tokens = count_tokens(text, model_name)
+    return {
+        "text": text,
+        "passages": [
+            {"text": p["text"], "source": p["source"], "chunk_index": p["chunk_indices"][0],
+             "chunk_indices": p["chunk_indices"], "start_index": p["start_index"]}
+            for p in kept
+        ],
+        "tokens_before": tokens_before,
+        "tokens": tokens,
+        "tokens_saved": tokens_before - tokens,
+    }
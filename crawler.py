@@ -0,0 +1,346 @@
+# crawler.py
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+from lxml import etree
+
+from config import (
+    CHROMA_PERSIST_DIRECTORY,
+    CRAWL_ALLOWED_HOSTS,
+    CRAWL_DELAY_SECONDS,
+    CRAWL_MAX_DEPTH,
+    CRAWL_MAX_PAGES,
+    INGEST_FETCH_WORKERS,
+)
+from ingest_manifest import content_hash
+
+# Stored next to the ChromaDB files, like the ingest manifest
+FRONTIER_FILENAME = "crawl_frontier.sqlite"
+
+# Links to these are never followed: they are not pages
+SKIPPED_EXTENSIONS = (".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".zip",
+                      ".jpg", ".jpeg", ".png", ".gif", ".svg", ".mp3", ".mp4", ".css", ".js")
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMETERS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Returned by Crawler._fetch for URLs robots.txt disallows
+_BLOCKED = object()
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Returns the canonical form of url, so the same page linked in different
+    ways is crawled once: lower-case scheme and host, no default port or
+    fragment, no trailing slash, and the query sorted without tracking
+    parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    netloc = host if parts.port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if path != "/":
+        path = path.rstrip("/")
+    query = urlencode(sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if not key.lower().startswith(TRACKING_PARAMETERS)))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def extract_links(html_content: str, base_page_url: str) -> tuple[list[str], str | None]:
+    """
+    Returns the absolute URLs of every link on a page, resolved with urljoin
+    the way preprocess_html_content resolves them, and the page's
+    <link rel="canonical"> URL if it declares one.
+    """
+    try:
+        # Bytes, because lxml refuses a str that carries an XML encoding declaration
+        root = etree.fromstring(html_content.encode("utf-8"), etree.HTMLParser(encoding="utf-8", huge_tree=True))
+    except etree.LxmlError:
+        return [], None
+    if root is None:
+        return [], None
+    links = []
+    for href in root.xpath("//a/@href"):
+        href = href.strip()
+        if href and not href.startswith(("#", "mailto:", "tel:", "javascript:")):
+            links.append(urljoin(base_page_url, href))
+    canonical = root.xpath("//link[@rel='canonical']/@href")
+    return links, urljoin(base_page_url, canonical[0].strip()) if canonical else None
+
+
+class HostThrottle:
+    """
+    Spaces the requests to each host at least delay seconds apart. Each
+    caller reserves the next free slot for its host, then sleeps until it.
+    """
+
+    def __init__(self, delay: float = CRAWL_DELAY_SECONDS):
+        self.delay = delay
+        self._host_delays = {}
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def set_delay(self, host: str, delay: float):
+        """Uses a longer delay for one host, e.g. its robots.txt Crawl-delay."""
+        with self._lock:
+            self._host_delays[host] = max(self.delay, delay)
+
+    def wait(self, host: str):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self._host_delays.get(host, self.delay)
+        time.sleep(slot - now)
+
+
+class CrawlFrontier:
+    """
+    The crawl's persistent state: every URL found so far with its link
+    depth, its status ("pending", "done", "failed", "duplicate" or
+    "blocked") and the hash of its text once fetched.
+
+    A crawl that stops with pages still pending (interrupted, or at the page
+    cap) is resumed by the next one. Once nothing is pending, the next crawl
+    starts afresh from the seeds.
+    """
+
+    def __init__(self, persist_directory: str = CHROMA_PERSIST_DIRECTORY):
+        os.makedirs(persist_directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(persist_directory, FRONTIER_FILENAME))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            " url TEXT PRIMARY KEY, depth INTEGER NOT NULL, status TEXT NOT NULL, content_hash TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_frontier_status ON frontier (status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_frontier_content_hash ON frontier (content_hash)")
+        self._conn.commit()
+
+    def start(self, seeds: list[str]) -> list[tuple[str, int]]:
+        """Adds the seeds and returns the pending (url, depth) pairs, shallowest first."""
+        pending = self.pending()
+        if pending:
+            logging.info(f"Resuming the previous crawl with {pending} pages still pending.")
+        else:
+            self._conn.execute("DELETE FROM frontier")
+        for url in seeds:
+            self.add(url, 0)
+        return self._conn.execute(
+            "SELECT url, depth FROM frontier WHERE status = 'pending' ORDER BY depth, rowid"
+        ).fetchall()
+
+    def add(self, url: str, depth: int) -> bool:
+        """Records a newly found URL as pending. Returns False if it was already known."""
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO frontier (url, depth, status, updated_at) VALUES (?, ?, 'pending', ?)",
+            (url, depth, time.time()),
+        )
+        self._conn.commit()
+        return cursor.rowcount == 1
+
+    def mark(self, url: str, status: str, page_hash: str | None = None):
+        self._conn.execute(
+            "UPDATE frontier SET status = ?, content_hash = ?, updated_at = ? WHERE url = ?",
+            (status, page_hash, time.time(), url),
+        )
+        self._conn.commit()
+
+    def find_hash(self, page_hash: str) -> str | None:
+        """Returns the crawled URL whose text has this hash, if any."""
+        row = self._conn.execute(
+            "SELECT url FROM frontier WHERE content_hash = ? AND status = 'done' LIMIT 1", (page_hash,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def pending(self) -> int:
+        """Returns the number of URLs found but not fetched yet."""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM frontier WHERE status = 'pending'").fetchone()
+        return count
+
+    def listed_urls(self) -> list[str]:
+        """Returns the URLs whose pages belong in the collection: all but duplicates and blocked ones."""
+        rows = self._conn.execute("SELECT url FROM frontier WHERE status IN ('pending', 'done', 'failed')")
+        return [url for (url,) in rows]
+
+    def counts(self) -> dict:
+        """Returns the number of URLs in each status."""
+        return dict(self._conn.execute("SELECT status, COUNT(*) FROM frontier GROUP BY status").fetchall())
+
+
+def crawled_urls(persist_directory: str = CHROMA_PERSIST_DIRECTORY) -> list[str]:
+    """Returns the listed URLs of the crawl saved in persist_directory, or [] if it was never crawled."""
+    if not os.path.exists(os.path.join(persist_directory, FRONTIER_FILENAME)):
+        return []
+    return CrawlFrontier(persist_directory).listed_urls()
+
+
+class Crawler:
+    """
+    Discovers pages by following links from a list of seed URLs, breadth
+    first and within the allowed hosts.
+
+    URLs are canonicalized before they are queued, and a page whose text
+    matches an already crawled page (or whose rel="canonical" points
+    elsewhere) is skipped as a duplicate. Requests to each host are spaced
+    by the politeness delay and robots.txt is honoured. The frontier is
+    saved as the crawl goes, so an interrupted crawl resumes where it
+    stopped.
+    """
+
+    def __init__(self, seeds: list[str], persist_directory: str = CHROMA_PERSIST_DIRECTORY,
+                 allowed_hosts: list[str] | None = CRAWL_ALLOWED_HOSTS, delay: float = CRAWL_DELAY_SECONDS,
+                 max_depth: int | None = CRAWL_MAX_DEPTH, max_pages: int | None = CRAWL_MAX_PAGES,
+                 workers: int = INGEST_FETCH_WORKERS, user_agent: str = "*"):
+        """
+        Args:
+            allowed_hosts: Hosts whose links are followed; None allows the
+                hosts of the seeds.
+            workers: Pages fetched at once. Requests to one host are still
+                spaced by delay.
+        """
+        self.seeds = [canonicalize_url(url) for url in seeds]
+        self.allowed_hosts = set(allowed_hosts or (urlsplit(url).hostname for url in self.seeds))
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.workers = workers
+        self.user_agent = user_agent
+        self.frontier = CrawlFrontier(persist_directory)
+        self.throttle = HostThrottle(delay)
+        self.session = None
+        self._robots = {}
+        # Guards _robot_locks; each origin's robots.txt is fetched under its own lock
+        self._robots_lock = threading.Lock()
+        self._robot_locks = {}
+        self.fetched = 0
+
+    def in_scope(self, url: str) -> bool:
+        """True if url is an http(s) page on an allowed host."""
+        parts = urlsplit(url)
+        return (parts.scheme in ("http", "https") and parts.hostname in self.allowed_hosts
+                and not parts.path.lower().endswith(SKIPPED_EXTENSIONS))
+
+    def _robots_for(self, url: str) -> RobotFileParser:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        robots = self._robots.get(origin)
+        if robots is not None:
+            return robots
+        with self._robots_lock:
+            lock = self._robot_locks.setdefault(origin, threading.Lock())
+        # Only fetches for the same origin wait for its robots.txt
+        with lock:
+            robots = self._robots.get(origin)
+            if robots is not None:
+                return robots
+            robots = RobotFileParser(f"{origin}/robots.txt")
+            self.throttle.wait(parts.hostname)
+            try:
+                response = self.session.get(robots.url, headers={"User-Agent": self.user_agent}, timeout=10)
+                if response.status_code >= 400:
+                    robots.allow_all = True
+                else:
+                    robots.parse(response.text.splitlines())
+            except requests.exceptions.RequestException as e:
+                logging.warning(f"Could not read {robots.url}: {e}. Crawling without it.")
+                robots.allow_all = True
+            delay = robots.crawl_delay(self.user_agent)
+            if delay:
+                self.throttle.set_delay(parts.hostname, float(delay))
+            self._robots[origin] = robots
+            return robots
+
+    def _fetch(self, fetch, url: str):
+        if not self._robots_for(url).can_fetch(self.user_agent, url):
+            return _BLOCKED
+        self.throttle.wait(urlsplit(url).hostname)
+        return fetch(url)
+
+    def crawl(self, fetch, preprocess, session: requests.Session | None = None):
+        """
+        Crawls from the seeds, yielding each new page as soon as it is fetched
+        and preprocessed, so later stages can start before the crawl ends.
+
+        Args:
+            fetch: Callable mapping a URL to a FetchedPage-like object with
+                .url and .html, or None if the fetch failed.
+            preprocess: Callable mapping (html, url) to (text, outline).
+            session: The session robots.txt is fetched with, normally the
+                one fetch uses, so it shares its connection pool; by
+                default a new one.
+
+        Yields:
+            (fetched, text, outline) for every page that is not a duplicate.
+            A page is marked done in the frontier once the consumer asks
+            for the next one.
+        """
+        self.session = session or requests.Session()
+        queued = deque(self.frontier.start(self.seeds))
+        in_flight = {}
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while queued or in_flight:
+                while queued and len(in_flight) < self.workers and (
+                        self.max_pages is None or self.fetched < self.max_pages):
+                    url, depth = queued.popleft()
+                    in_flight[pool.submit(self._fetch, fetch, url)] = (url, depth)
+                    self.fetched += 1
+                if not in_flight:
+                    logging.info(f"Stopping at the limit of {self.max_pages} pages; the next crawl resumes here.")
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    try:
+                        fetched = future.result()
+                    except Exception as e:
+                        logging.error(f"Error fetching URL {url}: {e}")
+                        fetched = None
+                    if fetched is _BLOCKED:
+                        logging.info(f"Disallowed by robots.txt: {url}")
+                        self.frontier.mark(url, "blocked")
+                        continue
+                    if fetched is None or fetched.html is None:
+                        self.frontier.mark(url, "failed")
+                        continue
+
+                    links, canonical = extract_links(fetched.html, url)
+                    if canonical is not None and self.in_scope(canonical):
+                        canonical = canonicalize_url(canonical)
+                        if canonical != url:
+                            logging.info(f"Duplicate of its canonical URL {canonical}: {url}")
+                            if self.frontier.add(canonical, depth):
+                                queued.append((canonical, depth))
+                            self.frontier.mark(url, "duplicate")
+                            continue
+                    try:
+                        text, outline = preprocess(fetched.html, url)
+                    except Exception as e:
+                        logging.error(f"Error processing content from {url}: {e}", exc_info=True)
+                        self.frontier.mark(url, "failed")
+                        continue
+                    page_hash = content_hash(text) if text else None
+                    original = self.frontier.find_hash(page_hash) if page_hash else None
+                    if original is not None:
+                        logging.info(f"Same content as {original}, skipping: {url}")
+                        self.frontier.mark(url, "duplicate", page_hash)
+                        continue
+
+                    if self.max_depth is None or depth < self.max_depth:
+                        for link in links:
+                            link = canonicalize_url(link)
+                            if self.in_scope(link) and self.frontier.add(link, depth + 1):
+                                queued.append((link, depth + 1))
+                    yield fetched, text, outline
+                    self.frontier.mark(url, "done", page_hash)
+        finally:
+            # Fetches not yet started stay pending in the frontier for the next crawl
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,167 @@
+# embedding_cache.py
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+from config import CACHE_RECENCY_FLUSH_SECONDS, QUERY_EMBEDDING_CACHE_PATH, QUERY_EMBEDDING_CACHE_SIZE
+
+
+def normalize_question(text: str) -> str:
+    """Lower-cases a question and collapses its whitespace, for use as a cache key."""
+    return " ".join(text.lower().split())
+
+
+def embed_queries(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    """
+    Embeds several queries in one call. Uses the model's embed_queries when
+    it has one (models with a query prompt, caches), else embed_documents,
+    which gives the same vectors as embed_query for symmetric models such as
+    OpenAI's.
+    """
+    if not texts:
+        return []
+    batch = getattr(embeddings, "embed_queries", None)
+    if batch is None:
+        return embeddings.embed_documents(list(texts))
+    return batch(list(texts))
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps an embedding function with a persistent SQLite cache for query
+    embeddings, keyed by model name and normalized question text.
+
+    The cache holds at most max_entries questions and evicts the least
+    recently used ones. Document embeddings are passed straight through.
+    A hit only reads the disk: its last-used time is written later, in a
+    batch with the others (see CACHE_RECENCY_FLUSH_SECONDS).
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 path: str = QUERY_EMBEDDING_CACHE_PATH, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE,
+                 recency_flush_seconds: float = CACHE_RECENCY_FLUSH_SECONDS):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.recency_flush_seconds = recency_flush_seconds
+        self.hits = 0
+        self.misses = 0
+        # question -> last hit time, not yet written to disk
+        self._touched = {}
+        self._last_flush = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL without fsync-per-commit keeps a cache hit well under a millisecond
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            " model TEXT NOT NULL, question TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, question))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used ON query_embeddings (last_used)")
+        self._conn.commit()
+
+    def _get(self, question: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector FROM query_embeddings WHERE model = ? AND question = ?",
+                (self.model_name, question),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._touched[question] = time.time()
+            if time.monotonic() - self._last_flush >= self.recency_flush_seconds:
+                self._write_recency()
+                self._conn.commit()
+            self.hits += 1
+        return array("d", row[0]).tolist()
+
+    def _write_recency(self):
+        """Writes the pending last-used times; the caller holds the lock and commits."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE query_embeddings SET last_used = ? WHERE model = ? AND question = ?",
+                [(used, self.model_name, question) for question, used in self._touched.items()],
+            )
+            self._touched.clear()
+        self._last_flush = time.monotonic()
+
+    def _put(self, question: str, vector: list[float]):
+        with self._lock:
+            # Eviction below must see every hit since the last flush
+            self._write_recency()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (model, question, vector, last_used) VALUES (?, ?, ?, ?)",
+                (self.model_name, question, array("d", vector).tobytes(), time.time()),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM query_embeddings WHERE rowid IN ("
+                    " SELECT rowid FROM query_embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def flush(self):
+        """Writes the last-used times of recent hits to disk now."""
+        with self._lock:
+            self._write_recency()
+            self._conn.commit()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        question = normalize_question(text)
+        vector = self._get(question)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._put(question, vector)
+        return vector
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        questions = [normalize_question(text) for text in texts]
+        vectors = [self._get(question) for question in questions]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        # All the misses go to the model in one call
+        for i, vector in zip(missing, embed_queries(self.embeddings, [texts[i] for i in missing])):
+            vectors[i] = vector
+            self._put(questions[i], vector)
+        return vectors
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        question = normalize_question(text)
+        # SQLite calls block, so they run on a worker thread rather than the event loop
+        vector = await asyncio.to_thread(self._get, question)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            await asyncio.to_thread(self._put, question, vector)
+        return vector
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters and the current number of cached questions."""
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": size,
+        }
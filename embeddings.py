@@ -0,0 +1,209 @@
+# embeddings.py
+
+import hashlib
+import math
+import os
+import threading
+from collections import Counter
+
+from langchain_core.embeddings import Embeddings
+
+from bm25_index import tokenize
+from config import (
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_PROVIDER,
+    LOCAL_EMBEDDING_BACKEND,
+    LOCAL_EMBEDDING_BATCH_SIZE,
+    LOCAL_EMBEDDING_MODEL_DIR,
+    LOCAL_EMBEDDING_QUANTIZATION,
+    LOCAL_EMBEDDING_THREADS,
+)
+
+PROVIDERS = ("openai", "local", "hashing")
+LOCAL_BACKENDS = ("torch", "onnx", "onnx-int8")
+# Collection metadata key recording which embedding model built the collection
+COLLECTION_MODEL_KEY = "embedding_model"
+
+
+def resolve_provider(model_name: str = EMBEDDING_MODEL_NAME, provider: str | None = EMBEDDING_PROVIDER) -> str:
+    """Returns the provider for model_name, inferring it from the name when provider is None."""
+    if provider is None:
+        if model_name.startswith("text-embedding-"):
+            provider = "openai"
+        elif model_name.startswith("hashing-"):
+            provider = "hashing"
+        else:
+            provider = "local"
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown embedding provider {provider!r}; expected one of {PROVIDERS}.")
+    return provider
+
+
+def embedding_model_id(model_name: str = EMBEDDING_MODEL_NAME, provider: str | None = EMBEDDING_PROVIDER) -> str:
+    """Identifies an embedding space, e.g. "openai:text-embedding-3-small", for collection metadata."""
+    return f"{resolve_provider(model_name, provider)}:{model_name}"
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Embeds text with a sentence-transformers model on the CPU.
+
+    Texts are encoded in batches of batch_size, longest first, across
+    `threads` CPU threads. The backend can be plain PyTorch, ONNX Runtime,
+    or ONNX with dynamic int8 quantization for faster inference at a small
+    cost in accuracy. The model is loaded on first use. Calls are serialized,
+    because each one already uses every configured thread.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE,
+                 backend: str = LOCAL_EMBEDDING_BACKEND, threads: int | None = LOCAL_EMBEDDING_THREADS,
+                 quantization: str = LOCAL_EMBEDDING_QUANTIZATION, model_dir: str = LOCAL_EMBEDDING_MODEL_DIR):
+        if backend not in LOCAL_BACKENDS:
+            raise ValueError(f"Unknown local embedding backend {backend!r}; expected one of {LOCAL_BACKENDS}.")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.backend = backend
+        self.threads = threads
+        self.quantization = quantization
+        self.model_dir = model_dir
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _onnx_kwargs(self, file_name: str | None = None) -> dict:
+        model_kwargs = {"provider": "CPUExecutionProvider"}
+        if file_name:
+            model_kwargs["file_name"] = file_name
+        if self.threads:
+            import onnxruntime
+
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = self.threads
+            model_kwargs["session_options"] = session_options
+        return model_kwargs
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+
+        if self.backend == "torch":
+            if self.threads:
+                import torch
+
+                torch.set_num_threads(self.threads)
+            return SentenceTransformer(self.model_name, device="cpu")
+        if self.backend == "onnx":
+            return SentenceTransformer(self.model_name, device="cpu", backend="onnx", model_kwargs=self._onnx_kwargs())
+
+        # onnx-int8: use the quantized export published with the model, or make one locally
+        file_name = f"onnx/model_qint8_{self.quantization}.onnx"
+        local_copy = os.path.join(self.model_dir, self.model_name.replace("/", "__"))
+        if os.path.exists(os.path.join(local_copy, file_name)):
+            return SentenceTransformer(local_copy, device="cpu", backend="onnx",
+                                       model_kwargs=self._onnx_kwargs(file_name))
+        try:
+            return SentenceTransformer(self.model_name, device="cpu", backend="onnx",
+                                       model_kwargs=self._onnx_kwargs(file_name))
+        except Exception:
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            model = SentenceTransformer(self.model_name, device="cpu", backend="onnx")
+            model.save(local_copy)
+            export_dynamic_quantized_onnx_model(model, self.quantization, local_copy)
+            return SentenceTransformer(local_copy, device="cpu", backend="onnx",
+                                       model_kwargs=self._onnx_kwargs(file_name))
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _encode(self, texts: list[str], prompt_name: str | None = None) -> list[list[float]]:
+        model = self.model
+        with self._lock:
+            vectors = model.encode(texts, batch_size=self.batch_size, prompt_name=prompt_name,
+                                   normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False)
+        return vectors.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        return self._encode(list(texts))
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embeds several queries in one encode call."""
+        if not texts:
+            return []
+        # Models trained with a query instruction (e.g. BGE) ship it as the "query" prompt
+        prompt_name = "query" if "query" in (self.model.prompts or {}) else None
+        return self._encode(list(texts), prompt_name)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic, offline bag-of-words embeddings: every term is hashed into
+    one of `size` signed buckets with a log term frequency weight. Retrieval
+    quality is roughly that of keyword search, with no model download or
+    API call, which makes it the embedding stub for CI and offline runs.
+    Selected with model names like "hashing-512".
+    """
+
+    def __init__(self, size: int = 512):
+        self.size = size
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.size
+        for term, count in Counter(tokenize(text)).items():
+            digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.size
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign * (1.0 + math.log(count))
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def get_embedding_provider(model_name: str = EMBEDDING_MODEL_NAME, provider: str | None = EMBEDDING_PROVIDER,
+                           **local_options) -> Embeddings:
+    """
+    Returns the embedding model for model_name. Ingestion and querying both
+    go through here, so a collection is always queried in the embedding
+    space it was built in.
+
+    Args:
+        provider: "openai", "local", "hashing" or None to infer it from model_name.
+        local_options: Overrides for LocalEmbeddings (batch_size, backend, threads, ...).
+    """
+    provider = resolve_provider(model_name, provider)
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(model=model_name)
+    if provider == "hashing":
+        # "hashing-<size>"
+        return HashingEmbeddings(int(model_name.rsplit("-", 1)[1]))
+    return LocalEmbeddings(model_name, **local_options)
+
+
+def check_collection_model(metadata: dict | None, model_id: str, collection_name: str):
+    """
+    Raises ValueError if a collection's metadata records a different
+    embedding model than model_id. Collections from before the model was
+    recorded pass.
+    """
+    recorded = (metadata or {}).get(COLLECTION_MODEL_KEY)
+    if recorded and recorded != model_id:
+        raise ValueError(
+            f"Collection '{collection_name}' was built with embedding model '{recorded}', but the configured "
+            f"model is '{model_id}'. Vectors from different models cannot be compared; use a new collection "
+            f"name or persist directory, or switch EMBEDDING_MODEL_NAME back."
+        )
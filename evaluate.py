@@ -1,55 +1,86 @@
 # evaluate.py
 
-import pandas as pd
-from datasets import Dataset
-from ragas import evaluate
-from ragas.metrics import (
-    faithfulness,
-    answer_relevancy,
-    context_recall,
-    context_precision,
-)
-
-# Import the centralized pipeline and evaluation data
-from pipeline import rag_pipeline
+import asyncio
+
+# Import the centralized pipeline and evaluation data. The pipeline and the
+# RAGAS/datasets stack are loaded on first use, not at import time.
+from pipeline import get_pipeline
 from evaluation_dataset import get_evaluation_dataset
-from config import EMBEDDING_MODEL_NAME
+from config import EMBEDDING_MODEL_NAME, EVAL_MAX_CONCURRENCY
 
-def run_evaluation():
+# Score columns of the RAGAS result, as averaged in the reports
+RAGAS_METRICS = ["faithfulness", "answer_relevancy", "context_precision", "context_recall"]
+
+async def agenerate_responses(pipeline, questions, max_concurrency=EVAL_MAX_CONCURRENCY):
     """
-    Runs the RAGAS evaluation on the RAG system.
+    Runs every question through the pipeline concurrently.
+
+    Args:
+        pipeline: The RAGPipeline to query.
+        questions: The questions, in dataset order.
+        max_concurrency: Maximum number of questions in flight at once.
+
+    Returns:
+        One dict per question, in dataset order, with "answer", "context" and
+        "error". A failed question has answer None and its error message set,
+        so one failure does not abort the whole run.
     """
-    if rag_pipeline is None:
-        print("Cannot run evaluation because the RAG pipeline failed to initialize.")
-        return
+    # The pipeline is evaluated, not its caches: every answer is generated afresh
+    results = await pipeline.abatch(questions, max_concurrency=max_concurrency, return_exceptions=True,
+                                    use_caches=False)
 
-    # 1. Load your evaluation dataset
-    eval_dataset = get_evaluation_dataset()
-    questions = [item["question"] for item in eval_dataset]
-    ground_truths = [item["ground_truth"] for item in eval_dataset]
-
-    # 2. Get answers and contexts from your RAG system
-    answers = []
-    contexts = []
-
-    print("Generating answers and contexts for evaluation dataset...")
-    for question in questions:
-        print(f"Processing question: {question}")
-        result = rag_pipeline.invoke(question)
-        answers.append(result["answer"])
-        contexts.append(result["context"])
-    print("Finished generating responses.")
+    responses = []
+    for question, result in zip(questions, results):
+        if isinstance(result, Exception):
+            print(f"Failed question: {question} ({result!r})")
+            responses.append({"question": question, "answer": None, "context": [], "error": repr(result)})
+        else:
+            responses.append({**result, "error": None})
+    return responses
+
+def generate_responses(pipeline, questions, max_concurrency=EVAL_MAX_CONCURRENCY):
+    """Synchronous wrapper around agenerate_responses."""
+    return asyncio.run(agenerate_responses(pipeline, questions, max_concurrency))
+
+def score_responses(eval_dataset, responses):
+    """
+    Scores pipeline responses with RAGAS.
+
+    Args:
+        eval_dataset: The evaluation items, with "question" and "ground_truth".
+        responses: The matching results of generate_responses.
 
-    # 3. Create a Hugging Face Dataset
+    Returns:
+        A DataFrame with one row of RAGAS scores per answered question.
+        Failed questions are reported and left out.
+    """
+    from datasets import Dataset
+    from ragas import evaluate
+    from ragas.metrics import (
+        faithfulness,
+        answer_relevancy,
+        context_recall,
+        context_precision,
+    )
+
+    # Failed questions are reported and left out of the RAGAS run
+    failures = [r for r in responses if r["error"] is not None]
+    if failures:
+        print(f"{len(failures)} question(s) failed and will be skipped:")
+        for failure in failures:
+            print(f"  - {failure['question']}: {failure['error']}")
+    succeeded = [i for i, r in enumerate(responses) if r["error"] is None]
+
+    # Create a Hugging Face Dataset
     response_dataset_dict = {
-        "question": questions,
-        "answer": answers,
-        "contexts": contexts,
-        "ground_truth": ground_truths,
+        "question": [eval_dataset[i]["question"] for i in succeeded],
+        "answer": [responses[i]["answer"] for i in succeeded],
+        "contexts": [responses[i]["context"] for i in succeeded],
+        "ground_truth": [eval_dataset[i]["ground_truth"] for i in succeeded],
     }
     response_dataset = Dataset.from_dict(response_dataset_dict)
 
-    # 4. Define the metrics
+    # Define the metrics
     metrics = [
         faithfulness,
         answer_relevancy,
@@ -57,24 +88,46 @@ def run_evaluation():
         context_precision,
     ]
 
-    # 5. Run the evaluation
-    print("\nRunning RAGAS evaluation...")
+    # Run the evaluation and convert the result to a pandas DataFrame
     result = evaluate(
         dataset=response_dataset,
         metrics=metrics,
     )
+    return result.to_pandas()
+
+def run_evaluation():
+    """
+    Runs the RAGAS evaluation on the RAG system.
+    """
+    try:
+        rag_pipeline = get_pipeline()
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        print("Cannot run evaluation because the RAG pipeline failed to initialize.")
+        return
+
+    # 1. Load your evaluation dataset
+    eval_dataset = get_evaluation_dataset()
+    questions = [item["question"] for item in eval_dataset]
+
+    # 2. Get answers and contexts from your RAG system, several at a time
+    print(f"Generating answers and contexts for {len(questions)} questions "
+          f"(max concurrency {EVAL_MAX_CONCURRENCY})...")
+    responses = generate_responses(rag_pipeline, questions)
+    print("Finished generating responses.")
+
+    # 3. Score them with RAGAS
+    print("\nRunning RAGAS evaluation...")
+    df = score_responses(eval_dataset, responses)
 
     print("Evaluation complete!")
     
-    # Convert result to a pandas DataFrame for easier analysis
-    df = result.to_pandas()
-    
     print("\n--- Individual Question Scores ---")
     # Use to_string() to ensure the full dataframe is printed to the console
     print(df.to_string())
     
     # --- NEW: Calculate and print the average scores ---
-    average_scores = df[['faithfulness', 'answer_relevancy', 'context_precision', 'context_recall']].mean()
+    average_scores = df[RAGAS_METRICS].mean()
     print("\n\n--- Overall Average Scores ---")
     print(average_scores.to_string())
     # ----------------------------------------------------
@@ -2,25 +2,30 @@
 
 def get_evaluation_dataset():
     """
-    Returns a list of dictionaries, where each dictionary contains a question
-    and the "ground truth" answer based on the content from ask.herts.ac.uk.
+    Returns a list of dictionaries, where each dictionary contains a question,
+    the "ground truth" answer based on the content from ask.herts.ac.uk, and
+    the "sources": the config.URLS pages that answer it, for retrieval metrics.
     """
     return [
         {
             "question": "How much does it cost to replace a lost or damaged student ID card?",
-            "ground_truth": "The fee for a replacement ID card is £10."
+            "ground_truth": "The fee for a replacement ID card is £10.",
+            "sources": ["https://ask.herts.ac.uk/replacement-id-cards-lost-damaged-stolen"]
         },
         {
             "question": "What should I do if my ID card is stolen?",
-            "ground_truth": "If your ID card is stolen, you should report it to the police to get a crime reference number. The university may waive the replacement fee if you provide this number. Report to Lost or stolen ID cards should be reported to the Library and Computing Services at helpdesk@herts.ac.uk at the earliest opportunity to prevent others from using your card until you get a replacement."
+            "ground_truth": "If your ID card is stolen, you should report it to the police to get a crime reference number. The university may waive the replacement fee if you provide this number. Report to Lost or stolen ID cards should be reported to the Library and Computing Services at helpdesk@herts.ac.uk at the earliest opportunity to prevent others from using your card until you get a replacement.",
+            "sources": ["https://ask.herts.ac.uk/replacement-id-cards-lost-damaged-stolen"]
         },
         {
             "question": "Can I get a temporary ID slip for my exams?",
-            "ground_truth": "Yes, you can obtain a temporary ID slip for exams from the Ask Herts Helpdesk if you have lost your card. It is valid for 1 week from the date of issue"
+            "ground_truth": "Yes, you can obtain a temporary ID slip for exams from the Ask Herts Helpdesk if you have lost your card. It is valid for 1 week from the date of issue",
+            "sources": ["https://ask.herts.ac.uk/temporary-id-slip-for-exams"]
         },
         {
             "question": "What is the current application fee for a Student Visa ?",
-            "ground_truth": "The application fee for a Student Visa is £524."
+            "ground_truth": "The application fee for a Student Visa is £524.",
+            "sources": ["https://ask.herts.ac.uk/student-visa-processing-times-and-application-fees"]
         },
         # {
         #     "question": "How much is the accommodation deposit?",
@@ -28,106 +33,131 @@ def get_evaluation_dataset():
         # },
         {
             "question": "What are the steps to request an accommodation refund?",
-            "ground_truth": "There are three steps: First, check your eligibility by contacting finance-accomm@herts.ac.uk, especially if you have overpaid, withdrawn, or suspended studies. Second, you must fill out an accommodation refund form, keeping in mind the refund will go to the original account. Third, submit the completed form via email to finance-accomm@herts.ac.uk."
+            "ground_truth": "There are three steps: First, check your eligibility by contacting finance-accomm@herts.ac.uk, especially if you have overpaid, withdrawn, or suspended studies. Second, you must fill out an accommodation refund form, keeping in mind the refund will go to the original account. Third, submit the completed form via email to finance-accomm@herts.ac.uk.",
+            "sources": ["https://ask.herts.ac.uk/accommodation-refund"]
         },
         {
             "question": "Which students are generally eligible for Council Tax exemption, and how does living arrangement affect it?",
-            "ground_truth": "Full-time students on a course lasting at least six months are eligible. Part-time students with over 90 credits may also be eligible after a review. The exemption status of the property depends on who you live with; if all residents are exempt students, the entire household is exempt, but if you live with non-students, you may only receive a discount."
+            "ground_truth": "Full-time students on a course lasting at least six months are eligible. Part-time students with over 90 credits may also be eligible after a review. The exemption status of the property depends on who you live with; if all residents are exempt students, the entire household is exempt, but if you live with non-students, you may only receive a discount.",
+            "sources": ["https://ask.herts.ac.uk/council-tax-exemption"]
         },
         {
             "question": "Is it possible to change my allocated accommodation room?",
-            "ground_truth": "Yes, you can apply to change your accommodation, but this is subject to availability and specific application periods."
+            "ground_truth": "Yes, you can apply to change your accommodation, but this is subject to availability and specific application periods.",
+            "sources": ["https://ask.herts.ac.uk/change-your-accommodation"]
         },
         {
             "question": "What is the step-by-step process for a fully registered, full-time University of Hertfordshire student to get their Council Tax exemption evidence?",
-            "ground_truth": "First, request the exemption evidence through the Student Letters portal. Second, wait up to 20 minutes for the evidence to be emailed to your personal address. Third, download and save the evidence. Finally, submit the evidence to your local council according to their specific instructions."
+            "ground_truth": "First, request the exemption evidence through the Student Letters portal. Second, wait up to 20 minutes for the evidence to be emailed to your personal address. Third, download and save the evidence. Finally, submit the evidence to your local council according to their specific instructions.",
+            "sources": ["https://ask.herts.ac.uk/council-tax-exemption"]
         },
         {
             "question": "Who can I speak to if I am unhappy with my on-campus accommodation, both during and outside of office hours?",
-            "ground_truth": "During office hours on weekdays, you can speak in person with the Residence Life and Safeguarding Team on either campus, email them at reslife@herts.ac.uk, or call them. You can also speak with Counselling services. Outside of office hours, you can contact a Resident Assistant (RA) using the non-emergency security number."
+            "ground_truth": "During office hours on weekdays, you can speak in person with the Residence Life and Safeguarding Team on either campus, email them at reslife@herts.ac.uk, or call them. You can also speak with Counselling services. Outside of office hours, you can contact a Resident Assistant (RA) using the non-emergency security number.",
+            "sources": ["https://ask.herts.ac.uk/i-m-unhappy-in-my-accommodation"]
         },
         {
             "question": "Are there laundry facilities on campus?",
-            "ground_truth": "Yes, laundry facilities are available on both the College Lane(07:00-23:00) and de Havilland(07:00-22:00) campuses."
+            "ground_truth": "Yes, laundry facilities are available on both the College Lane(07:00-23:00) and de Havilland(07:00-22:00) campuses.",
+            "sources": ["https://ask.herts.ac.uk/laundry-on-campus"]
         },
         {
             "question": "As a current student, what is the first step to engage with the Careers and Employment Service and what key resources are available?",
-            "ground_truth": "The first step is to log into the Careers and Employment website. This gives you access to the Handshake community for live vacancies and appointments, and to e-learning programs on 'My Career Plan' to help develop employability skills."
+            "ground_truth": "The first step is to log into the Careers and Employment website. This gives you access to the Handshake community for live vacancies and appointments, and to e-learning programs on 'My Career Plan' to help develop employability skills.",
+            "sources": ["https://ask.herts.ac.uk/getting-started-with-the-careers-employment-enterprise-service"]
         },
         {
             "question": "How do students access the Handshake platform and what can they use it for?",
-            "ground_truth": "Students do not need to register for Handshake as an account is automatically created for them. They can use it to search for jobs, internships, and placements, and to book appointments, such as for a CV check."
+            "ground_truth": "Students do not need to register for Handshake as an account is automatically created for them. They can use it to search for jobs, internships, and placements, and to book appointments, such as for a CV check.",
+            "sources": ["https://ask.herts.ac.uk/getting-started-with-the-careers-employment-enterprise-service"]
         },
         {
             "question": "For how long after graduating can alumni use the Careers and Employment Service, and what is the quickest way to contact the team for support?",
-            "ground_truth": "Graduates can receive support for up to 4 years after their course ends. To get instant support, you can use the Live Chat feature on the careers website by clicking the icon in the bottom right-hand corner."
+            "ground_truth": "Graduates can receive support for up to 4 years after their course ends. To get instant support, you can use the Live Chat feature on the careers website by clicking the icon in the bottom right-hand corner.",
+            "sources": ["https://ask.herts.ac.uk/getting-started-with-the-careers-employment-enterprise-service"]
         },
         {
             "question": "Can I work during my studies on a Student visa?",
-            "ground_truth": "Yes, students on a Student visa are usually permitted to work, but there are restrictions on the number of hours per week during term-time."
+            "ground_truth": "Yes, students on a Student visa are usually permitted to work, but there are restrictions on the number of hours per week during term-time.",
+            "sources": ["https://ask.herts.ac.uk/student-visa-holders-working-during-your-studies"]
         },
         {
             "question": "What are the rules for working during my vacation period as an international student?",
-            "ground_truth": "During official vacation periods, international students on a Student visa may be able to work full-time."
+            "ground_truth": "During official vacation periods, international students on a Student visa may be able to work full-time.",
+            "sources": ["https://ask.herts.ac.uk/student-visa-holders-working-during-your-vacation"]
         },
         {
             "question": "What happens if my attendance drops as an international student?",
-            "ground_truth": "Poor attendance for international students can have serious consequences, including being reported to the Home Office, which could lead to visa cancellation."
+            "ground_truth": "Poor attendance for international students can have serious consequences, including being reported to the Home Office, which could lead to visa cancellation.",
+            "sources": ["https://ask.herts.ac.uk/international-student-attendance"]
         },
         {
             "question": "What should I do if I am absent from my studies?",
-            "ground_truth": "If you are absent from your studies, you must inform the University by completing the 'Notification of Absence' form online."
+            "ground_truth": "If you are absent from your studies, you must inform the University by completing the 'Notification of Absence' form online.",
+            "sources": ["https://ask.herts.ac.uk/absence-your-tier-4-visa"]
         },
         {
             "question": "Where can I find information about student safety and crime prevention?",
-            "ground_truth": "The University provides guidance on student safety and crime prevention, which covers topics like personal safety, protecting your property, and online safety."
+            "ground_truth": "The University provides guidance on student safety and crime prevention, which covers topics like personal safety, protecting your property, and online safety.",
+            "sources": ["https://ask.herts.ac.uk/student-safety-crime-prevention"]
         },
         {
             "question": "Under what circumstances do I need my own TV Licence if I live in on-campus accommodation versus a privately rented house?",
-            "ground_truth": "If you live in on-campus accommodation, your individual room needs its own TV Licence to watch live TV or BBC iPlayer. In a privately rented house with a joint tenancy agreement, you likely only need one licence for the whole house. However, if you have a separate tenancy agreement for your own room, you will need your own licence."
+            "ground_truth": "If you live in on-campus accommodation, your individual room needs its own TV Licence to watch live TV or BBC iPlayer. In a privately rented house with a joint tenancy agreement, you likely only need one licence for the whole house. However, if you have a separate tenancy agreement for your own room, you will need your own licence.",
+            "sources": ["https://ask.herts.ac.uk/do-i-need-a-tv-licence"]
         },
         {
             "question": "How to request a student letter?",
-            "ground_truth": "First, they must ensure their details on their Student Record are correct. Then, they complete a specific form to request the letter. The letter will be sent to their personal email address in about 15 minutes."
+            "ground_truth": "First, they must ensure their details on their Student Record are correct. Then, they complete a specific form to request the letter. The letter will be sent to their personal email address in about 15 minutes.",
+            "sources": ["https://ask.herts.ac.uk/student-letters-cae5998a-cefd-447d-ab93-526064295952"]
         },
         {
             "question": "What are the different ways I can make a payment to the university?",
-            "ground_truth": "You can make a payment to the university online via the student portal, through bank transfer, or using services like Convera."
+            "ground_truth": "You can make a payment to the university online via the student portal, through bank transfer, or using services like Convera.",
+            "sources": ["https://ask.herts.ac.uk/make-a-payment"]
         },
         {
             "question": "Can I work on a placement year with my Student visa?",
-            "ground_truth": "Yes, if the placement is an integral and assessed part of your course, you can work on a placement year with your Student visa."
+            "ground_truth": "Yes, if the placement is an integral and assessed part of your course, you can work on a placement year with your Student visa.",
+            "sources": ["https://ask.herts.ac.uk/student-visa-holders-working-on-placement-year"]
         },
         {
             "question": "What information is included in the 'Welcome to the UK' guide for international students?",
-            "ground_truth": "The 'Welcome to the UK' guide contains essential information for international students, including details on immigration, healthcare, banking, and adjusting to life in the UK."
+            "ground_truth": "The 'Welcome to the UK' guide contains essential information for international students, including details on immigration, healthcare, banking, and adjusting to life in the UK.",
+            "sources": ["https://ask.herts.ac.uk/welcome-to-the-uk-information-for-international-students"]
         },
         {
             "question": "When is the earliest I can apply to extend my Student visa from within the UK?",
-            "ground_truth": "You can apply to extend your Student visa up to 3 months before your current visa expires."
+            "ground_truth": "You can apply to extend your Student visa up to 3 months before your current visa expires.",
+            "sources": ["https://ask.herts.ac.uk/when-to-apply-to-extend-your-tier-4-visa-from-the-uk"]
         },
 
         {
             "question": "What kind of support can the Careers and Employment service offer me?",
-            "ground_truth": "The Careers and Employment service offers support with CVs, applications, interview skills, finding part-time jobs, and career planning."
+            "ground_truth": "The Careers and Employment service offers support with CVs, applications, interview skills, finding part-time jobs, and career planning.",
+            "sources": ["https://ask.herts.ac.uk/getting-started-with-the-careers-employment-enterprise-service"]
         },
         {
             "question": "If I am unhappy with my accommodation, who is the first person I should talk to?",
-            "ground_truth": "If you are unhappy in your accommodation, you should first speak with your Resident Assistant or contact the Accommodation Team to discuss the issues."
+            "ground_truth": "If you are unhappy in your accommodation, you should first speak with your Resident Assistant or contact the Accommodation Team to discuss the issues.",
+            "sources": ["https://ask.herts.ac.uk/i-m-unhappy-in-my-accommodation"]
         },
         {
             "question": "What is the process for making a payment to the university from overseas?",
-            "ground_truth": "International students can make payments through the university's online portal or use services like Convera (formerly Western Union Business Solutions) for bank transfers."
+            "ground_truth": "International students can make payments through the university's online portal or use services like Convera (formerly Western Union Business Solutions) for bank transfers.",
+            "sources": ["https://ask.herts.ac.uk/make-a-payment"]
         },
 
         {
             "question": "How do I request to move rooms, and what is the process if I want to leave my accommodation contract early?",
-            "ground_truth": "To request a room move, you must email accommodation@herts.ac.uk with your details, which costs £25 and is subject to checks. To leave early, you need to request it via the 'Early Departure' link on the accommodation portal, but you are liable for the fees until the room is re-let."
+            "ground_truth": "To request a room move, you must email accommodation@herts.ac.uk with your details, which costs £25 and is subject to checks. To leave early, you need to request it via the 'Early Departure' link on the accommodation portal, but you are liable for the fees until the room is re-let.",
+            "sources": ["https://ask.herts.ac.uk/change-your-accommodation"]
         },
 
         {
             "question": "What are the different ways I can pay my tuition or accommodation fees, and are there any restrictions for in-person payments?",
-            "ground_truth": "You can pay fees online using Flywire for various local payment methods, Convera for bank transfers in your local currency, or directly via the university's portal with a credit or debit card. You can also pay in person at the Place2Pay on the College Lane Campus, but they do not accept cash, cheques, or AMEX, and you cannot use a third person's card."
+            "ground_truth": "You can pay fees online using Flywire for various local payment methods, Convera for bank transfers in your local currency, or directly via the university's portal with a credit or debit card. You can also pay in person at the Place2Pay on the College Lane Campus, but they do not accept cash, cheques, or AMEX, and you cannot use a third person's card.",
+            "sources": ["https://ask.herts.ac.uk/make-a-payment"]
         }
         
     ]
\ No newline at end of file
@@ -0,0 +1,220 @@
+# experiments.py
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import time
+from typing import NamedTuple
+
+from config import (
+    CHROMA_COLLECTION_NAME,
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    EMBEDDING_MODEL_NAME,
+    EVAL_MAX_CONCURRENCY,
+    EXPERIMENT_DIR,
+    EXPERIMENT_MAX_PARALLEL_VARIANTS,
+    K_RETRIEVER,
+    LLM_PRICE_PER_1M_INPUT_TOKENS,
+    LLM_PRICE_PER_1M_OUTPUT_TOKENS,
+    URLS,
+)
+from evaluate import RAGAS_METRICS, agenerate_responses, score_responses
+from evaluation_dataset import get_evaluation_dataset
+from pipeline import get_pipeline
+from tracing import collect_traces
+
+# Parsed page texts shared by every variant, stored in EXPERIMENT_DIR
+PAGES_FILENAME = "pages.json"
+RESULTS_FILENAME = "experiment_results.csv"
+# Stages reported in the comparison table
+REPORTED_STAGES = ("embed_query", "search", "build_context", "llm")
+
+
+class Variant(NamedTuple):
+    embedding_model: str
+    chunk_size: int
+    chunk_overlap: int
+    k: int
+
+    @property
+    def index_name(self) -> str:
+        """Names the index this variant queries; variants differing only in k share one."""
+        safe_model = self.embedding_model.replace("/", "_").replace(":", "_")
+        return f"{safe_model}__{self.chunk_size}_{self.chunk_overlap}"
+
+
+def variant_matrix(models, chunk_sizes, overlaps, ks) -> list[Variant]:
+    """Returns every combination of the settings, skipping overlaps that are not smaller than the chunk."""
+    variants = []
+    for model, size, overlap, k in itertools.product(models, chunk_sizes, overlaps, ks):
+        if overlap >= size:
+            print(f"Skipping chunk size {size} with overlap {overlap}: the overlap must be smaller.")
+            continue
+        variants.append(Variant(model, size, overlap, k))
+    return variants
+
+
+def load_pages(urls: list[str], experiment_dir: str = EXPERIMENT_DIR, refresh: bool = False) -> dict:
+    """
+    Returns {url: {"text": ..., "outline": ...}} for urls (see
+    ingestion.preprocess_page). Pages parsed by earlier runs are read from
+    disk; only missing ones (or all, with refresh) are fetched.
+    """
+    path = os.path.join(experiment_dir, PAGES_FILENAME)
+    pages = {}
+    if not refresh and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            pages = json.load(f)
+
+    # Pages cached as bare text predate outlines and are parsed again
+    missing = [url for url in urls if not isinstance(pages.get(url), dict)]
+    if missing:
+        from ingestion import iter_processed_pages
+
+        print(f"Fetching and parsing {len(missing)} page(s)...")
+        for page in iter_processed_pages(missing):
+            if page.text:
+                pages[page.url] = {"text": page.text, "outline": page.outline}
+        os.makedirs(experiment_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(pages, f)
+        os.replace(tmp_path, path)
+    return {url: pages[url] for url in urls if isinstance(pages.get(url), dict)}
+
+
+def build_index(variant: Variant, pages: dict, experiment_dir: str = EXPERIMENT_DIR) -> str:
+    """
+    Builds (or brings up to date) the index for a variant from parsed pages
+    and returns its persist directory. Ingestion is incremental, so an index
+    built by an earlier run costs no embedding calls.
+    """
+    from ingestion import ProcessedPage, rag_ingest_urls
+
+    persist_directory = os.path.join(experiment_dir, "indexes", variant.index_name)
+    rag_ingest_urls(
+        urls=list(pages),
+        collection_name=CHROMA_COLLECTION_NAME,
+        persist_directory=persist_directory,
+        incremental=True,
+        embedding_model_name=variant.embedding_model,
+        chunk_size=variant.chunk_size,
+        chunk_overlap=variant.chunk_overlap,
+        pages=[ProcessedPage(url, page["text"], None, None, page["outline"]) for url, page in pages.items()],
+    )
+    return persist_directory
+
+
+def summarize(variant: Variant, responses: list, traces: list, scores: dict | None, elapsed: float) -> dict:
+    """Turns one variant's responses, traces and RAGAS averages into a row of the comparison table."""
+    row = {**variant._asdict()}
+    for metric in RAGAS_METRICS:
+        row[metric] = scores.get(metric) if scores else None
+    row["failed"] = sum(r["error"] is not None for r in responses)
+
+    finished = [t for t in traces if t.outcome == "ok"]
+    for stage_name in REPORTED_STAGES:
+        times = [t.stages[stage_name] for t in finished if stage_name in t.stages]
+        row[f"{stage_name}_ms"] = statistics.mean(times) * 1000 if times else None
+    totals = [t.total_seconds for t in finished]
+    row["p50_ms"] = statistics.median(totals) * 1000 if totals else None
+
+    prompt_tokens = [t.prompt_tokens or 0 for t in finished]
+    completion_tokens = [t.completion_tokens or 0 for t in finished]
+    row["prompt_tokens"] = statistics.mean(prompt_tokens) if finished else None
+    row["completion_tokens"] = statistics.mean(completion_tokens) if finished else None
+    row["usd_per_1k_questions"] = (
+        (row["prompt_tokens"] * LLM_PRICE_PER_1M_INPUT_TOKENS
+         + row["completion_tokens"] * LLM_PRICE_PER_1M_OUTPUT_TOKENS) / 1000
+        if finished else None
+    )
+    row["wall_s"] = elapsed
+    return row
+
+
+async def evaluate_variant(variant: Variant, persist_directory: str, eval_dataset: list,
+                           semaphore: asyncio.Semaphore, score: bool = True) -> dict:
+    """Answers the evaluation questions with one variant and scores them."""
+    async with semaphore:
+        pipeline = await asyncio.to_thread(
+            get_pipeline,
+            persist_directory=persist_directory,
+            collection_name=CHROMA_COLLECTION_NAME,
+            embedding_model_name=variant.embedding_model,
+            k_retriever=variant.k,
+            # Cached answers would hide the differences being measured
+            use_answer_cache=False,
+        )
+        questions = [item["question"] for item in eval_dataset]
+        start = time.perf_counter()
+        with collect_traces() as traces:
+            responses = await agenerate_responses(pipeline, questions, EVAL_MAX_CONCURRENCY)
+        elapsed = time.perf_counter() - start
+
+        scores = None
+        if score:
+            df = await asyncio.to_thread(score_responses, eval_dataset, responses)
+            scores = df[RAGAS_METRICS].mean().to_dict()
+        print(f"Finished {variant}")
+        return summarize(variant, responses, traces, scores, elapsed)
+
+
+async def evaluate_variants(variants: list[Variant], persist_directories: dict, score: bool = True,
+                            max_parallel: int = EXPERIMENT_MAX_PARALLEL_VARIANTS) -> list[dict]:
+    """Evaluates the variants, max_parallel at a time, returning one row per variant in order."""
+    eval_dataset = get_evaluation_dataset()
+    semaphore = asyncio.Semaphore(max_parallel)
+    return await asyncio.gather(*(
+        evaluate_variant(variant, persist_directories[variant.index_name], eval_dataset, semaphore, score)
+        for variant in variants
+    ))
+
+
+def run_experiments(variants: list[Variant], urls: list[str] = URLS, experiment_dir: str = EXPERIMENT_DIR,
+                    score: bool = True, refresh_pages: bool = False,
+                    max_parallel: int = EXPERIMENT_MAX_PARALLEL_VARIANTS):
+    """
+    Builds an index per distinct (model, chunk size, overlap), evaluates
+    every variant against it and returns the comparison table as a DataFrame.
+    """
+    import pandas as pd
+
+    pages = load_pages(urls, experiment_dir, refresh=refresh_pages)
+    print(f"{len(pages)} parsed page(s) available.")
+
+    persist_directories = {}
+    for variant in variants:
+        if variant.index_name not in persist_directories:
+            print(f"\nBuilding index {variant.index_name}...")
+            persist_directories[variant.index_name] = build_index(variant, pages, experiment_dir)
+
+    print(f"\nEvaluating {len(variants)} variant(s), {max_parallel} at a time...")
+    rows = asyncio.run(evaluate_variants(variants, persist_directories, score, max_parallel))
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare embedding models, chunking and k on the evaluation set.")
+    parser.add_argument("--models", nargs="+", default=[EMBEDDING_MODEL_NAME])
+    parser.add_argument("--chunk-sizes", nargs="+", type=int, default=[CHUNK_SIZE])
+    parser.add_argument("--overlaps", nargs="+", type=int, default=[CHUNK_OVERLAP])
+    parser.add_argument("--k", nargs="+", type=int, default=[K_RETRIEVER])
+    parser.add_argument("--no-ragas", action="store_true", help="Skip RAGAS scoring; report latency and tokens only.")
+    parser.add_argument("--refresh-pages", action="store_true", help="Re-fetch and re-parse every page.")
+    parser.add_argument("--max-parallel", type=int, default=EXPERIMENT_MAX_PARALLEL_VARIANTS)
+    parser.add_argument("--dir", default=EXPERIMENT_DIR, help="Directory for parsed pages and indexes.")
+    args = parser.parse_args()
+
+    variants = variant_matrix(args.models, args.chunk_sizes, args.overlaps, args.k)
+    table = run_experiments(variants, experiment_dir=args.dir, score=not args.no_ragas,
+                            refresh_pages=args.refresh_pages, max_parallel=args.max_parallel)
+
+    print("\n--- Variant Comparison ---")
+    print(table.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    results_path = os.path.join(args.dir, RESULTS_FILENAME)
+    table.to_csv(results_path, index=False)
+    print(f"\nResults saved to {results_path}")
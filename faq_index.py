@@ -0,0 +1,175 @@
+# faq_index.py
+
+import argparse
+import time
+
+from answer_cache import SemanticAnswerCache
+from collection_version import read_collection_version
+from config import (
+    BATCH_MAX_CONCURRENCY,
+    CHROMA_COLLECTION_NAME,
+    CHROMA_PERSIST_DIRECTORY,
+    EMBEDDING_MODEL_NAME,
+    FAQ_INDEX_PATH,
+    FAQ_SIMILARITY_THRESHOLD,
+    K_RETRIEVER,
+    LLM_MODEL_NAME,
+    RERANK_ENABLED,
+)
+
+
+def load_faq_questions(path: str) -> list[str]:
+    """Reads a curated question list: one question per line, blank lines and # comments ignored."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+class FAQIndex(SemanticAnswerCache):
+    """
+    Pre-generated answers, with their sources, to a curated list of
+    canonical questions, looked up by question embedding like the answer
+    cache. A question close enough to a canonical one gets its stored answer
+    without retrieval or an LLM call.
+
+    Like the answer cache, answers and questions are scoped by the namespace
+    of the pipeline that generated them, so one file can serve several
+    pipelines. Entries never expire, but a namespace's answers are dropped
+    when its collection version changes. Its canonical questions are kept,
+    so build() can regenerate the answers from the new pages.
+    """
+
+    def __init__(self, path: str = FAQ_INDEX_PATH, threshold: float = FAQ_SIMILARITY_THRESHOLD,
+                 persist_directory: str = CHROMA_PERSIST_DIRECTORY, namespace: str = ""):
+        super().__init__(path, threshold, ttl_seconds=None, max_entries=None, persist_directory=persist_directory,
+                         namespace=namespace)
+        with self._lock:
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(faq_questions)")]
+            if columns and "namespace" not in columns:
+                # Written before questions were namespaced, like the answers dropped on open
+                self._conn.execute("DROP TABLE faq_questions")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS faq_questions (namespace TEXT NOT NULL, position INTEGER NOT NULL,"
+                " question TEXT NOT NULL, PRIMARY KEY (namespace, position))"
+            )
+            self._conn.commit()
+
+    def questions(self) -> list[str]:
+        """Returns the canonical questions of the last build."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question FROM faq_questions WHERE namespace = ? ORDER BY position", (self.namespace,)
+            ).fetchall()
+        return [question for (question,) in rows]
+
+    def is_current(self) -> bool:
+        """True if every canonical question has an answer generated from the current collection."""
+        with self._lock:
+            self._check_collection_version()
+            (answers,) = self._conn.execute(
+                "SELECT COUNT(*) FROM answers WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+            (questions,) = self._conn.execute(
+                "SELECT COUNT(*) FROM faq_questions WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        return questions > 0 and answers == questions
+
+    def build(self, pipeline, questions: list[str] | None = None,
+              max_concurrency: int = BATCH_MAX_CONCURRENCY) -> int:
+        """
+        Answers the canonical questions with pipeline.batch and replaces
+        every stored answer with the new ones.
+
+        Args:
+            questions: The new canonical questions, a curated list; defaults
+                to those of the last build.
+
+        Returns:
+            The number of answers stored. Questions the pipeline failed on
+            are reported and left out, so the index stays stale until a
+            later build answers them.
+
+        Raises:
+            ValueError: If no questions are given and none were stored before.
+            RuntimeError: If ingestion changed the collection during the build.
+        """
+        from embedding_cache import embed_queries
+
+        questions = list(dict.fromkeys(questions or self.questions()))
+        if not questions:
+            raise ValueError("The FAQ index has no canonical questions yet; give it a curated list "
+                             "(e.g. python faq_index.py --questions faq_questions.txt).")
+        version = read_collection_version(self.persist_directory)
+        embeddings = embed_queries(pipeline.embedding_function, questions)
+        # Fresh answers: the pipeline's own FAQ index or answer cache must not answer
+        results = pipeline.batch(questions, max_concurrency=max_concurrency, return_exceptions=True,
+                                 use_caches=False)
+        if read_collection_version(self.persist_directory) != version:
+            raise RuntimeError("The collection changed while the FAQ answers were generated; build them again.")
+
+        with self._lock:
+            self._conn.execute("DELETE FROM faq_questions WHERE namespace = ?", (self.namespace,))
+            self._conn.executemany(
+                "INSERT INTO faq_questions (namespace, position, question) VALUES (?, ?, ?)",
+                [(self.namespace, position, question) for position, question in enumerate(questions)],
+            )
+            self._conn.commit()
+        self.clear()
+        stored = 0
+        for question, embedding, result in zip(questions, embeddings, results):
+            if isinstance(result, Exception):
+                print(f"Could not answer FAQ question {question!r}: {result}")
+                continue
+            self.store(question, embedding, {k: v for k, v in result.items() if k != "timings_ms"})
+            stored += 1
+        return stored
+
+
+def refresh_faq_index(persist_directory: str = CHROMA_PERSIST_DIRECTORY, questions: list[str] | None = None,
+                      force: bool = False, pipeline=None, path: str = FAQ_INDEX_PATH) -> int | None:
+    """
+    Regenerates the FAQ answers if they are out of date, i.e. the collection
+    changed since they were built, or if new questions are given or force is
+    set. Returns the number of answers stored, or None if they were current.
+
+    Args:
+        pipeline: The RAGPipeline that answers the questions; by default the
+            shared one for persist_directory, without its caches. The
+            answers are stored under its namespace.
+
+    Raises:
+        ValueError: If no questions are given and none were stored before.
+    """
+    if pipeline is not None:
+        namespace = pipeline.namespace
+    else:
+        from pipeline import pipeline_namespace
+
+        # The namespace get_pipeline() gives the default pipeline, without building it
+        namespace = pipeline_namespace(persist_directory, CHROMA_COLLECTION_NAME, EMBEDDING_MODEL_NAME,
+                                       LLM_MODEL_NAME, K_RETRIEVER, RERANK_ENABLED)
+    index = FAQIndex(path, persist_directory=persist_directory, namespace=namespace)
+    if not force and questions is None and index.is_current():
+        return None
+    if pipeline is None:
+        from pipeline import get_pipeline
+
+        # Fresh answers: neither cache may answer for the pipeline
+        pipeline = get_pipeline(persist_directory=persist_directory, use_answer_cache=False, use_faq_index=False)
+    return index.build(pipeline, questions)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate the answers to frequently asked questions.")
+    parser.add_argument("--questions", help="Text file with one curated canonical question per line; replaces "
+                                            "the stored list. Required for a new index.")
+    parser.add_argument("--force", action="store_true", help="Regenerate the answers even if they are current.")
+    args = parser.parse_args()
+
+    questions = load_faq_questions(args.questions) if args.questions else None
+
+    start = time.perf_counter()
+    stored = refresh_faq_index(questions=questions, force=args.force)
+    if stored is None:
+        print("FAQ answers are up to date with the collection.")
+    else:
+        print(f"Stored {stored} FAQ answers in {time.perf_counter() - start:.1f}s.")
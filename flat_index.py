@@ -0,0 +1,417 @@
+# flat_index.py
+
+import argparse
+import json
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from collection_version import read_collection_version
+from config import (
+    CHROMA_COLLECTION_NAME,
+    CHROMA_PERSIST_DIRECTORY,
+    FLAT_INDEX_DIMENSIONS,
+    FLAT_INDEX_DTYPE,
+    FLAT_INDEX_QUANTIZATION,
+    FLAT_INDEX_RESCORE_FACTOR,
+)
+
+# Written next to the ChromaDB files by ingestion when VECTOR_STORE_BACKEND is "flat"
+FLAT_MATRIX_FILENAME = "flat_index.npy"
+FLAT_METADATA_FILENAME = "flat_index.json"
+# Written instead of the matrix when FLAT_INDEX_QUANTIZATION or FLAT_INDEX_DIMENSIONS is set
+FLAT_CODES_FILENAME = "flat_index_codes.npy"
+QUANTIZATIONS = ("int8", "binary")
+# int8 codes are widened to float32 this many bytes at a time: a block small
+# enough to stay in the CPU cache between the cast and the matrix product
+_SCAN_BLOCK_BYTES = 1 << 20
+
+
+def _replace_atomically(path: str, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _truncate(matrix: np.ndarray, dimensions: int | None) -> np.ndarray:
+    """Keeps the first dimensions columns, renormalized; the matrix itself if dimensions is None."""
+    if dimensions is None or dimensions >= matrix.shape[1]:
+        return matrix
+    return _normalize(matrix[:, :dimensions])
+
+
+def _code_dimensions(dim: int, quantization: str | None, dimensions: int | None) -> int | None:
+    """Dimensions of the compressed codes written for these settings; None if there is none."""
+    if quantization is None and dimensions is None:
+        return None
+    return min(dimensions or dim, dim)
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+    return np.argsort(-scores)
+
+
+def _pack_signs(matrix: np.ndarray) -> np.ndarray:
+    """One bit per dimension, set if positive, padded to whole 64-bit words for fast Hamming distances."""
+    bits = np.packbits(matrix > 0, axis=1)
+    return np.pad(bits, ((0, 0), (0, -bits.shape[1] % 8)))
+
+
+def quantize_vectors(matrix: np.ndarray, quantization: str | None, dimensions: int | None = None,
+                     scales: list[float] | None = None) -> tuple[np.ndarray, list[float] | None]:
+    """
+    Compresses L2-normalized vectors for the first search pass.
+
+    Args:
+        quantization: "int8" stores each dimension as one byte, scaled by the
+            largest absolute value of that dimension; "binary" keeps only the
+            sign of each dimension, packed into 64-bit words; None keeps float32.
+        dimensions: Keep only the first dimensions (renormalized) before
+            quantizing; None keeps all.
+        scales: int8 scales of an earlier call to reuse, so new codes can be
+            appended to its codes; values beyond them are clipped.
+
+    Returns:
+        The codes and, for int8, the scale of each dimension.
+    """
+    if quantization is not None and quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization '{quantization}'; expected one of {QUANTIZATIONS} or None.")
+    matrix = _truncate(np.asarray(matrix, dtype=np.float32), dimensions)
+    if quantization == "binary":
+        return _pack_signs(matrix), None
+    if quantization == "int8":
+        if scales is None:
+            scales = np.abs(matrix).max(axis=0) / 127.0 if len(matrix) else np.ones(matrix.shape[1])
+            scales[scales == 0] = 1.0
+        scales = np.asarray(scales, dtype=np.float32)
+        return np.clip(np.round(matrix / scales), -127, 127).astype(np.int8), scales.tolist()
+    return matrix.astype(np.float32), None
+
+
+def _save_flat_index(persist_directory: str, sidecar: dict, matrix=None, codes=None):
+    """Writes the files of a flat index, then removes the one its settings no longer use."""
+    paths = {FLAT_MATRIX_FILENAME: matrix, FLAT_CODES_FILENAME: codes}
+    for filename, array in paths.items():
+        if array is not None:
+            _replace_atomically(os.path.join(persist_directory, filename), lambda f: np.save(f, array))
+    # The sidecar decides which files a loader reads, so it replaces the old one before they go
+    _replace_atomically(os.path.join(persist_directory, FLAT_METADATA_FILENAME),
+                        lambda f: f.write(json.dumps(sidecar).encode("utf-8")))
+    for filename, array in paths.items():
+        path = os.path.join(persist_directory, filename)
+        if array is None and os.path.exists(path):
+            os.remove(path)
+
+
+def write_flat_index(persist_directory: str, embeddings, ids: list[str], documents: list[str],
+                     metadatas: list[dict], dtype: str = FLAT_INDEX_DTYPE,
+                     quantization: str | None = FLAT_INDEX_QUANTIZATION,
+                     dimensions: int | None = FLAT_INDEX_DIMENSIONS,
+                     collection_metadata: dict | None = None,
+                     collection_name: str = CHROMA_COLLECTION_NAME) -> int:
+    """
+    Writes a flat index: a JSON sidecar holding the chunk IDs, texts and
+    metadata, and an .npy matrix of L2-normalized vectors (float32 or
+    float16). With quantization or dimensions set, compressed codes (see
+    quantize_vectors) are written instead of the matrix; the full-precision
+    vectors a query re-scores are then read from collection_name in the
+    ChromaDB database in persist_directory. Returns the number of chunks.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    matrix = _normalize(matrix) if matrix.size else matrix.reshape(0, 0)
+
+    sidecar = {
+        "ids": list(ids),
+        "documents": list(documents),
+        "metadatas": [dict(m or {}) for m in metadatas],
+        "dtype": dtype,
+        "quantization": quantization,
+        "dimensions": None,
+        "scales": None,
+        "vector_dimensions": matrix.shape[1],
+        "collection_name": collection_name,
+        "collection_metadata": dict(collection_metadata or {}),
+        "collection_version": read_collection_version(persist_directory),
+    }
+    if quantization is None and dimensions is None:
+        _save_flat_index(persist_directory, sidecar, matrix=matrix.astype(dtype))
+    else:
+        codes, sidecar["scales"] = quantize_vectors(matrix, quantization, dimensions)
+        sidecar["dimensions"] = _code_dimensions(matrix.shape[1], quantization, dimensions)
+        _save_flat_index(persist_directory, sidecar, codes=codes)
+    return len(sidecar["ids"])
+
+
+def export_flat_index(collection, persist_directory: str, dtype: str = FLAT_INDEX_DTYPE,
+                      quantization: str | None = FLAT_INDEX_QUANTIZATION,
+                      dimensions: int | None = FLAT_INDEX_DIMENSIONS) -> int:
+    """Exports a ChromaDB collection as a flat index (see write_flat_index). Returns the number of chunks."""
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    return write_flat_index(persist_directory, data["embeddings"], data["ids"], data["documents"],
+                            data["metadatas"], dtype, quantization, dimensions, collection.metadata,
+                            collection.name)
+
+
+def refresh_flat_index(collection, persist_directory: str, changed_ids, removed_ids, base_version: str,
+                       dtype: str = FLAT_INDEX_DTYPE, quantization: str | None = FLAT_INDEX_QUANTIZATION,
+                       dimensions: int | None = FLAT_INDEX_DIMENSIONS) -> int:
+    """
+    Brings the flat index in persist_directory in step with the collection
+    after ingestion wrote changed_ids and deleted removed_ids. Returns the
+    number of chunks.
+
+    If the index on disk was exported at base_version, the collection
+    version before those writes, with the same settings, only the changed
+    chunks are read from the collection and merged into it. Otherwise the
+    whole collection is exported again.
+    """
+    try:
+        store = FlatVectorStore.load(persist_directory)
+    except FileNotFoundError:
+        store = None
+    if (store is None or not len(store) or store.info["collection_version"] != base_version
+            or store.info["dtype"] != dtype or store.info["quantization"] != quantization
+            or store.info["dimensions"] != _code_dimensions(store.info["vector_dimensions"], quantization,
+                                                            dimensions)):
+        return export_flat_index(collection, persist_directory, dtype, quantization, dimensions)
+
+    changed_ids = list(changed_ids)
+    replaced = set(changed_ids) | set(removed_ids)
+    kept = [i for i, chunk_id in enumerate(store.ids) if chunk_id not in replaced]
+    data = {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+    if changed_ids:
+        data = collection.get(ids=changed_ids, include=["embeddings", "documents", "metadatas"])
+    added = np.asarray(data["embeddings"], dtype=np.float32).reshape(len(data["ids"]), store.info["vector_dimensions"])
+    sidecar = {
+        **store.info,
+        "ids": [store.ids[i] for i in kept] + list(data["ids"]),
+        "documents": [store.documents[i] for i in kept] + list(data["documents"]),
+        "metadatas": [store.metadatas[i] for i in kept] + [dict(m or {}) for m in data["metadatas"]],
+        "collection_name": collection.name,
+        "collection_metadata": dict(collection.metadata or {}),
+        "collection_version": read_collection_version(persist_directory),
+    }
+    if store.codes is None:
+        matrix = np.concatenate([np.asarray(store.matrix[kept], dtype=np.float32), _normalize(added)])
+        arrays = {"matrix": matrix.astype(dtype)}
+    else:
+        # New rows are quantized with the scales of the export, so the kept codes stay comparable
+        codes, _ = quantize_vectors(_normalize(added), quantization, dimensions, store.info["scales"])
+        arrays = {"codes": np.concatenate([np.asarray(store.codes[kept]), codes])}
+    # The new files replace the ones this store has mapped
+    del store
+    _save_flat_index(persist_directory, sidecar, **arrays)
+    return len(sidecar["ids"])
+
+
+class CollectionVectors:
+    """
+    Reads full-precision vectors by chunk ID from a ChromaDB collection, for
+    re-scoring the candidates of a compressed flat index. The client is
+    opened on the first read, so loading the index does not start ChromaDB.
+    """
+
+    def __init__(self, persist_directory: str, collection_name: str):
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self._collection = None
+
+    def __call__(self, ids: list[str]) -> dict:
+        """Returns a vector for each ID still in the collection."""
+        if self._collection is None:
+            import chromadb
+
+            client = chromadb.PersistentClient(path=self.persist_directory)
+            self._collection = client.get_collection(self.collection_name)
+        data = self._collection.get(ids=list(ids), include=["embeddings"])
+        # Chroma does not return them in the order asked for
+        return dict(zip(data["ids"], data["embeddings"]))
+
+
+class FlatVectorStore(VectorStore):
+    """
+    A read-only vector store over a flat index written by export_flat_index.
+
+    The matrix is memory-mapped, so loading is near-instant and every
+    process on the machine shares the same page-cached copy. A query is one
+    matrix-vector product plus argpartition for the top k, which for a few
+    thousand chunks beats an HNSW graph without its startup cost.
+    Scores are cosine similarities.
+
+    A compressed index has codes instead of the matrix. A query scans the
+    codes, then re-scores the best k * rescore_factor rows at full
+    precision, with the vectors that vectors (by default a CollectionVectors
+    over the ChromaDB collection) returns for their chunk IDs.
+    """
+
+    def __init__(self, matrix, ids: list[str], documents: list[str], metadatas: list[dict],
+                 embedding=None, info: dict | None = None, codes=None,
+                 rescore_factor: int = FLAT_INDEX_RESCORE_FACTOR, vectors=None):
+        if matrix is None and (codes is None or vectors is None):
+            raise ValueError("A flat index without a matrix needs codes and a source of vectors to re-score.")
+        rows = len(matrix) if matrix is not None else len(codes)
+        if len(ids) != rows:
+            raise ValueError(f"Flat index has {rows} vectors but {len(ids)} chunk records.")
+        if codes is not None and len(codes) != rows:
+            raise ValueError(f"Flat index has {rows} vectors but {len(codes)} compressed ones.")
+        self.matrix = matrix
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self._embedding = embedding
+        self.info = info or {}
+        self.codes = codes
+        self.vectors = vectors
+        self.rescore_factor = rescore_factor
+        scales = self.info.get("scales")
+        self._scales = np.asarray(scales, dtype=np.float32) if scales is not None else None
+        self._words = codes.view(np.uint64) if self.info.get("quantization") == "binary" else None
+
+    @classmethod
+    def load(cls, persist_directory: str = CHROMA_PERSIST_DIRECTORY, embedding=None,
+             rescore_factor: int = FLAT_INDEX_RESCORE_FACTOR, vectors=None):
+        """
+        Opens the flat index in persist_directory. A compressed one re-scores
+        with vectors, by default read from the ChromaDB collection it was
+        exported from.
+
+        Raises:
+            FileNotFoundError: If no flat index has been exported there.
+        """
+        with open(os.path.join(persist_directory, FLAT_METADATA_FILENAME), encoding="utf-8") as f:
+            sidecar = json.load(f)
+        matrix = codes = None
+        if sidecar.get("dimensions") is None:
+            matrix = np.load(os.path.join(persist_directory, FLAT_MATRIX_FILENAME), mmap_mode="r")
+        else:
+            codes = np.load(os.path.join(persist_directory, FLAT_CODES_FILENAME), mmap_mode="r")
+            if vectors is None:
+                vectors = CollectionVectors(persist_directory, sidecar["collection_name"])
+        info = {key: sidecar.get(key) for key in ("dtype", "quantization", "dimensions", "scales",
+                                                  "vector_dimensions", "collection_name",
+                                                  "collection_metadata", "collection_version")}
+        return cls(matrix, sidecar["ids"], sidecar["documents"], sidecar["metadatas"], embedding, info,
+                   codes, rescore_factor, vectors)
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search_vector(self, vector, k: int) -> list[tuple[int, float]]:
+        """Returns up to k (row, cosine similarity) pairs, best first."""
+        return self.search_vectors([vector], k)[0]
+
+    def search_vectors(self, vectors, k: int) -> list[list[tuple[int, float]]]:
+        """Searches several query vectors with one matrix product; one search_vector result per vector."""
+        if not len(vectors) or not len(self.ids) or k <= 0:
+            return [[] for _ in vectors]
+        queries = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1))
+        if self.codes is None:
+            return [[(int(i), float(scores[i])) for i in _top(scores, k)] for scores in (self.matrix @ queries.T).T]
+
+        candidates = [_top(scores, k * self.rescore_factor) for scores in self._scan_codes(queries)]
+        rescored = self._rescoring_vectors(np.unique(np.concatenate(candidates)))
+        results = []
+        for query, rows in zip(queries, candidates):
+            rows = [row for row in rows.tolist() if row in rescored]
+            if not rows:
+                results.append([])
+                continue
+            exact = _normalize(np.stack([rescored[row] for row in rows])) @ query
+            results.append([(rows[i], float(exact[i])) for i in _top(exact, k)])
+        return results
+
+    def _rescoring_vectors(self, rows: np.ndarray) -> dict:
+        """Full-precision vectors of the rows, by row; rows whose chunk has left the collection are missing."""
+        if self.matrix is not None:
+            # Sorted rows: the matrix is read front to back
+            return dict(zip(rows.tolist(), np.asarray(self.matrix[rows], dtype=np.float32)))
+        fetched = self.vectors([self.ids[row] for row in rows])
+        return {int(row): np.asarray(fetched[self.ids[row]], dtype=np.float32)
+                for row in rows if self.ids[row] in fetched}
+
+    def _scan_codes(self, queries: np.ndarray) -> np.ndarray:
+        """First pass over the compressed codes: one row of approximate scores per query, higher is better."""
+        queries = _truncate(queries, self.info.get("dimensions"))
+        if self.info.get("quantization") == "binary":
+            # Negated Hamming distance between the sign bits
+            return np.stack([-np.bitwise_count(self._words ^ query).sum(axis=1, dtype=np.int32)
+                             for query in _pack_signs(queries).view(np.uint64)])
+        if self.info.get("quantization") == "int8":
+            # codes * scales approximates the vectors, so fold the scales into the queries
+            queries = (queries * self._scales).T.astype(np.float32)
+            scores = np.empty((queries.shape[1], len(self.codes)), dtype=np.float32)
+            rows = max(1, _SCAN_BLOCK_BYTES // (4 * self.codes.shape[1]))
+            buffer = np.empty((rows, self.codes.shape[1]), dtype=np.float32)
+            for start in range(0, len(self.codes), rows):
+                codes = self.codes[start:start + rows]
+                block = buffer[:len(codes)]
+                np.copyto(block, codes, casting="unsafe")
+                scores[:, start:start + len(codes)] = (block @ queries).T
+            return scores
+        return (self.codes @ queries.T).T
+
+    def _document(self, i: int) -> Document:
+        return Document(id=self.ids[i], page_content=self.documents[i], metadata=dict(self.metadatas[i]))
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4, **kwargs):
+        return [(self._document(i), score) for i, score in self.search_vector(embedding, k)]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs) -> list[Document]:
+        return [self._document(i) for i, _ in self.search_vector(embedding, k)]
+
+    def similarity_search_by_vectors(self, embeddings, k: int = 4) -> list[list[Document]]:
+        return [[self._document(i) for i, _ in hits] for hits in self.search_vectors(embeddings, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs):
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k)
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> relevance in [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("FlatVectorStore is read-only; build it from a collection with export_flat_index.")
+
+
+if __name__ == "__main__":
+    import chromadb
+
+    parser = argparse.ArgumentParser(description="Export a ChromaDB collection as a memory-mapped flat index.")
+    parser.add_argument("--persist-directory", default=CHROMA_PERSIST_DIRECTORY)
+    parser.add_argument("--collection", default=CHROMA_COLLECTION_NAME)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default=FLAT_INDEX_DTYPE)
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default=FLAT_INDEX_QUANTIZATION,
+                        help="Write compressed codes instead of the matrix; matches are re-scored from ChromaDB.")
+    parser.add_argument("--dimensions", type=int, default=FLAT_INDEX_DIMENSIONS,
+                        help="Dimensions kept in the compressed codes.")
+    args = parser.parse_args()
+
+    collection = chromadb.PersistentClient(path=args.persist_directory).get_collection(args.collection)
+    count = export_flat_index(collection, args.persist_directory, args.dtype, args.quantization, args.dimensions)
+    if args.quantization or args.dimensions:
+        print(f"Exported {count} chunks as {args.quantization or 'float32'} codes, {args.dimensions or 'all'} "
+              f"dimensions, to {os.path.join(args.persist_directory, FLAT_CODES_FILENAME)}; "
+              f"re-scored x{FLAT_INDEX_RESCORE_FACTOR} from ChromaDB")
+    else:
+        print(f"Exported {count} chunks as {args.dtype} to {os.path.join(args.persist_directory, FLAT_MATRIX_FILENAME)}")
@@ -0,0 +1,375 @@
+# html_engine.py
+#
+# A fast engine for ingestion.preprocess_html_content: libxml2 (through lxml)
+# instead of the pure-Python html.parser, one iterative walk over the tree, and
+# tables linearized directly instead of round-tripping through pd.read_html.
+#
+# Its output is byte-for-byte that of the legacy BeautifulSoup engine. The two
+# parsers build different trees from some markup (entities, stray content
+# outside <body>, nested links, ...); pages using such markup raise
+# UnsupportedMarkup and are left to the legacy engine.
+
+import importlib.util
+import re
+from html.entities import html5, name2codepoint
+from urllib.parse import urljoin
+
+from bs4.dammit import EntitySubstitution
+from lxml import etree
+
+# Tried in order; the first element matching a selector is the page's main content
+MAIN_CONTENT_SELECTORS = ['main', 'article', '#content', '#main-content', '.main-content', '.content']
+# Main content elements libxml2 never closes early (it ends a <p> at the next
+# <div>, say, where html.parser nests the <div> inside the <p>)
+MAIN_CONTENT_TAGS = frozenset(['main', 'article', 'section', 'div', 'aside', 'nav', 'header', 'footer',
+                               'blockquote', 'body'])
+# Children of these elements are not indexed (see ingestion.tag_visible)
+HIDDEN_PARENTS = frozenset(['style', 'script', 'head', 'title', 'meta'])
+# Elements recorded in the outline (see extract_text)
+OUTLINE_TAGS = {'h1': 'heading', 'h2': 'heading', 'h3': 'heading', 'h4': 'heading', 'h5': 'heading',
+                'h6': 'heading', 'li': 'item'}
+# BeautifulSoup's get_text() leaves out strings inside these elements
+GET_TEXT_SKIPPED = ('script', 'style', 'template', 'rt', 'rp')
+
+# pd.read_html(flavor='bs4') needs html5lib. Without it, the legacy engine's
+# read_html call fails and every table is indexed as its raw text.
+PANDAS_TABLES = importlib.util.find_spec("html5lib") is not None
+
+# Parse errors after which libxml2's tree differs from html.parser's: stray end
+# tags (which split text in html.parser but not in libxml2) and misplaced
+# <html>, <head> or <body> tags. Fatal errors, e.g. nesting deeper than
+# libxml2's limit, drop the rest of the page.
+_TREE_ERRORS = [etree.ErrorTypes.ERR_TAG_NAME_MISMATCH, etree.ErrorTypes.HTML_STRUCURE_ERROR]
+_GET_TEXT = etree.XPath(
+    "descendant::text()[not(" + " or ".join(f"ancestor::{tag}" for tag in GET_TEXT_SKIPPED) + ")]",
+    smart_strings=False,
+)
+
+# Markup the parsers disagree on: control characters, processing instructions,
+# CDATA sections, declarations other than a leading doctype, malformed
+# comments and repeated attributes (html.parser keeps the last, libxml2 the first)
+_CONTROL_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]")
+_DECLARATIONS = re.compile(r"<\?|<!\[|<!(?!--)|<!---?>|--!>")
+_REPEATED_ATTRIBUTE = re.compile(r"<[A-Za-z][^>]*?\s(href|id|class|style)\s*=[^>]*?\s\1\s*=", re.IGNORECASE)
+_ENTITY = re.compile(r"&(?:#([xX][0-9a-fA-F]+|[0-9]+)?|([A-Za-z][A-Za-z0-9]*))(;?)")
+# html.parser decodes these without a semicolon ("&copy", and in attributes
+# "&copyright" too); libxml2 leaves them alone
+_BARE_ENTITY_PREFIXES = tuple(name for name in html5 if not name.endswith(';'))
+_BS4_ENTITIES = EntitySubstitution.HTML_ENTITY_TO_CHARACTER
+# Named references both parsers decode to the same character
+_SAFE_ENTITIES = frozenset(
+    name for name, codepoint in name2codepoint.items()
+    if html5.get(f"{name};") == chr(codepoint) and _BS4_ENTITIES.get(name) == chr(codepoint)
+)
+# libxml2 closes an open link at these start tags; html.parser does not
+_ANCHOR_TAG = re.compile(r"<(/?)(a|fieldset|table|td|th)[\s>/]", re.IGNORECASE)
+_BODY_TAG = re.compile(r"<body[\s>/]", re.IGNORECASE)
+_RAW_TEXT_START = re.compile(r"<(script|style)[\s>/]", re.IGNORECASE)
+_RAW_TEXT_END = re.compile(r"</(script|style)\s*>", re.IGNORECASE)
+_TITLE_TAG = re.compile(r"<title[\s>/]", re.IGNORECASE)
+_BODY_END = re.compile(r"</body\s*>", re.IGNORECASE)
+_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+_BEFORE_BODY = re.compile(
+    r"<!doctype[^>]*>|</?html[^>]*>|<head[\s>].*?</head\s*>|</?head\s*>", re.IGNORECASE | re.DOTALL
+)
+_AFTER_BODY = re.compile(r"</html\s*>", re.IGNORECASE)
+
+# pandas' TextParser strips thousands separators from numbers in any column
+_PANDAS_NUMBER = re.compile(r"^[\-\+]?([0-9]+,|[0-9])*(\.[0-9]*)?([0-9]?(E|e)\-?[0-9]+)?$")
+_PANDAS_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+_PANDAS_BOOLEANS = frozenset(['true', 'false'])
+
+
+class UnsupportedMarkup(Exception):
+    """Raised for pages the fast engine cannot extract exactly like the legacy engine."""
+
+
+def _safe_codepoint(codepoint: int) -> bool:
+    return (codepoint in (9, 10, 13) or 32 <= codepoint < 127 or 160 <= codepoint < 0xD800
+            or 0xE000 <= codepoint < 0x110000 and codepoint not in (0xFFFE, 0xFFFF))
+
+
+def _check_markup(html_content: str):
+    """Raises UnsupportedMarkup if the parsers would read the page's characters differently."""
+    if _CONTROL_CHARS.search(html_content):
+        raise UnsupportedMarkup("control characters")
+    leading_space = len(html_content) - len(html_content.lstrip())
+    for match in _DECLARATIONS.finditer(html_content):
+        if not (match.start() == leading_space and html_content[leading_space:leading_space + 9].lower() == '<!doctype'):
+            raise UnsupportedMarkup("processing instruction, CDATA section, declaration or malformed comment")
+    if _REPEATED_ATTRIBUTE.search(html_content):
+        raise UnsupportedMarkup("repeated attribute")
+
+    for match in _ENTITY.finditer(html_content):
+        number, name, semicolon = match.groups()
+        if name is None:
+            if number is None:
+                raise UnsupportedMarkup(f"character reference {match.group()!r}")
+            codepoint = int(number[1:], 16) if number[0] in 'xX' else int(number)
+            if not semicolon or not _safe_codepoint(codepoint):
+                raise UnsupportedMarkup(f"character reference {match.group()!r}")
+        elif semicolon:
+            if name not in _SAFE_ENTITIES:
+                raise UnsupportedMarkup(f"entity {match.group()!r}")
+        elif name in _BS4_ENTITIES or name.startswith(_BARE_ENTITY_PREFIXES):
+            raise UnsupportedMarkup(f"entity without semicolon {match.group()!r}")
+
+    # An unclosed <script> or <style> (or a self-closing <script/>) hides the
+    # rest of the page from html.parser but not always from libxml2
+    starts = sorted(tag.lower() for tag in _RAW_TEXT_START.findall(html_content))
+    if starts != sorted(tag.lower() for tag in _RAW_TEXT_END.findall(html_content)):
+        raise UnsupportedMarkup("unclosed <script> or <style>")
+
+    # libxml2 reads a <title> inside the body differently
+    body = _BODY_TAG.search(html_content)
+    if body and _TITLE_TAG.search(html_content, body.end()):
+        raise UnsupportedMarkup("<title> inside <body>")
+
+    # html.parser nests links and tables inside links; libxml2 closes the link first
+    depth = 0
+    for match in _ANCHOR_TAG.finditer(html_content):
+        closing, tag = match.group(1), match.group(2).lower()
+        if tag == 'a':
+            depth = max(depth - 1, 0) if closing else depth + 1
+            if depth > 1:
+                raise UnsupportedMarkup("nested links")
+        elif depth and not closing:
+            raise UnsupportedMarkup(f"<{tag}> inside a link")
+        elif closing:
+            depth = 0
+
+
+def _check_body(html_content: str):
+    """
+    Raises UnsupportedMarkup if the page has content outside <body>, which
+    libxml2 moves into the body and html.parser does not.
+    """
+    body_tags = _BODY_TAG.findall(html_content)
+    if len(body_tags) != 1:
+        raise UnsupportedMarkup(f"{len(body_tags)} <body> tags")
+    start = _BODY_TAG.search(html_content).start()
+    before = _BEFORE_BODY.sub("", _COMMENT.sub("", html_content[:start]))
+    if before.strip():
+        raise UnsupportedMarkup("content before <body>")
+    ends = list(_BODY_END.finditer(html_content))
+    if ends:
+        after = _AFTER_BODY.sub("", _COMMENT.sub("", html_content[ends[-1].end():]))
+        if after.strip():
+            raise UnsupportedMarkup("content after </body>")
+
+
+def _find_main_content(root):
+    for selector in MAIN_CONTENT_SELECTORS:
+        if selector[0] == '#':
+            matches = root.xpath("//*[@id=$value]", value=selector[1:])
+        elif selector[0] == '.':
+            matches = [element for element in root.xpath("//*[@class]")
+                       if selector[1:] in element.get('class').split()]
+        else:
+            matches = root.xpath(f"//{selector}")
+        if matches:
+            return matches[0]
+    return None
+
+
+def _raw_table_parts(table) -> list[str]:
+    """The table as the legacy engine indexes it when pandas cannot parse it: its raw text."""
+    return ["--- Start of Raw Table Content ---", *_GET_TEXT(table), "--- End of Raw Table Content ---"]
+
+
+def _cell_text(cell) -> str:
+    """A cell's text as pandas reads it: <br> is a line break, runs of whitespace become one space."""
+    if cell.find('.//br') is None:
+        text = "".join(_GET_TEXT(cell))
+    else:
+        pieces = [cell.text or ""]
+        for element in cell.iterdescendants():
+            if element.tag == 'br':
+                pieces.append("\n")
+            elif isinstance(element.tag, str):
+                pieces.append(element.text or "")
+            pieces.append(element.tail or "")
+        text = "".join(pieces)
+    text = _PANDAS_WHITESPACE.sub(" ", text.strip())
+    if "\t" in text or "\ufeff" in text or "," in text and _PANDAS_NUMBER.search(text):
+        # pandas prints tabs escaped, strips byte order marks and thousands separators
+        raise UnsupportedMarkup(f"table cell {text!r}")
+    return text
+
+
+def _is_text(value: str) -> bool:
+    """True if pandas would keep value, and therefore its column, as a string."""
+    if not value or value.lower() in _PANDAS_BOOLEANS:
+        return False
+    try:
+        float(value)
+    except ValueError:
+        return True
+    return False
+
+
+def _pandas_table_parts(table) -> list[str]:
+    """
+    The text of df.to_string(index=False) for the DataFrame pd.read_html
+    makes of a plain table: one header row (or none), no spanned cells and
+    a string in every column. Anything else raises UnsupportedMarkup.
+    """
+    if table.xpath("descendant::*[self::table or self::tfoot or self::script or self::style or self::template "
+                   "or self::rt or self::rp or @rowspan or @colspan] or descendant-or-self::*[contains(@style, 'display')]"):
+        raise UnsupportedMarkup("table with nested tables, spans, footers, scripts or hidden cells")
+    if len(table.findall('.//caption')) != len(table.findall('caption')):
+        raise UnsupportedMarkup("caption inside a table cell")
+
+    caption, head_rows, body_rows = None, [], []
+    for child in table:
+        if (child.tail or "").strip():
+            raise UnsupportedMarkup("text between table rows")
+        if not isinstance(child.tag, str) or child.tag in ('colgroup', 'col'):
+            continue
+        if child.tag == 'caption':
+            caption = caption if caption is not None else child
+        elif child.tag in ('thead', 'tbody'):
+            if (child.text or "").strip():
+                raise UnsupportedMarkup("text between table rows")
+            rows = [row for row in child if isinstance(row.tag, str)]
+            (head_rows if child.tag == 'thead' else body_rows).extend(rows)
+            if any((row.tail or "").strip() for row in child):
+                raise UnsupportedMarkup("text between table rows")
+        elif child.tag == 'tr':
+            body_rows.append(child)
+        else:
+            raise UnsupportedMarkup(f"<{child.tag}> in a table")
+    if (table.text or "").strip():
+        raise UnsupportedMarkup("text between table rows")
+
+    rows = []
+    for row in head_rows + body_rows:
+        if row.tag != 'tr' or (row.text or "").strip():
+            raise UnsupportedMarkup("malformed table row")
+        cells = [cell for cell in row if isinstance(cell.tag, str)]
+        if not cells or any(cell.tag not in ('td', 'th') for cell in cells) \
+                or any((node.tail or "").strip() for node in row):
+            raise UnsupportedMarkup("malformed table row")
+        rows.append(([_cell_text(cell) for cell in cells], all(cell.tag == 'th' for cell in cells)))
+
+    # Without a <thead>, leading rows of <th> cells are the header
+    header_count = len(head_rows)
+    if not header_count:
+        while header_count < len(rows) and rows[header_count][1]:
+            header_count += 1
+    header = [cells for cells, _ in rows[:header_count]]
+    body = [cells for cells, _ in rows[header_count:]]
+    if len(header) > 1 or not body:
+        raise UnsupportedMarkup("table with several header rows or no body")
+
+    width = len(body[0])
+    if any(len(cells) != width for cells in header + body):
+        raise UnsupportedMarkup("ragged table")
+    names = header[0] if header else [str(i) for i in range(width)]
+    if not all(names) or len(set(names)) != width:
+        raise UnsupportedMarkup("table with empty or duplicate column names")
+    if not all(any(_is_text(cells[i]) for cells in body) for i in range(width)):
+        raise UnsupportedMarkup("table with numeric or boolean columns")
+
+    parts = ["--- Start of Table ---"]
+    if caption is not None:
+        parts.append(f"Table Caption: {''.join(s.strip() for s in _GET_TEXT(caption))}")
+    parts.extend(names)
+    for cells in body:
+        parts.extend(cells)
+    parts.append("--- End of Table ---")
+    return parts
+
+
+def _anchor_text(anchor, base_page_url: str) -> str:
+    if anchor.find('.//table') is not None:
+        raise UnsupportedMarkup("table inside a link")
+    anchor_text = "".join(s.strip() for s in _GET_TEXT(anchor))
+    href = anchor.get('href').strip()
+    if anchor_text and href and not href.startswith('#'):
+        return f"{anchor_text} ({urljoin(base_page_url, href)})"
+    return anchor_text
+
+
+def _outline_offsets(parts: list[str], marks: list[tuple]) -> list[tuple[int, str, str]]:
+    """Turns (part index, kind, title) marks into (character offset, kind, title) in the joined text."""
+    outline, offset, part_index = [], 0, 0
+    for index, kind, title in marks:
+        while part_index < index:
+            offset += sum(len(token) + 1 for token in parts[part_index].split())
+            part_index += 1
+        outline.append((offset, kind, title))
+    return outline
+
+
+def extract_text(html_content: str, base_page_url: str, outline: list | None = None) -> str:
+    """
+    Returns exactly what the legacy preprocess_html_content returns for the
+    page: its main content as clean text, with tables linearized and links
+    written as "Anchor Text (URL)".
+
+    Args:
+        outline: Optional list to fill with an (offset, kind, title) tuple
+            for every heading ("heading") and list item ("item") of the main
+            content, where offset is the element's start in the returned text.
+
+    Raises:
+        UnsupportedMarkup: If the page uses markup only the legacy engine handles.
+    """
+    _check_markup(html_content)
+    parser = etree.HTMLParser(remove_comments=False, remove_pis=False, huge_tree=True)
+    try:
+        root = etree.fromstring(html_content, parser)
+    except (ValueError, etree.LxmlError) as e:
+        raise UnsupportedMarkup(f"lxml could not parse the page: {e}")
+    if root is None:
+        raise UnsupportedMarkup("empty document")
+    # "Element script embeds close tag" is harmless: both parsers end a script at its own </script>
+    errors = list(parser.error_log.filter_from_fatals()) or [
+        error for error in parser.error_log.filter_types(_TREE_ERRORS) if "embeds close tag" not in error.message
+    ]
+    if errors:
+        raise UnsupportedMarkup(f"libxml2 reported: {errors[0].message.strip()}")
+
+    main_content = _find_main_content(root)
+    if main_content is None:
+        # libxml2 always adds a <body>; html.parser only has one if the page does
+        if not _BODY_TAG.search(html_content):
+            return ""
+        _check_body(html_content)
+        main_content = root.find('body')
+    if main_content is None or main_content.tag not in MAIN_CONTENT_TAGS:
+        raise UnsupportedMarkup(f"main content in a <{getattr(main_content, 'tag', None)}>")
+
+    table_parts = _pandas_table_parts if PANDAS_TABLES else _raw_table_parts
+    parts, marks = [], []
+    # Depth-first walk with an explicit stack of elements and text still to visit
+    stack = []
+    for child in reversed(main_content):
+        stack.append(child.tail)
+        stack.append(child)
+    stack.append(main_content.text)
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if node.__class__ is str:
+            parts.append(node)
+            continue
+        tag = node.tag
+        if tag.__class__ is not str or tag in HIDDEN_PARENTS:
+            continue
+        if tag == 'table':
+            parts.extend(table_parts(node))
+        elif tag == 'a' and node.get('href'):
+            parts.append(_anchor_text(node, base_page_url))
+        else:
+            if outline is not None and tag in OUTLINE_TAGS:
+                marks.append((len(parts), OUTLINE_TAGS[tag], " ".join(" ".join(_GET_TEXT(node)).split())))
+            for child in reversed(node):
+                stack.append(child.tail)
+                stack.append(child)
+            stack.append(node.text)
+    if outline is not None:
+        outline.extend(_outline_offsets(parts, marks))
+    return " ".join(" ".join(parts).split())
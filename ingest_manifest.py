@@ -0,0 +1,130 @@
+# ingest_manifest.py
+
+import hashlib
+import os
+import sqlite3
+import time
+
+# Stored next to the ChromaDB files it describes.
+MANIFEST_FILENAME = "ingest_manifest.sqlite"
+
+
+def content_hash(text: str) -> str:
+    """Returns a stable hash of a piece of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_ids(url: str, chunks: list[str]) -> list[str]:
+    """
+    Returns "<url>#<content hash>" IDs for a page's chunks, so a chunk keeps
+    its ID when text is inserted or removed elsewhere on the page. Repeated
+    chunk texts get "-2", "-3", ... suffixes.
+    """
+    seen = {}
+    ids = []
+    for chunk in chunks:
+        digest = content_hash(chunk)[:16]
+        seen[digest] = seen.get(digest, 0) + 1
+        ids.append(f"{url}#{digest}" if seen[digest] == 1 else f"{url}#{digest}-{seen[digest]}")
+    return ids
+
+
+class IngestManifest:
+    """
+    Records what the last ingestion wrote for every page: the HTTP
+    validators (ETag / Last-Modified), a hash of the preprocessed text and,
+    for every chunk ID, a hash of the chunk's metadata (its position on the
+    page). Incremental ingestion uses it to skip unchanged pages, embed
+    only new chunks, update the offsets of moved ones and delete orphaned
+    ones.
+
+    chunk_config identifies the splitter settings. When it differs from the
+    stored value, every page is treated as changed.
+    """
+
+    def __init__(self, persist_directory: str, chunk_config: str):
+        os.makedirs(persist_directory, exist_ok=True)
+        self.chunk_config = chunk_config
+        self._conn = sqlite3.connect(os.path.join(persist_directory, MANIFEST_FILENAME))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id TEXT PRIMARY KEY, url TEXT NOT NULL, chunk_hash TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_url ON chunks (url)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS manifest_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        row = self._conn.execute("SELECT value FROM manifest_meta WHERE key = 'chunk_config'").fetchone()
+        if row is None or row[0] != chunk_config:
+            # New splitter settings: forget the validators so every page is re-fetched and re-chunked
+            self._conn.execute("UPDATE pages SET etag = NULL, last_modified = NULL, content_hash = ''")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO manifest_meta (key, value) VALUES ('chunk_config', ?)", (chunk_config,)
+            )
+        self._conn.commit()
+
+    def page_hash(self, text: str) -> str:
+        """Hashes a page's preprocessed text together with the splitter settings."""
+        return content_hash(f"{self.chunk_config}\n{text}")
+
+    def get_page(self, url: str):
+        """Returns the stored record for url as a dict, or None if it was never ingested."""
+        row = self._conn.execute(
+            "SELECT etag, last_modified, content_hash FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "content_hash": row[2]}
+
+    def conditional_headers(self, url: str) -> dict:
+        """Returns the If-None-Match / If-Modified-Since headers for a conditional GET of url."""
+        page = self.get_page(url)
+        headers = {}
+        if page is not None:
+            if page["etag"]:
+                headers["If-None-Match"] = page["etag"]
+            if page["last_modified"]:
+                headers["If-Modified-Since"] = page["last_modified"]
+        return headers
+
+    def chunk_hashes(self, url: str) -> dict:
+        """Returns {chunk_id: chunk_hash} for the chunks last written for url."""
+        rows = self._conn.execute("SELECT id, chunk_hash FROM chunks WHERE url = ?", (url,)).fetchall()
+        return dict(rows)
+
+    def urls(self) -> list[str]:
+        """Returns every URL recorded in the manifest."""
+        return [row[0] for row in self._conn.execute("SELECT url FROM pages")]
+
+    def update_validators(self, url: str, etag: str | None, last_modified: str | None):
+        """Stores fresh HTTP validators for a page whose content did not change."""
+        self._conn.execute(
+            "UPDATE pages SET etag = ?, last_modified = ?, updated_at = ? WHERE url = ?",
+            (etag, last_modified, time.time(), url),
+        )
+        self._conn.commit()
+
+    def record_page(self, url: str, etag: str | None, last_modified: str | None, page_hash: str,
+                    chunk_hashes: dict):
+        """Replaces the stored record for url after its chunks were written."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, updated_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (url, etag, last_modified, page_hash, time.time()),
+        )
+        self._conn.execute("DELETE FROM chunks WHERE url = ?", (url,))
+        self._conn.executemany(
+            "INSERT INTO chunks (id, url, chunk_hash) VALUES (?, ?, ?)",
+            [(chunk_id, url, chunk_hash) for chunk_id, chunk_hash in chunk_hashes.items()],
+        )
+        self._conn.commit()
+
+    def remove_page(self, url: str):
+        """Forgets a page and its chunks."""
+        self._conn.execute("DELETE FROM chunks WHERE url = ?", (url,))
+        self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+        self._conn.commit()
@@ -1,27 +1,59 @@
 # ingestion.py
+import argparse
+import json
 import logging
 import os
+import queue
 import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import NamedTuple
 from urllib.parse import urljoin
 
 import chromadb
+from chromadb import Documents, EmbeddingFunction
 import dotenv
 import pandas as pd
 import requests
 import requests_cache
 from bs4 import BeautifulSoup, Comment, NavigableString, Tag
-# Import ChromaDB's own embedding function utility
-import chromadb.utils.embedding_functions as embedding_functions
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.embeddings import Embeddings
+from requests.adapters import HTTPAdapter
 
+from bm25_index import BM25_INDEX_FILENAME, refresh_bm25_index
+from bulk_upsert import BatchUpserter
+from chunking import chunk_page
+from collection_version import bump_collection_version, read_collection_version
+from crawler import Crawler, crawled_urls
+from flat_index import FLAT_METADATA_FILENAME, refresh_flat_index
+from html_engine import MAIN_CONTENT_SELECTORS, UnsupportedMarkup, extract_text
+from embeddings import (
+    COLLECTION_MODEL_KEY,
+    check_collection_model,
+    embedding_model_id,
+    get_embedding_provider,
+    resolve_provider,
+)
+from ingest_manifest import IngestManifest, chunk_ids, content_hash
+from tokenization import make_token_counter
 # Import settings from the config file
 from config import (
     CHUNK_OVERLAP,
     CHUNK_SIZE,
+    CHUNKER,
     CHROMA_COLLECTION_NAME,
     CHROMA_PERSIST_DIRECTORY,
+    CRAWL_MAX_DEPTH,
+    CRAWL_MAX_PAGES,
     EMBEDDING_MODEL_NAME,
+    FAQ_INDEX_PATH,
+    HTML_ENGINE,
+    INGEST_FETCH_WORKERS,
+    INGEST_INCREMENTAL,
+    INGEST_PARALLEL,
+    INGEST_PARSE_WORKERS,
+    INGEST_QUEUE_SIZE,
     URLS,
+    VECTOR_STORE_BACKEND,
 )
 
 # --- Set up structured logging ---
@@ -30,11 +62,14 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # --- Enable request caching for web scraping ---
 requests_cache.install_cache('web_cache', backend='sqlite', expire_after=86400)
 
-# --- Load OpenAI API Key ---
+# --- Load OpenAI API Key (only needed for OpenAI embeddings) ---
 dotenv.load_dotenv()
-if not os.getenv("OPENAI_API_KEY"):
+if resolve_provider(EMBEDDING_MODEL_NAME) == "openai" and not os.getenv("OPENAI_API_KEY"):
     raise ValueError("Error: OPENAI_API_KEY environment variable not set.")
 
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
 
 def tag_visible(element):
     """Helper function to filter out non-visible HTML elements."""
@@ -44,16 +79,41 @@ def tag_visible(element):
         return False
     return True
 
-def preprocess_html_content(html_content: str, base_page_url: str):
+def preprocess_html_content(html_content: str, base_page_url: str, engine: str = HTML_ENGINE,
+                            outline: list | None = None):
     """
     Preprocesses HTML content to extract clean text, linearize tables,
     and embed hyperlink URLs with their anchor text in the format: Anchor Text(URL).
+
+    Args:
+        engine: "lxml" for the fast engine in html_engine.py, which hands pages
+            it cannot reproduce exactly to the legacy engine, or "html.parser"
+            for the legacy BeautifulSoup engine alone. Both return the same text.
+        outline: Optional list to fill with the page's headings and list
+            items (see html_engine.extract_text). Only the lxml engine
+            records them; it stays empty for pages the legacy engine handles.
     """
+    if engine == "lxml":
+        try:
+            return extract_text(html_content, base_page_url, outline)
+        except UnsupportedMarkup as e:
+            logging.debug(f"Using the legacy HTML engine for {base_page_url}: {e}")
+    elif engine != "html.parser":
+        raise ValueError(f"Unknown HTML engine {engine!r}; expected 'lxml' or 'html.parser'.")
+    return legacy_preprocess_html_content(html_content, base_page_url)
+
+def preprocess_page(html_content: str, base_page_url: str):
+    """Returns the (text, outline) of a page for the structure-aware chunker (see chunking.py)."""
+    outline = []
+    text = preprocess_html_content(html_content, base_page_url, outline=outline)
+    return text, outline
+
+def legacy_preprocess_html_content(html_content: str, base_page_url: str):
+    """The original BeautifulSoup engine behind preprocess_html_content."""
     soup = BeautifulSoup(html_content, 'html.parser')
 
-    main_content_selectors = ['main', 'article', '#content', '#main-content', '.main-content', '.content']
     main_content = None
-    for selector in main_content_selectors:
+    for selector in MAIN_CONTENT_SELECTORS:
         main_content = soup.select_one(selector)
         if main_content:
             break
@@ -117,90 +177,416 @@ def preprocess_html_content(html_content: str, base_page_url: str):
     cleaned_text = " ".join(text_with_links.split())
     return cleaned_text
 
-def rag_ingest_urls(urls: list[str], collection_name: str, persist_directory: str):
+class ChromaEmbeddingAdapter(EmbeddingFunction[Documents]):
+    """Lets ChromaDB embed documents with a LangChain embedding provider."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def __call__(self, input: Documents):
+        return self.embeddings.embed_documents(list(input))
+
+
+class FetchedPage(NamedTuple):
+    """A fetched page. html is None when the server answered 304 Not Modified."""
+    url: str
+    html: str | None
+    etag: str | None
+    last_modified: str | None
+
+class ProcessedPage(NamedTuple):
     """
-    Scrapes URLs, preprocesses content, and ingests it into ChromaDB using OpenAI embeddings.
+    A preprocessed page. text is None when the page was not modified.
+    outline lists its headings and list items (see preprocess_page), if known.
     """
-    logging.info("Starting RAG ingestion process with OpenAI embeddings...")
-    client = chromadb.PersistentClient(path=persist_directory)
+    url: str
+    text: str | None
+    etag: str | None
+    last_modified: str | None
+    outline: list | None = None
 
-    # Use ChromaDB's native OpenAI Embedding Function
-    embedding_function = embedding_functions.OpenAIEmbeddingFunction(
-        api_key=os.environ.get('OPENAI_API_KEY'),
-        model_name=EMBEDDING_MODEL_NAME
-    )
+def make_session(pool_size: int = INGEST_FETCH_WORKERS, use_http_cache: bool = True):
+    """Creates an HTTP session whose connection pool can serve pool_size threads at once."""
+    session = requests.Session()
+    if not use_http_cache and hasattr(session, 'settings'):
+        # Conditional GETs must reach the server, not the local requests_cache copy
+        session.settings.disabled = True
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def fetch_page(session, url: str, conditional_headers: dict | None = None):
+    """
+    Fetches a single page, optionally as a conditional GET.
+
+    Returns:
+        A FetchedPage, or None if the request failed or the page is not HTML.
+    """
+    logging.info(f"Processing URL: {url}")
+    try:
+        response = session.get(url, headers={**REQUEST_HEADERS, **(conditional_headers or {})}, timeout=20)
+
+        if getattr(response, 'from_cache', False):
+            logging.info(f"Loaded from cache: {url}")
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code == 304:
+            return FetchedPage(url, None, etag, last_modified)
+
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '').lower()
+        if 'text/html' not in content_type:
+            logging.warning(f"Skipping URL {url} as it is not HTML (Content-Type: {content_type})")
+            return None
+        return FetchedPage(url, response.text, etag, last_modified)
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Error fetching URL {url}: {e}")
+        return None
+
+def _iter_processed_pages_sequential(urls: list[str], conditional_headers, use_http_cache: bool):
+    session = make_session(1, use_http_cache)
+    for url in urls:
+        fetched = fetch_page(session, url, conditional_headers(url) if conditional_headers else None)
+        if fetched is None:
+            continue
+        if fetched.html is None:
+            yield ProcessedPage(url, None, fetched.etag, fetched.last_modified)
+            continue
+        try:
+            text, outline = preprocess_page(fetched.html, url)
+            yield ProcessedPage(url, text, fetched.etag, fetched.last_modified, outline)
+        except Exception as e:
+            logging.error(f"Error processing content from {url}: {e}", exc_info=True)
+
+def _iter_processed_pages_pipelined(urls: list[str], conditional_headers, use_http_cache: bool,
+                                    fetch_workers: int, parse_workers: int | None, queue_size: int):
+    # Stage 1 fetches on a thread pool sharing one pooled session and hands each
+    # page to stage 2, a process pool running preprocess_page. The bounded
+    # queue between them blocks fetchers when preprocessing falls behind, so at
+    # most queue_size pages are held in memory.
+    session = make_session(fetch_workers, use_http_cache)
+    handoff = queue.Queue(maxsize=queue_size)
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool, \
+            ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool:
+
+        def fetch_stage(url):
+            # Always hand something over, so the consumer can count pages off
+            fetched, future = None, None
+            try:
+                fetched = fetch_page(session, url, conditional_headers(url) if conditional_headers else None)
+                if fetched is not None and fetched.html is not None:
+                    future = parse_pool.submit(preprocess_page, fetched.html, url)
+            finally:
+                handoff.put((fetched, future))
+
+        fetch_futures = [fetch_pool.submit(fetch_stage, url) for url in urls]
+        try:
+            for _ in range(len(urls)):
+                fetched, future = handoff.get()
+                if fetched is None:
+                    continue
+                if future is None:
+                    yield ProcessedPage(fetched.url, None, fetched.etag, fetched.last_modified)
+                    continue
+                try:
+                    text, outline = future.result()
+                    yield ProcessedPage(fetched.url, text, fetched.etag, fetched.last_modified, outline)
+                except Exception as e:
+                    logging.error(f"Error processing content from {fetched.url}: {e}", exc_info=True)
+        finally:
+            # If the consumer stopped early, cancel queued fetches and unblock running ones
+            for fetch_future in fetch_futures:
+                fetch_future.cancel()
+            while not all(f.done() for f in fetch_futures):
+                try:
+                    handoff.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+def iter_processed_pages(urls: list[str], parallel: bool = INGEST_PARALLEL,
+                         conditional_headers=None,
+                         fetch_workers: int = INGEST_FETCH_WORKERS,
+                         parse_workers: int | None = INGEST_PARSE_WORKERS,
+                         queue_size: int = INGEST_QUEUE_SIZE):
+    """
+    Fetches and preprocesses pages, yielding a ProcessedPage for each.
+
+    With parallel=True pages are fetched on a thread pool and preprocessed on
+    a process pool, and are yielded in completion order rather than list
+    order. Pages that fail to fetch or parse are logged and skipped.
+
+    Args:
+        conditional_headers: Optional callable mapping a URL to the
+            If-None-Match / If-Modified-Since headers for a conditional GET.
+            When given, the local HTTP cache is bypassed and pages answered
+            with 304 Not Modified are yielded with text=None.
+    """
+    use_http_cache = conditional_headers is None
+    if parallel:
+        yield from _iter_processed_pages_pipelined(urls, conditional_headers, use_http_cache,
+                                                   fetch_workers, parse_workers, queue_size)
+    else:
+        yield from _iter_processed_pages_sequential(urls, conditional_headers, use_http_cache)
+
+def iter_crawled_pages(crawler: Crawler, use_http_cache: bool = True):
+    """
+    Crawls from crawler's seeds, yielding a ProcessedPage for every new
+    in-domain page as soon as it is fetched and preprocessed. Pages are
+    always fetched in full, because unchanged pages still link to new ones.
+    """
+    session = make_session(crawler.workers, use_http_cache)
+    for fetched, text, outline in crawler.crawl(lambda url: fetch_page(session, url), preprocess_page, session):
+        yield ProcessedPage(fetched.url, text, fetched.etag, fetched.last_modified, outline)
+
+def rag_ingest_crawl(seeds: list[str], collection_name: str, persist_directory: str, crawler: Crawler | None = None,
+                     **kwargs):
+    """
+    Crawls the site from the seed URLs (see crawler.py) and ingests every
+    page it discovers while the crawl is still running. Takes the same
+    keyword arguments as rag_ingest_urls.
+
+    Pages that are no longer reachable are removed from the collection
+    only once a crawl finishes with nothing pending. A crawl stopped at the
+    page cap has not seen the whole site, so it removes nothing; the next
+    run resumes it.
+    """
+    crawler = crawler or Crawler(seeds, persist_directory)
+
+    def listing():
+        logging.info(f"Crawl finished after {crawler.fetched} requests: {crawler.frontier.counts()}")
+        if crawler.frontier.pending():
+            logging.info("Pages are still pending, so no page is removed until a crawl completes.")
+            return None
+        return crawler.frontier.listed_urls()
+
+    return rag_ingest_urls(crawler.seeds, collection_name, persist_directory, pages=iter_crawled_pages(crawler),
+                           listing=listing, **kwargs)
+
+def rag_ingest_urls(urls: list[str], collection_name: str, persist_directory: str,
+                    incremental: bool = INGEST_INCREMENTAL, embedding_function=None,
+                    embedding_model_name: str = EMBEDDING_MODEL_NAME,
+                    chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP, pages=None,
+                    chunker: str = CHUNKER, listing=None):
+    """
+    Scrapes URLs, preprocesses content, and ingests it into ChromaDB.
+
+    Chunk IDs are derived from the chunk text (see chunk_ids), so editing
+    one part of a page leaves the IDs of its other chunks unchanged.
+
+    With incremental=True a manifest of content hashes (see ingest_manifest.py)
+    is kept next to the collection. Pages are fetched with conditional GETs,
+    only new chunks are embedded and upserted, chunks that merely moved get
+    their offsets updated, and chunk IDs that no longer exist (because their
+    text changed or the page left the URL list) are deleted. An unchanged
+    site therefore costs no embedding calls.
+
+    Chunks are embedded and upserted in token-budgeted batches while pages
+    are still being fetched (see bulk_upsert.py).
+
+    Args:
+        embedding_function: Optional ChromaDB embedding function; defaults to
+            the provider for EMBEDDING_MODEL_NAME (see embeddings.py), the same
+            one the pipeline queries with. The model is then recorded in the
+            collection metadata, and ingesting into a collection built with
+            a different model raises ValueError.
+        embedding_model_name, chunk_size, chunk_overlap, chunker: Index
+            settings; default to config.py.
+        pages: Optional iterable of ProcessedPage to ingest instead of
+            fetching urls, e.g. pages parsed by an earlier run.
+        listing: Optional callable returning the URLs of every page that
+            belongs in the collection, or None if that is not known (e.g. a
+            partial crawl), in which case no page is removed. It is called
+            once pages is exhausted, so a crawl can settle it as it goes.
+            By default the collection keeps the pages of urls and every
+            page the last crawl listed (see crawled_urls), so a run without
+            --crawl leaves crawled pages alone.
+    """
+    model_id = None
+    if embedding_function is None:
+        model_id = embedding_model_id(embedding_model_name)
+        embedding_function = ChromaEmbeddingAdapter(get_embedding_provider(embedding_model_name))
+    logging.info(f"Starting RAG ingestion process with {model_id or 'custom'} embeddings...")
+    client = chromadb.PersistentClient(path=persist_directory)
 
     collection = client.get_or_create_collection(
         name=collection_name,
         embedding_function=embedding_function
     )
+    if model_id:
+        metadata = collection.metadata or {}
+        check_collection_model(metadata, model_id, collection_name)
+        if metadata.get(COLLECTION_MODEL_KEY) != model_id:
+            if collection.count():
+                logging.warning(f"Collection '{collection_name}' has no recorded embedding model; "
+                                f"assuming it was built with {model_id}.")
+            # hnsw:* settings are fixed at creation and may not be passed to modify
+            kept = {k: v for k, v in metadata.items() if not k.startswith("hnsw:")}
+            collection.modify(metadata={**kept, COLLECTION_MODEL_KEY: model_id})
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-        add_start_index=True,
-    )
+    chunk_config = f"{chunker}/{chunk_size}/{chunk_overlap}"
+    manifest = IngestManifest(persist_directory, chunk_config=chunk_config) if incremental else None
 
-    all_chunks, all_metadatas, all_ids = [], [], []
+    # Chunks stream into ChromaDB in token-budgeted batches as pages arrive,
+    # so memory stays flat and a failure costs at most one batch
+    upserter = BatchUpserter(collection, embedding_function, token_counter=make_token_counter(embedding_model_name))
+    deleted = 0
+    moved = 0
+    # Chunk IDs written or deleted by this run: the BM25 and flat indexes are updated from them
+    changed_ids = set()
+    removed_ids = set()
 
-    for url in urls:
-        logging.info(f"Processing URL: {url}")
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=20)
-
-            if response.from_cache:
-                logging.info(f"Loaded from cache: {url}")
-
-            response.raise_for_status()
-            content_type = response.headers.get('Content-Type', '').lower()
-            if 'text/html' not in content_type:
-                logging.warning(f"Skipping URL {url} as it is not HTML (Content-Type: {content_type})")
+    try:
+        if pages is None:
+            pages = iter_processed_pages(urls, conditional_headers=manifest.conditional_headers if manifest else None)
+        for page in pages:
+            url = page.url
+            if page.text is None:
+                logging.info(f"Not modified since last ingestion: {url}")
                 continue
-
-            processed_text = preprocess_html_content(response.text, url)
-
-            if not processed_text:
+            if not page.text:
                 logging.warning(f"No content extracted from {url}")
                 continue
 
-            chunks = text_splitter.split_text(processed_text)
+            page_chunks = chunk_page(page.text, page.outline, chunker, chunk_size, chunk_overlap)
+            chunks = [chunk.text for chunk in page_chunks]
+            ids = chunk_ids(url, chunks)
+            # Offsets let the prompt builder merge overlapping neighbours at query time
+            metadatas = [{"source": url, "chunk_index": i, "start_index": chunk.start_index,
+                          "end_index": chunk.end_index, "section": chunk.section}
+                         for i, chunk in enumerate(page_chunks)]
+            changed = range(len(chunks))
+            on_written = None
 
-            for i, chunk_text in enumerate(chunks):
-                all_chunks.append(chunk_text)
-                all_metadatas.append({"source": url, "chunk_index": i})
-                all_ids.append(f"{url}#{i}")
+            if manifest:
+                page_hash = manifest.page_hash(page.text)
+                known = manifest.get_page(url)
+                if known and known["content_hash"] == page_hash:
+                    manifest.update_validators(url, page.etag, page.last_modified)
+                    logging.info(f"Content unchanged, skipping: {url}")
+                    continue
+                # The ID already covers the text; the stored hash covers the position on the page
+                chunk_hashes = {chunk_id: content_hash(json.dumps(metadata, sort_keys=True))
+                                for chunk_id, metadata in zip(ids, metadatas)}
+                old_hashes = manifest.chunk_hashes(url)
+                changed = [i for i, chunk_id in enumerate(ids) if chunk_id not in old_hashes]
+                shifted = [i for i, chunk_id in enumerate(ids)
+                           if chunk_id in old_hashes and old_hashes[chunk_id] != chunk_hashes[chunk_id]]
+                if shifted:
+                    # Same text at a new position: new offsets, no new embedding
+                    collection.update(ids=[ids[i] for i in shifted], metadatas=[metadatas[i] for i in shifted])
+                    moved += len(shifted)
+                    changed_ids.update(ids[i] for i in shifted)
+                stale_ids = [chunk_id for chunk_id in old_hashes if chunk_id not in chunk_hashes]
+                if stale_ids:
+                    collection.delete(ids=stale_ids)
+                    deleted += len(stale_ids)
+                    removed_ids.update(stale_ids)
+                # The manifest only learns about the page once all its chunks are stored
+                record = (url, page.etag, page.last_modified, page_hash, chunk_hashes)
+                on_written = lambda record=record: manifest.record_page(*record)
+            else:
+                # Without a manifest nothing says which stored chunks are outdated; replace them all
+                stale_ids = collection.get(where={"source": url}, include=[])["ids"]
+                if stale_ids:
+                    collection.delete(ids=stale_ids)
+                    removed_ids.update(stale_ids)
 
-            logging.info(f"Successfully processed and chunked {url}. Found {len(chunks)} chunks.")
+            changed_ids.update(ids[i] for i in changed)
+            upserter.add_page(
+                ids=[ids[i] for i in changed],
+                texts=[chunks[i] for i in changed],
+                metadatas=[metadatas[i] for i in changed],
+                on_written=on_written,
+            )
+            logging.info(f"Successfully processed and chunked {url}. Found {len(chunks)} chunks, "
+                         f"{len(changed)} new or changed.")
 
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error fetching URL {url}: {e}")
-        except Exception as e:
-            logging.error(f"Error processing content from {url}: {e}", exc_info=True)
+        # Pages dropped from the URL list leave their chunks behind unless removed here
+        listed_urls = listing() if listing is not None else [*urls, *crawled_urls(persist_directory)]
+        if manifest and listed_urls is not None:
+            listed_urls = set(listed_urls)
+            for url in [url for url in manifest.urls() if url not in listed_urls]:
+                stale_ids = list(manifest.chunk_hashes(url))
+                if stale_ids:
+                    collection.delete(ids=stale_ids)
+                    deleted += len(stale_ids)
+                    removed_ids.update(stale_ids)
+                manifest.remove_page(url)
+                logging.info(f"Removed {len(stale_ids)} chunks of delisted page {url}")
+    finally:
+        stats = upserter.close()
+        wrote = bool(stats["chunks_written"] or stats["chunks_failed"] or deleted or moved or removed_ids)
 
-    if all_chunks:
-        logging.info(f"Adding {len(all_chunks)} chunks to ChromaDB collection '{collection_name}'.")
-        try:
-            collection.add(
-                documents=all_chunks,
-                metadatas=all_metadatas,
-                ids=all_ids
-            )
-            logging.info(f"Successfully added/updated chunks in ChromaDB.")
-            logging.info(f"Total documents in collection now: {collection.count()}")
-        except Exception as e:
-            logging.error(f"Error adding documents to ChromaDB: {e}", exc_info=True)
+        base_version = read_collection_version(persist_directory)
+        version = base_version
+        if wrote:
+            # Even a failed batch may have written part of its chunks, so caches must be invalidated
+            version = bump_collection_version(persist_directory)
+            logging.info(f"Collection version is now {version}.")
+
+        # Keep the BM25 keyword index used by hybrid retrieval in step with the collection.
+        # Only the chunks this run touched are read back, unless the index is missing or out of date.
+        index_path = os.path.join(persist_directory, BM25_INDEX_FILENAME)
+        if wrote or not os.path.exists(index_path):
+            bm25_index = refresh_bm25_index(collection, persist_directory, changed_ids, removed_ids,
+                                            base_version, version)
+            logging.info(f"BM25 index over {len(bm25_index)} chunks saved to {index_path}")
+
+        # The flat backend serves queries from an export of the collection; refresh it after writes
+        flat_path = os.path.join(persist_directory, FLAT_METADATA_FILENAME)
+        if VECTOR_STORE_BACKEND == "flat" and (wrote or not os.path.exists(flat_path)):
+            count = refresh_flat_index(collection, persist_directory, changed_ids, removed_ids, base_version)
+            logging.info(f"Flat index over {count} chunks saved to {persist_directory}")
+
+    if wrote:
+        logging.info(f"Upserted {stats['chunks_written']} chunks in {stats['batches_written']} batches "
+                     f"({stats['tokens']} tokens, {stats['retries']} retries), moved {moved} chunks "
+                     f"without re-embedding them, deleted {deleted} stale chunks.")
+        if stats["batches_failed"]:
+            logging.error(f"{stats['batches_failed']} batches ({stats['chunks_failed']} chunks) failed; "
+                          f"their pages will be retried on the next run.")
+        logging.info(f"Total documents in collection now: {collection.count()}")
     else:
-        logging.warning("No new chunks were generated to add to ChromaDB.")
+        logging.warning("No new or changed chunks to write to ChromaDB.")
 
     return collection
 
 if __name__ == "__main__":
-    rag_ingest_urls(
-        urls=URLS,
-        collection_name=CHROMA_COLLECTION_NAME,
-        persist_directory=CHROMA_PERSIST_DIRECTORY
-    )
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        description="Build the Ask Herts vector store. Pages dropped from the URLS in config.py are removed; "
+                    "pages found by an earlier --crawl are kept until a complete crawl no longer reaches them.")
+    parser.add_argument("--crawl", action="store_true",
+                        help="Start from the URLS in config.py and follow links to discover more pages.")
+    parser.add_argument("--max-pages", type=int, default=CRAWL_MAX_PAGES, help="Pages fetched per crawl run.")
+    parser.add_argument("--max-depth", type=int, default=CRAWL_MAX_DEPTH, help="Link hops followed from the seeds.")
+    args = parser.parse_args()
+
+    if args.crawl:
+        rag_ingest_crawl(
+            seeds=URLS,
+            collection_name=CHROMA_COLLECTION_NAME,
+            persist_directory=CHROMA_PERSIST_DIRECTORY,
+            crawler=Crawler(URLS, CHROMA_PERSIST_DIRECTORY, max_depth=args.max_depth, max_pages=args.max_pages,
+                            user_agent=REQUEST_HEADERS['User-Agent']),
+        )
+    else:
+        rag_ingest_urls(
+            urls=URLS,
+            collection_name=CHROMA_COLLECTION_NAME,
+            persist_directory=CHROMA_PERSIST_DIRECTORY
+        )
+
+    # Pre-generated FAQ answers are dropped when the pages change; regenerate them
+    if FAQ_INDEX_PATH and os.path.exists(FAQ_INDEX_PATH):
+        from faq_index import refresh_faq_index
+
+        try:
+            stored = refresh_faq_index(CHROMA_PERSIST_DIRECTORY)
+        except ValueError as e:
+            logging.warning(f"FAQ answers not regenerated: {e}")
+        else:
+            if stored is not None:
+                logging.info(f"Regenerated {stored} FAQ answers.")
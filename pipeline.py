@@ -1,13 +1,10 @@
 # pipeline.py
 
+import asyncio
 import os
-import dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+import threading
+import time
 from operator import itemgetter
-from langchain_core.output_parsers import StrOutputParser
 
 # Import settings from your config file
 from config import (
@@ -16,45 +13,198 @@ from config import (
     EMBEDDING_MODEL_NAME,
     LLM_MODEL_NAME,
     K_RETRIEVER,
+    QUERY_EMBEDDING_CACHE_PATH,
+    ANSWER_CACHE_PATH,
+    FAQ_INDEX_PATH,
+    BATCH_MAX_CONCURRENCY,
+    HYBRID_RETRIEVAL,
+    RERANK_ENABLED,
+    RETRIEVAL_CACHE_ENABLED,
+    TRACING_ENABLED,
+    VECTOR_STORE_BACKEND,
 )
+from collection_version import read_collection_version
+from tracing import current_trace, stage, start_trace
 
-# Load environment variables
-dotenv.load_dotenv()
-if not os.getenv("OPENAI_API_KEY"):
-    raise ValueError("Error: OPENAI_API_KEY environment variable not set.")
+# LangChain, OpenAI, ChromaDB and NumPy are imported inside RAGPipeline.__init__,
+# so importing this module (or retrieval.py / evaluate.py) stays cheap and
+# side-effect free. Pipelines are built on first use through get_pipeline().
 
-def format_docs(docs):
-    """Helper function to format retrieved documents for the prompt."""
-    return "\n\n".join(doc.page_content for doc in docs)
+def require_openai_api_key():
+    """Loads .env and raises if OPENAI_API_KEY is still not set."""
+    import dotenv
+
+    dotenv.load_dotenv()
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ValueError("Error: OPENAI_API_KEY environment variable not set.")
+
+def describe_sources(state):
+    """
+    Returns the passages that were put into the prompt, their metadata
+    (source URL, chunk_index) and the prompt's context token stats, which
+    are also recorded on the current trace.
+    """
+    prompt_context = state["prompt_context"]
+    passages = prompt_context["passages"]
+    trace = current_trace()
+    if trace is not None:
+        trace.context_chunks = len(state["docs"])
+        trace.context_passages = len(passages)
+        trace.context_tokens_saved = prompt_context["tokens_saved"]
+    return {
+        "context": [p["text"] for p in passages],
+        "metadata": [{k: v for k, v in p.items() if k != "text"} for p in passages],
+        "context_tokens": {
+            "retrieved": prompt_context["tokens_before"],
+            "prompt": prompt_context["tokens"],
+            "saved": prompt_context["tokens_saved"],
+        },
+    }
+
+def package_result(state):
+    """Shapes the chain state into the public result: the answer plus its sources."""
+    return {"question": state["question"], "answer": state["answer"], **describe_sources(state)}
 
 class RAGPipeline:
     """
     A class to encapsulate the RAG pipeline components, initialized once.
     """
-    def __init__(self):
-        print("Initializing RAG Pipeline with OpenAI Embeddings...")
+    def __init__(self, embedding_function=None, vectorstore=None, llm=None, answer_cache=None,
+                 faq_index=None, bm25_index=None, reranker=None, retrieval_cache=None, persist_directory: str = CHROMA_PERSIST_DIRECTORY,
+                 collection_name: str = CHROMA_COLLECTION_NAME,
+                 embedding_model_name: str = EMBEDDING_MODEL_NAME,
+                 llm_model_name: str = LLM_MODEL_NAME, k_retriever: int = K_RETRIEVER):
+        """
+        Any component left as None is built from the given settings, which
+        default to config.py; passing one in (e.g. a local stub) lets the
+        pipeline run without OpenAI or ChromaDB. answer_cache is an optional
+        SemanticAnswerCache consulted by invoke and ainvoke before the LLM is
+        called; faq_index is an optional FAQIndex of pre-generated answers,
+        consulted before it. bm25_index enables hybrid retrieval; by default it is loaded
+        from persist_directory. reranker is an optional CrossEncoderReranker:
+        the retriever then fetches reranker.candidates chunks and only the
+        reranker's top_n reach the prompt. retrieval_cache is an optional
+        RetrievalCache that reuses the chunks retrieved for a question until
+        the collection changes.
+        """
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+
+        from context_builder import build_context
+
+        print(f"Initializing RAG Pipeline with {embedding_model_name} embeddings...")
+        # The scope of the answers this pipeline stores in the answer cache and FAQ index
+        self.namespace = pipeline_namespace(persist_directory, collection_name, embedding_model_name,
+                                            llm_model_name, k_retriever, reranker is not None)
+        model_id = None
+        if embedding_function is None:
+            from embeddings import embedding_model_id
+
+            model_id = embedding_model_id(embedding_model_name)
+        if llm is None or (model_id or "").startswith("openai:"):
+            require_openai_api_key()
 
-        # 1. Initialize Embedding Function using OpenAI
-        # --- THIS IS THE FIX ---
-        # Changed 'model_name' to 'model'
-        self.embedding_function = OpenAIEmbeddings(model=EMBEDDING_MODEL_NAME)
+        # 1. Initialize the embedding function: the same provider ingestion
+        # used (OpenAI or a local sentence-transformers model, see embeddings.py)
+        if embedding_function is None:
+            from embeddings import get_embedding_provider
+
+            embedding_function = get_embedding_provider(embedding_model_name)
+            # Repeated questions are answered from the on-disk query embedding cache
+            if QUERY_EMBEDDING_CACHE_PATH:
+                from embedding_cache import CachedQueryEmbeddings
+
+                embedding_function = CachedQueryEmbeddings(embedding_function, embedding_model_name)
+        self.embedding_function = embedding_function
+
+        # Query embeddings and the chain steps below are timed into the
+        # current trace (see tracing.py)
+        self.tracer = None
+        if TRACING_ENABLED:
+            from tracing_hooks import PipelineTracer, TracedEmbeddings
+
+            self.embedding_function = TracedEmbeddings(self.embedding_function)
+            self.tracer = PipelineTracer(llm_model_name)
 
         # 2. Initialize Vector Store and Retriever
         try:
-            self.vectorstore = Chroma(
-                persist_directory=CHROMA_PERSIST_DIRECTORY,
-                collection_name=CHROMA_COLLECTION_NAME,
-                embedding_function=self.embedding_function,
-            )
+            if vectorstore is None and VECTOR_STORE_BACKEND == "flat":
+                # Memory-mapped export of the collection: no ChromaDB startup, shared across processes
+                from flat_index import FlatVectorStore
+
+                self.vectorstore = FlatVectorStore.load(persist_directory, self.embedding_function)
+                collection_metadata = self.vectorstore.info["collection_metadata"]
+                if self.vectorstore.info["collection_version"] != read_collection_version(persist_directory):
+                    print(f"Warning: the flat index in '{persist_directory}' is older than the collection; "
+                          f"re-run ingestion or flat_index.py to refresh it.")
+                compression = ""
+                if self.vectorstore.codes is not None:
+                    compression = (f", searched as {self.vectorstore.info['quantization'] or 'float32'} "
+                                   f"x {self.vectorstore.info['dimensions']} and re-scored")
+                print(f"Flat index loaded with {len(self.vectorstore)} chunks{compression}.")
+            elif vectorstore is None:
+                from langchain_community.vectorstores import Chroma
+
+                self.vectorstore = Chroma(
+                    persist_directory=persist_directory,
+                    collection_name=collection_name,
+                    embedding_function=self.embedding_function,
+                )
+                collection_metadata = self.vectorstore._collection.metadata
+            else:
+                self.vectorstore = vectorstore
+            if bm25_index is None and vectorstore is None and HYBRID_RETRIEVAL:
+                from bm25_index import load_bm25_index
+
+                bm25_index = load_bm25_index(persist_directory)
+                if bm25_index is None:
+                    print(f"No BM25 index in '{persist_directory}'; re-run ingestion to enable hybrid retrieval.")
             # In your config.py I saw K_RETRIEVER = 6, but the log says 8. Let's make sure it uses the config.
-            self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": K_RETRIEVER})
-            print(f"Retriever created. Will fetch top {K_RETRIEVER} documents.")
+            from retrievers import build_retriever
+
+            if reranker is not None:
+                # Over-fetch; the reranker picks the chunks that reach the prompt
+                k_retriever = max(k_retriever, reranker.candidates)
+            self.retriever = build_retriever(self.vectorstore, k_retriever, bm25_index)
+            # Kept for batch(), which searches for all its questions at once
+            self.k_retriever = k_retriever
+            self.bm25_index = bm25_index
+            self.retrieval_cache = retrieval_cache
+            # Retrievers with other settings may share the cache file, but not its entries
+            self.retrieval_namespace = (f"{os.path.abspath(persist_directory)}|{collection_name}|{k_retriever}|"
+                                        f"{'dense' if bm25_index is None else 'hybrid'}")
+            if retrieval_cache is not None:
+                from retrieval_cache import CachedRetriever
+
+                self.retriever = CachedRetriever(retriever=self.retriever, cache=retrieval_cache,
+                                                 namespace=self.retrieval_namespace)
+            if bm25_index is not None:
+                print(f"Hybrid retriever created over {len(bm25_index)} chunks. Will fetch top {k_retriever} documents.")
+            else:
+                print(f"Retriever created. Will fetch top {k_retriever} documents.")
+            if reranker is not None:
+                print(f"Reranking with {reranker.model_name}, keeping the top {reranker.top_n}.")
         except Exception as e:
-            raise FileNotFoundError(f"Failed to initialize ChromaDB from '{CHROMA_PERSIST_DIRECTORY}'. "
+            raise FileNotFoundError(f"Failed to initialize ChromaDB from '{persist_directory}'. "
                                     f"Please ensure you have run the ingestion script. Original error: {e}")
+        if model_id is not None and vectorstore is None:
+            # Querying with another model than the collection was built with returns noise
+            from embeddings import check_collection_model
+
+            check_collection_model(collection_metadata, model_id, collection_name)
 
         # 3. Initialize Language Model
-        self.llm = ChatOpenAI(model_name=LLM_MODEL_NAME, temperature=0.2)
+        if llm is None:
+            from langchain_openai import ChatOpenAI
+
+            # stream_usage: streamed answers report their token counts too
+            llm = ChatOpenAI(model_name=llm_model_name, temperature=0.2, stream_usage=True)
+        self.llm = llm
+        self.llm_model_name = llm_model_name
+        self.answer_cache = answer_cache
+        self.faq_index = faq_index
+        self.reranker = reranker
 
         # 4. Define Prompt Template
         template = """You are a helpful assistant answering questions for the University of Hertfordshire students.
@@ -78,30 +228,385 @@ class RAGPipeline:
 
         prompt = ChatPromptTemplate.from_template(template)
 
-        # 5. Build the main RAG Chain
-        self.rag_chain = (
-            {"context": itemgetter("question") | self.retriever | format_docs, "question": itemgetter("question")}
+        # 5. Build the answer chain. It takes an already-built prompt context
+        # ({"question", "prompt_context"}) so retrieval never has to run twice.
+        self.answer_chain = (
+            {"context": itemgetter("prompt_context") | RunnableLambda(itemgetter("text")),
+             "question": itemgetter("question")}
             | prompt
             | self.llm
             | StrOutputParser()
         )
+        if self.tracer is not None:
+            self.answer_chain = self.answer_chain.with_config(callbacks=[self.tracer])
+
+        # 6. Build the full chain: retrieve once, optionally rerank, merge and
+        # trim the chunks to the token budget, then share that context between
+        # the prompt and the returned result. The retrieval half is kept
+        # separately so streaming can emit the sources before the answer starts.
+        # An "embedding" in the input (the question vector the caches were
+        # searched with) is reused by the retriever instead of embedding again.
+        def retrieve(state, config):
+            return self.retriever.invoke(state["question"], config, embedding=state.get("embedding"))
+
+        async def aretrieve(state, config):
+            return await self.retriever.ainvoke(state["question"], config, embedding=state.get("embedding"))
+
+        self.context_chain = RunnablePassthrough.assign(docs=RunnableLambda(retrieve, afunc=aretrieve,
+                                                                            name="retrieve"))
+        if reranker is not None:
+            def rerank(state):
+                return reranker.rerank(state["question"], state["docs"])
 
-        # 6. Build a separate chain to also return the context for evaluation
-        self.chain_with_context = RunnablePassthrough.assign(
-            answer=self.rag_chain,
-            context=(lambda x: [doc.page_content for doc in self.retriever.invoke(x["question"])]),
+            self.context_chain = self.context_chain | RunnablePassthrough.assign(docs=RunnableLambda(rerank))
+        self.context_chain = self.context_chain | RunnablePassthrough.assign(
+            prompt_context=itemgetter("docs") | RunnableLambda(
+                lambda docs: build_context(docs, model_name=llm_model_name), name="build_context")
         )
+        if self.tracer is not None:
+            self.context_chain = self.context_chain.with_config(callbacks=[self.tracer])
+        self.chain_with_context = (
+            self.context_chain
+            | RunnablePassthrough.assign(answer=self.answer_chain)
+            | RunnableLambda(package_result)
+        )
+        self.rag_chain = self.chain_with_context | itemgetter("answer")
         print("RAG Pipeline initialized successfully.")
 
+    def _cached_result(self, question: str, embedding):
+        """
+        Looks the question up in the FAQ index, then in the answer cache,
+        returning the first stored result found or None.
+        """
+        for name, cache, label in (("faq_index", self.faq_index, "FAQ answer"),
+                                   ("answer_cache", self.answer_cache, "Answer cache")):
+            if cache is None:
+                continue
+            with stage(name):
+                cached = cache.lookup(embedding)
+            if cached is not None:
+                print(f"{label} hit (similarity {cached['similarity']:.3f}) for: {question}")
+                trace = current_trace()
+                if trace is not None:
+                    trace.cache_hit = True
+                return cached
+        return None
+
     def invoke(self, question: str):
         """
         Invokes the RAG chain to get an answer and the retrieved context.
+
+        Returns:
+            A dict with the question, the answer, the retrieved chunk texts
+            under "context" and their metadata under "metadata".
+        """
+        with start_trace(question, "invoke"):
+            if self.answer_cache is None and self.faq_index is None:
+                return self.chain_with_context.invoke({"question": question})
+
+            embedding = self.embedding_function.embed_query(question)
+            cached = self._cached_result(question, embedding)
+            if cached is not None:
+                return {**cached, "question": question}
+            result = self.chain_with_context.invoke({"question": question, "embedding": embedding})
+            if self.answer_cache is not None:
+                self.answer_cache.store(question, embedding, result)
+            return result
+
+    async def ainvoke(self, question: str):
+        """
+        Async version of invoke, for use from an event loop.
+        """
+        with start_trace(question, "invoke"):
+            return await self._ainvoke(question)
+
+    async def _ainvoke(self, question: str, use_caches: bool = True):
+        """ainvoke without its trace; abatch traces each question itself."""
+        if not use_caches or (self.answer_cache is None and self.faq_index is None):
+            return await self.chain_with_context.ainvoke({"question": question})
+
+        embedding = await self.embedding_function.aembed_query(question)
+        # The caches are SQLite-backed, so they are queried off the event loop
+        cached = await asyncio.to_thread(self._cached_result, question, embedding)
+        if cached is not None:
+            return {**cached, "question": question}
+        result = await self.chain_with_context.ainvoke({"question": question, "embedding": embedding})
+        if self.answer_cache is not None:
+            await asyncio.to_thread(self.answer_cache.store, question, embedding, result)
+        return result
+
+    def stream(self, question: str):
+        """
+        Streams the answer as it is generated.
+
+        Yields:
+            First {"type": "sources", "context", "metadata", "context_tokens"}
+            as soon as retrieval is done, then {"type": "token", "text"} for
+            each chunk of answer text as it arrives from the LLM.
+        """
+        with start_trace(question, "stream"):
+            embedding = None
+            if self.answer_cache is not None or self.faq_index is not None:
+                embedding = self.embedding_function.embed_query(question)
+                cached = self._cached_result(question, embedding)
+                if cached is not None:
+                    yield {"type": "sources", "context": cached["context"], "metadata": cached["metadata"],
+                           "context_tokens": cached.get("context_tokens")}
+                    yield {"type": "token", "text": cached["answer"]}
+                    return
+
+            state = self.context_chain.invoke({"question": question, "embedding": embedding})
+            sources = describe_sources(state)
+            yield {"type": "sources", **sources}
+            tokens = []
+            for token in self.answer_chain.stream(state):
+                tokens.append(token)
+                yield {"type": "token", "text": token}
+
+            if self.answer_cache is not None:
+                self.answer_cache.store(question, embedding,
+                                        {"question": question, "answer": "".join(tokens), **sources})
+
+    async def astream(self, question: str):
+        """
+        Async version of stream, yielding the same events.
+        """
+        with start_trace(question, "stream"):
+            embedding = None
+            if self.answer_cache is not None or self.faq_index is not None:
+                embedding = await self.embedding_function.aembed_query(question)
+                cached = await asyncio.to_thread(self._cached_result, question, embedding)
+                if cached is not None:
+                    yield {"type": "sources", "context": cached["context"], "metadata": cached["metadata"],
+                           "context_tokens": cached.get("context_tokens")}
+                    yield {"type": "token", "text": cached["answer"]}
+                    return
+
+            state = await self.context_chain.ainvoke({"question": question, "embedding": embedding})
+            sources = describe_sources(state)
+            yield {"type": "sources", **sources}
+            tokens = []
+            async for token in self.answer_chain.astream(state):
+                tokens.append(token)
+                yield {"type": "token", "text": token}
+
+            if self.answer_cache is not None:
+                await asyncio.to_thread(self.answer_cache.store, question, embedding,
+                                        {"question": question, "answer": "".join(tokens), **sources})
+
+    async def abatch(self, questions: list[str], max_concurrency: int | None = None,
+                     return_exceptions: bool = False, use_caches: bool = True):
+        """
+        Runs many questions concurrently, at most max_concurrency at a time.
+        Each question goes through the FAQ index and answer cache like
+        ainvoke, unless use_caches is False (e.g. to evaluate fresh answers).
+
+        Results come back in the same order as the questions. With
+        return_exceptions=True a failing question yields its exception in
+        place of a result instead of cancelling the rest of the batch.
+        """
+        from langchain_core.runnables import RunnableLambda
+
+        async def traced(inputs):
+            # Each question runs in its own task, so each gets its own trace
+            with start_trace(inputs["question"], "batch"):
+                return await self._ainvoke(inputs["question"], use_caches)
+
+        return await RunnableLambda(traced).abatch(
+            [{"question": question} for question in questions],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=return_exceptions,
+        )
+
+    def batch(self, questions: list[str], max_concurrency: int | None = BATCH_MAX_CONCURRENCY,
+              return_exceptions: bool = False, use_caches: bool = True):
+        """
+        Answers a list of questions in bulk: the questions are embedded in
+        one call and looked up in the FAQ index and answer cache like
+        invoke. The rest are searched with one multi-query vector search
+        (questions in the retrieval cache skip it), then the LLM calls run
+        at most max_concurrency at a time and their answers are cached.
+
+        Args:
+            use_caches: False skips the FAQ index and answer cache, e.g. so
+                faq_index.py can generate fresh FAQ answers.
+
+        Returns:
+            One result per question, in order, shaped like invoke's plus
+            "timings_ms": the per-question stages (the shared embedding and
+            search time is split evenly across the batch) and the total.
+            With return_exceptions=True a failing question yields its
+            exception in place of a result.
         """
-        return self.chain_with_context.invoke({"question": question})
+        from langchain_core.runnables import RunnableLambda
 
-# --- Global Instance ---
-try:
-    rag_pipeline = RAGPipeline()
-except FileNotFoundError as e:
-    print(e)
-    rag_pipeline = None
\ No newline at end of file
+        from context_builder import build_context
+        from embedding_cache import embed_queries
+        from retrievers import retrieve_batch
+
+        if not questions:
+            return []
+        use_caches = use_caches and (self.answer_cache is not None or self.faq_index is not None)
+        results = [None] * len(questions)
+        vectors = [None] * len(questions)
+        embed_seconds = 0.0
+        if use_caches:
+            # The cache lookups and the vector search share one embedding call
+            start = time.perf_counter()
+            vectors = embed_queries(self.embedding_function, questions)
+            embed_seconds = time.perf_counter() - start
+            for i, (question, vector) in enumerate(zip(questions, vectors)):
+                mark = time.perf_counter()
+                cached = self._cached_result(question, vector)
+                if cached is not None:
+                    timings = {"embed_query": embed_seconds / len(questions), "cache": time.perf_counter() - mark}
+                    timings["total"] = sum(timings.values())
+                    results[i] = {**cached, "question": question,
+                                  "timings_ms": {name: round(seconds * 1000, 2) for name, seconds in timings.items()}}
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        doc_lists = {i: None for i in pending}
+        if self.retrieval_cache is not None:
+            doc_lists = {i: self.retrieval_cache.lookup(questions[i], self.retrieval_namespace) for i in pending}
+        missing = [i for i in pending if doc_lists[i] is None]
+        unembedded = [i for i in missing if vectors[i] is None]
+        start = time.perf_counter()
+        for i, vector in zip(unembedded, embed_queries(self.embedding_function,
+                                                       [questions[i] for i in unembedded])):
+            vectors[i] = vector
+        embedded = time.perf_counter()
+        embed_seconds += embedded - start
+        found = retrieve_batch(self.vectorstore, [questions[i] for i in missing], [vectors[i] for i in missing],
+                               self.k_retriever, self.bm25_index)
+        searched = time.perf_counter()
+        for i, docs in zip(missing, found):
+            doc_lists[i] = docs
+            if self.retrieval_cache is not None:
+                self.retrieval_cache.store(questions[i], docs, self.retrieval_namespace)
+        shared = {"embed_query": embed_seconds / len(questions),
+                  "search": (searched - embedded) / len(pending)}
+
+        def answer(inputs):
+            question, docs = inputs
+            # Each question runs in its own thread, so each gets its own trace
+            with start_trace(question, "batch") as trace:
+                timings = dict(shared)
+                if trace is not None:
+                    for name, seconds in shared.items():
+                        trace.add_stage(name, seconds)
+                    trace.retrieved_chars = sum(len(doc.page_content) for doc in docs)
+                mark = time.perf_counter()
+                if self.reranker is not None:
+                    with stage("rerank"):
+                        docs = self.reranker.rerank(question, docs)
+                    timings["rerank"] = time.perf_counter() - mark
+                    mark = time.perf_counter()
+                with stage("build_context"):
+                    state = {"question": question, "docs": docs,
+                             "prompt_context": build_context(docs, model_name=self.llm_model_name)}
+                timings["build_context"] = time.perf_counter() - mark
+                mark = time.perf_counter()
+                state["answer"] = self.answer_chain.invoke(state)
+                timings["llm"] = time.perf_counter() - mark
+                timings["total"] = sum(timings.values())
+                return {**package_result(state),
+                        "timings_ms": {name: round(seconds * 1000, 2) for name, seconds in timings.items()}}
+
+        answered = RunnableLambda(answer).batch(
+            [(questions[i], doc_lists[i]) for i in pending],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=return_exceptions,
+        )
+        for i, result in zip(pending, answered):
+            results[i] = result
+            if use_caches and self.answer_cache is not None and not isinstance(result, Exception):
+                self.answer_cache.store(questions[i], vectors[i],
+                                        {k: v for k, v in result.items() if k != "timings_ms"})
+        return results
+
+def pipeline_namespace(persist_directory: str, collection_name: str, embedding_model_name: str,
+                       llm_model_name: str, k_retriever: int, use_reranker: bool = False) -> str:
+    """Returns the key that scopes a pipeline's cached answers to the settings that produced them."""
+    return "|".join([os.path.abspath(persist_directory), collection_name, embedding_model_name, llm_model_name,
+                     str(k_retriever), "hybrid" if HYBRID_RETRIEVAL else "dense",
+                     "rerank" if use_reranker else "no-rerank"])
+
+# --- Pipeline Registry ---
+# One pipeline per distinct configuration, built on first use and shared afterwards.
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+def get_pipeline(persist_directory: str = CHROMA_PERSIST_DIRECTORY,
+                 collection_name: str = CHROMA_COLLECTION_NAME,
+                 embedding_model_name: str = EMBEDDING_MODEL_NAME,
+                 llm_model_name: str = LLM_MODEL_NAME,
+                 k_retriever: int = K_RETRIEVER,
+                 use_answer_cache: bool = True,
+                 use_faq_index: bool = True,
+                 use_reranker: bool = RERANK_ENABLED,
+                 use_retrieval_cache: bool = RETRIEVAL_CACHE_ENABLED):
+    """
+    Returns the RAGPipeline for the given settings, building it on the first
+    call and returning the same instance on later calls.
+
+    Raises:
+        FileNotFoundError: If the ChromaDB collection cannot be opened.
+        ValueError: If OPENAI_API_KEY is not set, or the collection was
+            built with a different embedding model.
+    """
+    key = (os.path.abspath(persist_directory), collection_name, embedding_model_name,
+           llm_model_name, k_retriever, use_answer_cache, use_faq_index, use_reranker,
+           use_retrieval_cache)
+    pipeline = _pipelines.get(key)
+    if pipeline is not None:
+        return pipeline
+
+    with _pipelines_lock:
+        if key not in _pipelines:
+            namespace = pipeline_namespace(persist_directory, collection_name, embedding_model_name,
+                                           llm_model_name, k_retriever, use_reranker)
+            answer_cache = None
+            if use_answer_cache and ANSWER_CACHE_PATH:
+                from answer_cache import SemanticAnswerCache
+
+                answer_cache = SemanticAnswerCache(persist_directory=persist_directory, namespace=namespace)
+            faq_index = None
+            if use_faq_index and FAQ_INDEX_PATH:
+                from faq_index import FAQIndex
+
+                faq_index = FAQIndex(persist_directory=persist_directory, namespace=namespace)
+            reranker = None
+            if use_reranker:
+                from reranker import CrossEncoderReranker
+
+                reranker = CrossEncoderReranker()
+            retrieval_cache = None
+            if use_retrieval_cache:
+                from retrieval_cache import RetrievalCache
+
+                retrieval_cache = RetrievalCache(persist_directory=persist_directory)
+            _pipelines[key] = RAGPipeline(
+                answer_cache=answer_cache,
+                faq_index=faq_index,
+                reranker=reranker,
+                retrieval_cache=retrieval_cache,
+                persist_directory=persist_directory,
+                collection_name=collection_name,
+                embedding_model_name=embedding_model_name,
+                llm_model_name=llm_model_name,
+                k_retriever=k_retriever,
+            )
+        return _pipelines[key]
+
+def __getattr__(name):
+    # Backwards compatibility: `from pipeline import rag_pipeline` still works,
+    # but now builds the default pipeline on first access instead of at import.
+    if name == "rag_pipeline":
+        try:
+            return get_pipeline()
+        except FileNotFoundError as e:
+            print(e)
+            return None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
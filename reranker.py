@@ -0,0 +1,147 @@
+# reranker.py
+
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.documents import Document
+
+from config import (
+    LOCAL_EMBEDDING_THREADS,
+    RERANK_BATCH_SIZE,
+    RERANK_CACHE_SIZE,
+    RERANK_CANDIDATES,
+    RERANK_LATENCY_BUDGET_MS,
+    RERANK_TOP_N,
+    RERANKER_MODEL_NAME,
+)
+from embedding_cache import normalize_question
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage reranking of retrieved chunks with a local cross-encoder.
+
+    The retriever over-fetches `candidates` chunks; each (question, chunk)
+    pair is scored by the cross-encoder on the CPU in batches, and the
+    `top_n` best go on to the prompt. Scores are cached in memory per
+    (question, chunk text), so a repeated question costs no model calls.
+
+    Scoring has a latency budget. If it runs out before every candidate is
+    scored, the chunks are returned in retrieval order instead. The budget
+    is checked before each batch, and waiting for another request's
+    scoring counts against it. Loading the model on first use does not.
+    """
+
+    def __init__(self, model_name: str = RERANKER_MODEL_NAME, top_n: int = RERANK_TOP_N,
+                 candidates: int = RERANK_CANDIDATES, batch_size: int = RERANK_BATCH_SIZE,
+                 latency_budget_ms: float | None = RERANK_LATENCY_BUDGET_MS,
+                 cache_size: int = RERANK_CACHE_SIZE, threads: int | None = LOCAL_EMBEDDING_THREADS, model=None):
+        """
+        Args:
+            latency_budget_ms: None scores every candidate however long it takes.
+            model: Optional scorer with a sentence-transformers CrossEncoder
+                style predict(pairs, batch_size=...), e.g. a local stub;
+                by default model_name is loaded on first use.
+        """
+        self.model_name = model_name
+        self.top_n = top_n
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self.latency_budget_ms = latency_budget_ms
+        self.cache_size = cache_size
+        self.threads = threads
+        self._model = model
+        self._load_lock = threading.Lock()
+        # One scoring call at a time: each one already uses every configured thread
+        self._score_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    if self.threads:
+                        import torch
+
+                        torch.set_num_threads(self.threads)
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is None:
+                self.misses += 1
+            else:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            return score
+
+    def _cache_put(self, key, score: float):
+        with self._cache_lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _score(self, model, question: str, docs: list[Document], deadline: float | None) -> list[float] | None:
+        """Scores the docs in batches. Returns None if the deadline passed first."""
+        timeout = -1 if deadline is None else max(0.0, deadline - time.perf_counter())
+        if not self._score_lock.acquire(timeout=timeout):
+            return None
+        try:
+            scores = []
+            for start in range(0, len(docs), self.batch_size):
+                if deadline is not None and time.perf_counter() > deadline:
+                    return None
+                pairs = [(question, doc.page_content) for doc in docs[start:start + self.batch_size]]
+                scores.extend(float(score) for score in
+                              model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False))
+            return scores
+        finally:
+            self._score_lock.release()
+
+    def rerank(self, question: str, docs: list[Document]) -> list[Document]:
+        """Returns the top_n of docs by cross-encoder score, or the first top_n if the budget ran out."""
+        if len(docs) <= 1:
+            return docs[:self.top_n]
+        normalized = normalize_question(question)
+        # A score depends only on the question and the chunk text, which every result carries
+        keys = [(normalized, doc.page_content) for doc in docs]
+        scores = [self._cache_get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            model = self.model  # loaded outside the latency budget
+            deadline = None
+            if self.latency_budget_ms is not None:
+                deadline = time.perf_counter() + self.latency_budget_ms / 1000
+            new_scores = self._score(model, question, [docs[i] for i in missing], deadline)
+            if new_scores is None:
+                self.fallbacks += 1
+                return docs[:self.top_n]
+            for i, score in zip(missing, new_scores):
+                scores[i] = score
+                self._cache_put(keys[i], score)
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        return [docs[i] for i in order[:self.top_n]]
+
+    def stats(self) -> dict:
+        """Returns the cache counters, the number of budget fallbacks and the cache size."""
+        with self._cache_lock:
+            size = len(self._cache)
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "fallbacks": self.fallbacks,
+            "size": size,
+        }
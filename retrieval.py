@@ -1,7 +1,21 @@
 # retrieval.py
 
-# Import the initialized pipeline instance from pipeline.py
-from pipeline import rag_pipeline
+import argparse
+import logging
+
+# The pipeline is built lazily on first use, so importing this module is cheap
+from pipeline import get_pipeline
+
+PIPELINE_UNAVAILABLE = ("Error: RAG pipeline is not available. "
+                        "Please check previous error messages, likely related to the database path.")
+
+def _load_pipeline():
+    """Returns the shared pipeline, or None if it could not be built."""
+    try:
+        return get_pipeline()
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        return None
 
 def query_rag(query_text: str):
     """
@@ -13,12 +27,12 @@ def query_rag(query_text: str):
     Returns:
         The generated answer as a string, or an error message.
     """
+    rag_pipeline = _load_pipeline()
     if rag_pipeline is None:
-        return ("Error: RAG pipeline is not available. "
-                "Please check previous error messages, likely related to the database path.")
-    
+        return PIPELINE_UNAVAILABLE
+
     try:
-        # The pipeline is already initialized, just invoke it
+        # The pipeline is built once on first use and shared afterwards
         result = rag_pipeline.invoke(query_text)
         return result["answer"]
 
@@ -26,20 +40,94 @@ def query_rag(query_text: str):
         # This will catch errors during the invocation itself
         return f"An error occurred while processing the query: {e}"
 
+def query_rag_batch(questions: list[str]):
+    """
+    Answers many questions with one embedding call and one vector search,
+    running the LLM calls concurrently (see RAGPipeline.batch).
+
+    Returns:
+        The answers, in question order. A question that fails gets an
+        error message in place of its answer.
+    """
+    rag_pipeline = _load_pipeline()
+    if rag_pipeline is None:
+        return [PIPELINE_UNAVAILABLE] * len(questions)
+
+    try:
+        results = rag_pipeline.batch(questions, return_exceptions=True)
+    except Exception as e:
+        # Embedding or search failed for the whole batch
+        return [f"An error occurred while processing the query: {e}"] * len(questions)
+    return [f"An error occurred while processing the query: {result}" if isinstance(result, Exception)
+            else result["answer"] for result in results]
+
+def stream_rag(query_text: str):
+    """
+    Streams an answer from the RAG system.
+
+    Args:
+        query_text: The user's question.
+
+    Yields:
+        The pipeline's events: the retrieved sources first, then answer
+        tokens as they arrive. Errors are yielded as a final token.
+    """
+    rag_pipeline = _load_pipeline()
+    if rag_pipeline is None:
+        yield {"type": "token", "text": PIPELINE_UNAVAILABLE}
+        return
+
+    try:
+        yield from rag_pipeline.stream(query_text)
+    except Exception as e:
+        yield {"type": "token", "text": f"An error occurred while processing the query: {e}"}
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ask the Ask Herts RAG system questions.")
+    parser.add_argument("questions", nargs="*", help="Questions to ask; defaults to a few examples.")
+    parser.add_argument("--stream", action="store_true", help="Print the answer token by token as it is generated.")
+    parser.add_argument("--batch", action="store_true",
+                        help="Answer all the questions together with one embedding call and one search.")
+    parser.add_argument("--trace", action="store_true",
+                        help="Log per-stage timings and token counts of each question as JSON.")
+    args = parser.parse_args()
+    if args.trace:
+        from tracing import TRACE_LOGGER_NAME
+
+        logging.basicConfig(format="%(message)s")
+        logging.getLogger(TRACE_LOGGER_NAME).setLevel(logging.INFO)
+
     # Example usage
-    questions = ['replacement id card fees?', 'I want to get studnet letter?',
-                 'on campus laundry facilities?', 'council tax excemptions',]
-    for idx, user_query in enumerate(questions):
-    # user_query = "What is the cost to replace a lost ID card?"
-        print('\n\n')
-        print(f"{idx+1} query: '{user_query}'")
-        
-        final_answer = query_rag(user_query)
-
-        print("\n--- Generated Answer ---")
-        print(final_answer)
-        print('\n\n\n\n')
+    questions = args.questions or ['replacement id card fees?', 'I want to get studnet letter?',
+                                   'on campus laundry facilities?', 'council tax excemptions',]
+    if args.batch:
+        for idx, (user_query, final_answer) in enumerate(zip(questions, query_rag_batch(questions))):
+            print(f"\n{idx+1} query: '{user_query}'")
+            print("--- Generated Answer ---")
+            print(final_answer)
+    else:
+        for idx, user_query in enumerate(questions):
+        # user_query = "What is the cost to replace a lost ID card?"
+            print('\n\n')
+            print(f"{idx+1} query: '{user_query}'")
+
+            if args.stream:
+                for event in stream_rag(user_query):
+                    if event["type"] == "sources":
+                        print("\n--- Sources ---")
+                        for source in dict.fromkeys(m["source"] for m in event["metadata"]):
+                            print(source)
+                        print("\n--- Generated Answer ---")
+                    else:
+                        print(event["text"], end="", flush=True)
+                print('\n\n\n\n')
+                continue
+
+            final_answer = query_rag(user_query)
+
+            print("\n--- Generated Answer ---")
+            print(final_answer)
+            print('\n\n\n\n')
 
 # https://ask.herts.ac.uk/student-letters-cae5998a-cefd-447d-ab93-526064295952
 # https://ask.herts.ac.uk/laundry-on-campus
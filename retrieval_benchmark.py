@@ -0,0 +1,201 @@
+# retrieval_benchmark.py
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+from config import (
+    CHROMA_COLLECTION_NAME,
+    CHROMA_PERSIST_DIRECTORY,
+    EMBEDDING_MODEL_NAME,
+    HYBRID_RETRIEVAL,
+    URLS,
+)
+from evaluation_dataset import get_evaluation_dataset
+
+# Offline embedding stub used with --stub (see embeddings.HashingEmbeddings)
+STUB_EMBEDDING_MODEL = "hashing-512"
+DEFAULT_CUTOFFS = [1, 3, 5, 8]
+
+
+# --- Metrics ---
+# Relevance is judged per page: a retrieved chunk is relevant if its source URL
+# is one of the question's expected sources. Later chunks of an already-found
+# page add nothing.
+
+def recall_at_k(ranked_sources: list[str], expected: set, k: int) -> float:
+    """Share of the expected pages found among the top k chunks."""
+    return len(set(ranked_sources[:k]) & expected) / len(expected)
+
+
+def reciprocal_rank(ranked_sources: list[str], expected: set) -> float:
+    """1 / rank of the first relevant chunk, or 0 if none was retrieved."""
+    for rank, source in enumerate(ranked_sources, start=1):
+        if source in expected:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked_sources: list[str], expected: set, k: int) -> float:
+    """Normalized discounted cumulative gain of the top k chunks, with binary relevance."""
+    seen, dcg = set(), 0.0
+    for rank, source in enumerate(ranked_sources[:k], start=1):
+        if source in expected and source not in seen:
+            seen.add(source)
+            dcg += 1.0 / math.log2(rank + 1)
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(expected), k) + 1))
+    return dcg / ideal
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+# --- Indexes ---
+
+def open_retriever(persist_directory: str, collection_name: str, embedding_model_name: str, k: int,
+                   hybrid: bool = HYBRID_RETRIEVAL):
+    """Opens the persisted collection with the same retriever the pipeline builds, without any LLM."""
+    from langchain_community.vectorstores import Chroma
+
+    from bm25_index import load_bm25_index
+    from embeddings import check_collection_model, embedding_model_id, get_embedding_provider
+    from retrievers import build_retriever
+
+    if not os.path.isdir(persist_directory):
+        raise FileNotFoundError(f"No ChromaDB directory at '{persist_directory}'. Run ingestion.py first.")
+    vectorstore = Chroma(
+        persist_directory=persist_directory,
+        collection_name=collection_name,
+        embedding_function=get_embedding_provider(embedding_model_name),
+    )
+    check_collection_model(vectorstore._collection.metadata, embedding_model_id(embedding_model_name),
+                           collection_name)
+    bm25_index = load_bm25_index(persist_directory) if hybrid else None
+    return build_retriever(vectorstore, k, bm25_index)
+
+
+def build_stub_index(persist_directory: str) -> list[str]:
+    """
+    Ingests the benchmark fixture pages with the offline embedding stub and
+    returns their URLs. Needs no network access or API key.
+    """
+    # ingestion.py checks for an OpenAI key at import; the stub never calls OpenAI
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    from benchmarks.fixture_server import FIXTURE_DIR, fixture_names
+    from ingestion import ProcessedPage, preprocess_page, rag_ingest_urls
+
+    pages = []
+    for name in fixture_names():
+        url = next((u for u in URLS if u.rsplit("/", 1)[-1] == name), None)
+        if url is None:
+            continue
+        with open(os.path.join(FIXTURE_DIR, f"{name}.html"), encoding="utf-8") as f:
+            text, outline = preprocess_page(f.read(), url)
+        pages.append(ProcessedPage(url, text, None, None, outline))
+    urls = [page.url for page in pages]
+    rag_ingest_urls(urls, CHROMA_COLLECTION_NAME, persist_directory, incremental=False,
+                    embedding_model_name=STUB_EMBEDDING_MODEL, pages=pages)
+    return urls
+
+
+# --- Benchmark ---
+
+def run_benchmark(retriever, dataset: list[dict], cutoffs: list[int], repeats: int = 1) -> dict:
+    """
+    Runs every labeled question through the retriever and returns the mean
+    recall@k and nDCG@k for each cutoff, the MRR, and search latency
+    percentiles over all repeats.
+    """
+    retriever.invoke(dataset[0]["question"])  # warm-up: opens the index and loads the model
+
+    totals = {f"recall@{k}": 0.0 for k in cutoffs}
+    totals.update({f"ndcg@{k}": 0.0 for k in cutoffs})
+    totals["mrr"] = 0.0
+    latencies, misses = [], []
+    for item in dataset:
+        expected = set(item["sources"])
+        for _ in range(repeats):
+            start = time.perf_counter()
+            docs = retriever.invoke(item["question"])
+            latencies.append(time.perf_counter() - start)
+        ranked = [doc.metadata.get("source") for doc in docs]
+        for k in cutoffs:
+            totals[f"recall@{k}"] += recall_at_k(ranked, expected, k)
+            totals[f"ndcg@{k}"] += ndcg_at_k(ranked, expected, k)
+        totals["mrr"] += reciprocal_rank(ranked, expected)
+        if not expected & set(ranked):
+            misses.append(item["question"])
+
+    results = {name: total / len(dataset) for name, total in totals.items()}
+    results["p50_ms"] = percentile(latencies, 0.50) * 1000
+    results["p99_ms"] = percentile(latencies, 0.99) * 1000
+    results["questions"] = len(dataset)
+    results["misses"] = misses
+    return results
+
+
+def check_thresholds(results: dict, k: int, min_recall=None, min_mrr=None, min_ndcg=None, max_p99_ms=None) -> list[str]:
+    """Returns a message for every threshold the results fail."""
+    checks = [
+        (f"recall@{k}", min_recall, lambda value, limit: value >= limit),
+        ("mrr", min_mrr, lambda value, limit: value >= limit),
+        (f"ndcg@{k}", min_ndcg, lambda value, limit: value >= limit),
+        ("p99_ms", max_p99_ms, lambda value, limit: value <= limit),
+    ]
+    return [f"{name} = {results[name]:.3f} (threshold {limit})"
+            for name, limit, passes in checks if limit is not None and not passes(results[name], limit)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark: recall@k, MRR, nDCG and search latency.")
+    parser.add_argument("--stub", action="store_true",
+                        help="Benchmark a temporary index of the fixture pages built with the offline embedding stub.")
+    parser.add_argument("--persist-directory", default=CHROMA_PERSIST_DIRECTORY)
+    parser.add_argument("--collection", default=CHROMA_COLLECTION_NAME)
+    parser.add_argument("--embedding-model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--k", nargs="+", type=int, default=DEFAULT_CUTOFFS, help="Cutoffs for recall@k and nDCG@k.")
+    parser.add_argument("--repeats", type=int, default=5, help="Searches per question, for latency percentiles.")
+    parser.add_argument("--no-hybrid", action="store_true", help="Vector search only, without BM25 fusion.")
+    parser.add_argument("--min-recall", type=float, help="Fail if recall@<largest k> is lower.")
+    parser.add_argument("--min-mrr", type=float, help="Fail if MRR is lower.")
+    parser.add_argument("--min-ndcg", type=float, help="Fail if nDCG@<largest k> is lower.")
+    parser.add_argument("--max-p99-ms", type=float, help="Fail if the p99 search latency is higher.")
+    args = parser.parse_args()
+
+    cutoffs = sorted(set(args.k))
+    dataset = get_evaluation_dataset()
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.stub:
+            corpus = set(build_stub_index(tmp))
+            # Only questions answerable from the fixture pages can be judged
+            dataset = [{**item, "sources": [s for s in item["sources"] if s in corpus]}
+                       for item in dataset if corpus & set(item["sources"])]
+            retriever = open_retriever(tmp, CHROMA_COLLECTION_NAME, STUB_EMBEDDING_MODEL, cutoffs[-1],
+                                       hybrid=not args.no_hybrid)
+        else:
+            retriever = open_retriever(args.persist_directory, args.collection, args.embedding_model, cutoffs[-1],
+                                       hybrid=not args.no_hybrid)
+        results = run_benchmark(retriever, dataset, cutoffs, args.repeats)
+
+    print(f"\n--- Retrieval Benchmark ({results['questions']} questions) ---")
+    for k in cutoffs:
+        print(f"recall@{k:<3} {results[f'recall@{k}']:.3f}    ndcg@{k:<3} {results[f'ndcg@{k}']:.3f}")
+    print(f"MRR        {results['mrr']:.3f}")
+    print(f"latency    p50 {results['p50_ms']:.2f} ms, p99 {results['p99_ms']:.2f} ms")
+    if results["misses"]:
+        print(f"\nNo expected source retrieved for {len(results['misses'])} question(s):")
+        for question in results["misses"]:
+            print(f"  - {question}")
+
+    failures = check_thresholds(results, cutoffs[-1], args.min_recall, args.min_mrr, args.min_ndcg, args.max_p99_ms)
+    if failures:
+        print("\nREGRESSION:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
@@ -0,0 +1,227 @@
+# retrieval_cache.py
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from collection_version import read_collection_version
+from config import (
+    CACHE_RECENCY_FLUSH_SECONDS,
+    CHROMA_PERSIST_DIRECTORY,
+    RETRIEVAL_CACHE_MAX_ENTRIES,
+    RETRIEVAL_CACHE_MEMORY_ENTRIES,
+    RETRIEVAL_CACHE_PATH,
+)
+from embedding_cache import normalize_question
+
+
+def _documents(records) -> list[Document]:
+    # Fresh objects on every hit, so a caller editing one cannot change the cache
+    return [Document(id=doc_id, page_content=text, metadata=dict(metadata)) for doc_id, text, metadata in records]
+
+
+class RetrievalCache:
+    """
+    Caches the chunks retrieved for each normalized question in two tiers:
+    an in-process LRU, and a SQLite file shared by every worker process on
+    the machine. Entries are stamped with the collection version and are
+    ignored once ingestion has changed the collection.
+
+    Lookups and stores take a namespace, so retrievers with different
+    settings (k, hybrid or not, collection) can share one file. A hit only
+    reads: its last-used time is written later, in a batch with the others
+    (see CACHE_RECENCY_FLUSH_SECONDS).
+    """
+
+    def __init__(self, path: str | None = RETRIEVAL_CACHE_PATH,
+                 memory_entries: int = RETRIEVAL_CACHE_MEMORY_ENTRIES,
+                 max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES,
+                 persist_directory: str = CHROMA_PERSIST_DIRECTORY,
+                 recency_flush_seconds: float = CACHE_RECENCY_FLUSH_SECONDS):
+        """
+        Args:
+            path: The shared SQLite file; None keeps only the in-process tier.
+        """
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.persist_directory = persist_directory
+        self.recency_flush_seconds = recency_flush_seconds
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        # (namespace, question) -> last hit time, not yet written to disk
+        self._touched = {}
+        self._last_flush = time.monotonic()
+        self._version = None
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS retrieval_results ("
+                " namespace TEXT NOT NULL, question TEXT NOT NULL, version TEXT NOT NULL,"
+                " documents TEXT NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (namespace, question))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_retrieval_results_last_used ON retrieval_results (last_used)"
+            )
+            self._conn.commit()
+
+    # --- internal helpers (callers hold self._lock) ---
+
+    def _current_version(self) -> str:
+        """Returns the collection version, emptying the in-process tier if it changed."""
+        version = read_collection_version(self.persist_directory)
+        if version != self._version:
+            self._memory.clear()
+            self._version = version
+        return version
+
+    def _touch(self, key):
+        """Records a hit, writing the pending last-used times once the flush interval has passed."""
+        if self._conn is None:
+            return
+        self._touched[key] = time.time()
+        if time.monotonic() - self._last_flush >= self.recency_flush_seconds:
+            self._write_recency()
+            self._conn.commit()
+
+    def _write_recency(self):
+        """Writes the pending last-used times; the caller commits."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE retrieval_results SET last_used = ? WHERE namespace = ? AND question = ?",
+                [(used, *key) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
+        self._last_flush = time.monotonic()
+
+    def _remember(self, key, records):
+        self._memory[key] = records
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # --- public API ---
+
+    def lookup(self, question: str, namespace: str = "") -> list[Document] | None:
+        """Returns the cached chunks for question, or None if it was not retrieved since the last ingestion."""
+        key = (namespace, normalize_question(question))
+        with self._lock:
+            version = self._current_version()
+            records = self._memory.get(key)
+            if records is not None:
+                self._memory.move_to_end(key)
+                # Keeps the disk copy from being evicted while the entry is hot in memory
+                self._touch(key)
+                self.memory_hits += 1
+                return _documents(records)
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT documents FROM retrieval_results WHERE namespace = ? AND question = ? AND version = ?",
+                    (*key, version),
+                ).fetchone()
+                if row is not None:
+                    self._touch(key)
+                    records = json.loads(row[0])
+                    self._remember(key, records)
+                    self.disk_hits += 1
+                    return _documents(records)
+            self.misses += 1
+        return None
+
+    def store(self, question: str, docs: list[Document], namespace: str = ""):
+        """Caches the chunks retrieved for question under the current collection version."""
+        key = (namespace, normalize_question(question))
+        records = [(doc.id, doc.page_content, doc.metadata) for doc in docs]
+        with self._lock:
+            version = self._current_version()
+            self._remember(key, records)
+            if self._conn is None:
+                return
+            # Eviction below must see every hit since the last flush
+            self._write_recency()
+            # Rows from older versions are never read again; they are replaced or evicted here
+            self._conn.execute(
+                "INSERT OR REPLACE INTO retrieval_results (namespace, question, version, documents, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (*key, version, json.dumps(records), time.time()),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM retrieval_results").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM retrieval_results WHERE rowid IN ("
+                    " SELECT rowid FROM retrieval_results ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def flush(self):
+        """Writes the last-used times of recent hits to disk now."""
+        with self._lock:
+            if self._conn is not None:
+                self._write_recency()
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        """Returns the hit counters of each tier, the overall hit rate and the size of each tier."""
+        with self._lock:
+            memory_size = len(self._memory)
+            disk_size = None
+            if self._conn is not None:
+                (disk_size,) = self._conn.execute("SELECT COUNT(*) FROM retrieval_results").fetchone()
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_size": memory_size,
+            "disk_size": disk_size,
+        }
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Serves retriever's results from a RetrievalCache, retrieving and caching
+    on a miss. An embedding= keyword is passed on to retriever.
+    """
+
+    retriever: BaseRetriever
+    cache: Any
+    namespace: str = ""
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                embedding: list[float] | None = None) -> list[Document]:
+        docs = self.cache.lookup(query, self.namespace)
+        if docs is None:
+            docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()}, embedding=embedding)
+            self.cache.store(query, docs, self.namespace)
+        return docs
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       embedding: list[float] | None = None) -> list[Document]:
+        # The cache reads SQLite and the collection version file, so it runs off the event loop
+        docs = await asyncio.to_thread(self.cache.lookup, query, self.namespace)
+        if docs is None:
+            docs = await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()},
+                                                embedding=embedding)
+            await asyncio.to_thread(self.cache.store, query, docs, self.namespace)
+        return docs
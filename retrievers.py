@@ -0,0 +1,141 @@
+# retrievers.py
+
+import asyncio
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+from bm25_index import BM25Index
+from config import HYBRID_CANDIDATES, K_RETRIEVER, RRF_K
+
+
+def reciprocal_rank_fusion(result_lists: list[list[Document]], rrf_k: int = RRF_K) -> list[Document]:
+    """
+    Merges several ranked result lists into one. Each document scores
+    sum(1 / (rrf_k + rank)) over the lists it appears in.
+
+    Raises:
+        ValueError: If a document has no chunk ID, the key the lists are
+            merged on.
+    """
+    scores, docs = {}, {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = doc.id
+            if not key:
+                raise ValueError(f"Cannot fuse a chunk without an ID (source {doc.metadata.get('source')!r}).")
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class VectorRetriever(BaseRetriever):
+    """
+    Dense vector search returning the top k chunks with their stored IDs.
+    langchain_community's Chroma drops the IDs of its hits, so ChromaDB is
+    queried through its collection instead (see similarity_search_by_vectors).
+
+    A caller that has already embedded the query passes the vector as
+    invoke(query, embedding=vector), and the query is not embedded again.
+    """
+
+    vectorstore: VectorStore
+    k: int = K_RETRIEVER
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                embedding: list[float] | None = None) -> list[Document]:
+        if embedding is None:
+            embedding = self.vectorstore.embeddings.embed_query(query)
+        return similarity_search_by_vectors(self.vectorstore, [embedding], self.k)[0]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       embedding: list[float] | None = None) -> list[Document]:
+        if embedding is None:
+            embedding = await self.vectorstore.embeddings.aembed_query(query)
+        # ChromaDB's client is synchronous, so the search runs off the event loop
+        return (await asyncio.to_thread(similarity_search_by_vectors, self.vectorstore, [embedding], self.k))[0]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Combines dense vector search with BM25 keyword search. Each side fetches
+    `candidates` chunks and the two rankings are fused with reciprocal rank
+    fusion, so exact terms such as "Tier 4", "£524" or an e-mail address are
+    found even when the embedding ranks them low. Like VectorRetriever, it
+    takes an already-computed query vector as embedding=.
+    """
+
+    vector_retriever: BaseRetriever
+    bm25_index: BM25Index
+    k: int = K_RETRIEVER
+    candidates: int = HYBRID_CANDIDATES
+    rrf_k: int = RRF_K
+
+    def _fuse(self, dense: list[Document], sparse: list[Document]) -> list[Document]:
+        docs = reciprocal_rank_fusion([dense, sparse], self.rrf_k)[:self.k]
+        assert len({doc.id for doc in docs}) == len(docs), "hybrid retrieval returned a chunk twice"
+        return docs
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                embedding: list[float] | None = None) -> list[Document]:
+        dense = self.vector_retriever.invoke(query, config={"callbacks": run_manager.get_child()},
+                                             embedding=embedding)
+        sparse = self.bm25_index.search_documents(query, self.candidates)
+        return self._fuse(dense, sparse)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       embedding: list[float] | None = None) -> list[Document]:
+        dense = await self.vector_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()},
+                                                    embedding=embedding)
+        sparse = self.bm25_index.search_documents(query, self.candidates)
+        return self._fuse(dense, sparse)
+
+
+def build_retriever(vectorstore, k: int = K_RETRIEVER, bm25_index: BM25Index | None = None,
+                    candidates: int = HYBRID_CANDIDATES) -> BaseRetriever:
+    """Returns a hybrid retriever over vectorstore when a BM25 index is given, else plain vector search."""
+    if bm25_index is None:
+        return VectorRetriever(vectorstore=vectorstore, k=k)
+    return HybridRetriever(
+        vector_retriever=VectorRetriever(vectorstore=vectorstore, k=candidates),
+        bm25_index=bm25_index,
+        k=k,
+        candidates=candidates,
+    )
+
+
+def similarity_search_by_vectors(vectorstore, vectors: list[list[float]], k: int) -> list[list[Document]]:
+    """
+    Searches several query vectors at once: a single multi-query request for
+    ChromaDB, one matrix product for the flat index, and one search per
+    vector for any other store. Returns the top k chunks of each vector.
+    """
+    if not vectors:
+        return []
+    if hasattr(vectorstore, "similarity_search_by_vectors"):
+        return vectorstore.similarity_search_by_vectors(vectors, k=k)
+    collection = getattr(vectorstore, "_collection", None)
+    if collection is None:
+        return [vectorstore.similarity_search_by_vector(vector, k=k) for vector in vectors]
+    results = collection.query(query_embeddings=vectors, n_results=k, include=["documents", "metadatas"])
+    return [
+        [Document(id=id_, page_content=text, metadata=metadata or {})
+         for id_, text, metadata in zip(ids, documents, metadatas)]
+        for ids, documents, metadatas in zip(results["ids"], results["documents"], results["metadatas"])
+    ]
+
+
+def retrieve_batch(vectorstore, questions: list[str], vectors: list[list[float]], k: int = K_RETRIEVER,
+                   bm25_index: BM25Index | None = None, candidates: int = HYBRID_CANDIDATES) -> list[list[Document]]:
+    """
+    Returns, for each question, the chunks build_retriever's retriever would
+    return, using already-computed query vectors and one vector search for
+    the whole batch.
+    """
+    if bm25_index is None:
+        return similarity_search_by_vectors(vectorstore, vectors, k)
+    dense = similarity_search_by_vectors(vectorstore, vectors, candidates)
+    return [reciprocal_rank_fusion([docs, bm25_index.search_documents(question, candidates)])[:k]
+            for question, docs in zip(questions, dense)]
@@ -0,0 +1,134 @@
+# server.py
+
+import argparse
+import asyncio
+
+from aiohttp import web
+
+from config import SERVER_HOST, SERVER_MAX_CONCURRENCY, SERVER_MAX_PENDING, SERVER_PORT
+from embedding_cache import normalize_question
+from tracing import REGISTRY
+
+
+class Overloaded(Exception):
+    """Raised when too many requests are already waiting for the pipeline."""
+
+
+class QueryService:
+    """
+    Answers questions through one shared RAGPipeline.
+
+    Identical in-flight questions (after normalization) are coalesced onto a
+    single retrieval + LLM call. At most max_concurrency calls run at once;
+    up to max_pending more may wait for a slot, and beyond that new
+    questions are refused so the upstream LLM is never flooded.
+    """
+
+    def __init__(self, pipeline, max_concurrency: int = SERVER_MAX_CONCURRENCY,
+                 max_pending: int = SERVER_MAX_PENDING):
+        self.pipeline = pipeline
+        self.max_pending = max_pending
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._in_flight = {}
+        self._pending = 0
+        self.stats = {"requests": 0, "pipeline_calls": 0, "coalesced": 0, "rejected": 0, "errors": 0}
+
+    async def answer(self, question: str) -> dict:
+        """Returns the pipeline result for question, sharing any identical call already running."""
+        self.stats["requests"] += 1
+        key = normalize_question(question)
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise Overloaded()
+            task = asyncio.create_task(self._run(question))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shield: one client disconnecting must not cancel the call the others wait on
+        return await asyncio.shield(task)
+
+    async def _run(self, question: str) -> dict:
+        self._pending += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._pending -= 1
+        try:
+            self.stats["pipeline_calls"] += 1
+            return await self.pipeline.ainvoke(question)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self._slots.release()
+
+
+async def handle_query(request: web.Request) -> web.Response:
+    try:
+        body = await request.json()
+        question = str(body["question"]).strip()
+    except (ValueError, KeyError, TypeError):
+        return web.json_response({"error": 'Expected a JSON body like {"question": "..."}.'}, status=400)
+    if not question:
+        return web.json_response({"error": "The question must not be empty."}, status=400)
+
+    service = request.app["service"]
+    try:
+        result = await service.answer(question)
+    except Overloaded:
+        return web.json_response({"error": "Too many requests in progress, please retry shortly."},
+                                 status=503, headers={"Retry-After": "1"})
+    except Exception as e:
+        return web.json_response({"error": f"An error occurred while processing the query: {e}"}, status=500)
+    return web.json_response({**result, "question": question})
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+async def handle_stats(request: web.Request) -> web.Response:
+    return web.json_response(request.app["service"].stats)
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    # Prometheus text exposition format
+    return web.Response(text=REGISTRY.render(), content_type="text/plain; version=0.0.4")
+
+
+def create_app(pipeline=None, max_concurrency: int = SERVER_MAX_CONCURRENCY,
+               max_pending: int = SERVER_MAX_PENDING) -> web.Application:
+    """
+    Builds the aiohttp application. Without a pipeline, the default one is
+    built from config.py when the server starts.
+    """
+    app = web.Application()
+
+    async def on_startup(app):
+        nonlocal pipeline
+        if pipeline is None:
+            from pipeline import get_pipeline
+
+            # Building opens ChromaDB and the OpenAI clients; keep it off the event loop
+            pipeline = await asyncio.to_thread(get_pipeline)
+        app["service"] = QueryService(pipeline, max_concurrency, max_pending)
+
+    app.on_startup.append(on_startup)
+    app.add_routes([
+        web.post("/query", handle_query),
+        web.get("/health", handle_health),
+        web.get("/stats", handle_stats),
+        web.get("/metrics", handle_metrics),
+    ])
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Ask Herts RAG pipeline over HTTP.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
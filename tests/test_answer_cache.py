@@ -0,0 +1,102 @@
+# tests/test_answer_cache.py
+
+import numpy as np
+
+from answer_cache import SemanticAnswerCache
+from collection_version import bump_collection_version
+
+
+def unit(i: int, size: int = 8) -> list[float]:
+    vector = np.zeros(size)
+    vector[i] = 1.0
+    return vector.tolist()
+
+
+def result(answer: str) -> dict:
+    return {"question": "q", "answer": answer, "context": [], "metadata": []}
+
+
+def open_cache(tmp_path, namespace="a", persist_directory=None, **kwargs):
+    persist_directory = persist_directory or tmp_path / "db"
+    persist_directory.mkdir(exist_ok=True)
+    return SemanticAnswerCache(str(tmp_path / "answers.sqlite"), persist_directory=str(persist_directory),
+                               namespace=namespace, **kwargs)
+
+
+def test_namespaces_do_not_share_answers(tmp_path):
+    cache, other = open_cache(tmp_path, "gpt-4o|k=6"), open_cache(tmp_path, "gpt-4o-mini|k=6")
+    cache.store("fees?", unit(0), result("£10"))
+
+    assert cache.lookup(unit(0))["answer"] == "£10"
+    assert other.lookup(unit(0)) is None
+
+
+def test_version_change_clears_only_its_own_namespace(tmp_path):
+    first = open_cache(tmp_path, "first", tmp_path / "first_db")
+    second = open_cache(tmp_path, "second", tmp_path / "second_db")
+    first.store("fees?", unit(0), result("£10"))
+    second.store("fees?", unit(0), result("£12"))
+
+    bump_collection_version(str(tmp_path / "first_db"))
+
+    assert first.lookup(unit(0)) is None
+    assert second.lookup(unit(0))["answer"] == "£12"
+    assert first.lookup(unit(0)) is None
+
+
+def test_models_of_different_sizes_share_a_file(tmp_path):
+    small, large = open_cache(tmp_path, "small"), open_cache(tmp_path, "large")
+    small.store("fees?", unit(0, 8), result("small"))
+    large.store("fees?", unit(0, 16), result("large"))
+
+    assert open_cache(tmp_path, "small").lookup(unit(0, 8))["answer"] == "small"
+    assert open_cache(tmp_path, "large").lookup(unit(0, 16))["answer"] == "large"
+
+
+def test_store_updates_the_matrix_without_reloading(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.lookup(unit(0))
+    reloads = []
+    load = cache._refresh_matrix
+
+    def counting_refresh():
+        before = cache._data_version
+        load()
+        if cache._data_version != before or before is None:
+            reloads.append(1)
+
+    cache._refresh_matrix = counting_refresh
+    for i in range(8):
+        cache.store(f"question {i}", unit(i), result(str(i)))
+        assert cache.lookup(unit(i))["answer"] == str(i)
+
+    assert not reloads
+
+
+def test_writes_from_another_connection_are_seen(tmp_path):
+    cache, writer = open_cache(tmp_path), open_cache(tmp_path)
+    assert cache.lookup(unit(0)) is None
+
+    writer.store("fees?", unit(0), result("£10"))
+
+    assert cache.lookup(unit(0))["answer"] == "£10"
+
+
+def test_oldest_entries_are_evicted_beyond_max_entries(tmp_path):
+    cache = open_cache(tmp_path, max_entries=2)
+    for i in range(3):
+        cache.store(f"question {i}", unit(i), result(str(i)))
+
+    assert cache.lookup(unit(0)) is None
+    assert cache.lookup(unit(2))["answer"] == "2"
+    assert cache.stats()["size"] == 2
+
+
+def test_matrix_compaction_keeps_live_entries(tmp_path):
+    cache = open_cache(tmp_path, max_entries=50)
+    for i in range(200):
+        cache.store(f"question {i}", unit(i, 256), result(str(i)))
+
+    assert cache.lookup(unit(120, 256)) is None
+    assert all(cache.lookup(unit(i, 256))["answer"] == str(i) for i in range(150, 200))
+    assert cache._size - cache._dead == 50
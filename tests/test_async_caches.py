@@ -0,0 +1,48 @@
+# tests/test_async_caches.py
+
+import asyncio
+import threading
+
+from answer_cache import SemanticAnswerCache
+from benchmarks.fakes import CountingEmbeddings, FakeLatencyChatModel, build_vectorstore
+from embedding_cache import CachedQueryEmbeddings
+from pipeline import RAGPipeline
+from retrieval_cache import RetrievalCache
+
+
+def record_threads(monkeypatch, cls, names, threads):
+    """Records the thread each of cls's methods in names runs on."""
+    for name in names:
+        method = getattr(cls, name)
+
+        def recorded(self, *args, _method=method, **kwargs):
+            threads.append(threading.get_ident())
+            return _method(self, *args, **kwargs)
+
+        monkeypatch.setattr(cls, name, recorded)
+
+
+def test_async_paths_keep_sqlite_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    record_threads(monkeypatch, CachedQueryEmbeddings, ["_get", "_put"], threads)
+    record_threads(monkeypatch, SemanticAnswerCache, ["lookup", "store"], threads)
+    record_threads(monkeypatch, RetrievalCache, ["lookup", "store"], threads)
+    fake = CountingEmbeddings()
+    embeddings = CachedQueryEmbeddings(fake, "fake", str(tmp_path / "queries.sqlite"))
+    pipeline = RAGPipeline(
+        embedding_function=embeddings, vectorstore=build_vectorstore(fake), llm=FakeLatencyChatModel(latency=0),
+        answer_cache=SemanticAnswerCache(str(tmp_path / "answers.sqlite"), persist_directory=str(tmp_path)),
+        retrieval_cache=RetrievalCache(str(tmp_path / "retrieval.sqlite"), persist_directory=str(tmp_path)),
+        persist_directory=str(tmp_path),
+    )
+
+    async def run():
+        await pipeline.ainvoke("replacement id card fees?")
+        [event async for event in pipeline.astream("council tax exemptions?")]
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+
+    # Embedding, retrieval and answer caches were each looked up and stored into
+    assert len(threads) == 12
+    assert loop_thread not in threads
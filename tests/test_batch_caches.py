@@ -0,0 +1,63 @@
+# tests/test_batch_caches.py
+
+import asyncio
+
+import pytest
+
+from answer_cache import SemanticAnswerCache
+from benchmarks.fakes import CountingEmbeddings, FakeLatencyChatModel, build_vectorstore
+from pipeline import RAGPipeline
+
+QUESTIONS = ["replacement id card fees?", "council tax exemptions?", "on campus laundry facilities?"]
+
+
+@pytest.fixture
+def pipeline_and_fakes(tmp_path):
+    embeddings = CountingEmbeddings()
+    store = build_vectorstore(embeddings)
+    cache = SemanticAnswerCache(str(tmp_path / "answers.sqlite"), persist_directory=str(tmp_path))
+    pipeline = RAGPipeline(embedding_function=embeddings, vectorstore=store, llm=FakeLatencyChatModel(latency=0),
+                           answer_cache=cache, persist_directory=str(tmp_path))
+    return pipeline, embeddings, store, cache
+
+
+def test_batch_answers_from_and_fills_the_answer_cache(pipeline_and_fakes):
+    pipeline, embeddings, store, cache = pipeline_and_fakes
+    pipeline.invoke(QUESTIONS[0])
+    store.search_calls = 0
+
+    first = pipeline.batch(QUESTIONS)
+
+    assert first[0]["similarity"] == pytest.approx(1.0)
+    assert store.search_calls == 1  # one multi-query search for the two misses
+    assert cache.stats()["size"] == 3
+    second = pipeline.batch(QUESTIONS)
+    assert store.search_calls == 1
+    assert [r["question"] for r in second] == QUESTIONS
+    assert [r["answer"] for r in second] == [r["answer"] for r in first]
+    assert all("total" in r["timings_ms"] for r in second)
+
+
+def test_batch_without_caches_generates_fresh_answers(pipeline_and_fakes):
+    pipeline, embeddings, store, cache = pipeline_and_fakes
+    pipeline.invoke(QUESTIONS[0])
+    embeddings.query_calls = store.search_calls = 0
+
+    results = pipeline.batch(QUESTIONS, use_caches=False)
+
+    assert all("similarity" not in r for r in results)
+    assert (embeddings.query_calls, store.search_calls) == (0, 1)  # one embed_documents call, one search
+    assert cache.stats()["size"] == 1
+
+
+def test_abatch_uses_the_answer_cache_unless_told_not_to(pipeline_and_fakes):
+    pipeline, embeddings, store, cache = pipeline_and_fakes
+    pipeline.invoke(QUESTIONS[0])
+
+    cached = asyncio.run(pipeline.abatch(QUESTIONS))
+    assert "similarity" in cached[0]
+    assert cache.stats()["hits"] == 1 and cache.stats()["size"] == 3
+
+    fresh = asyncio.run(pipeline.abatch(QUESTIONS, use_caches=False))
+    assert all("similarity" not in r for r in fresh)
+    assert cache.stats()["hits"] == 1
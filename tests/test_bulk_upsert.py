@@ -0,0 +1,54 @@
+# tests/test_bulk_upsert.py
+
+import pytest
+
+from bulk_upsert import BatchUpserter, is_rate_limit_error, retry_after_seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class HTTPError(Exception):
+    def __init__(self, message, status_code, headers=None):
+        super().__init__(message)
+        self.response = FakeResponse(status_code, headers)
+
+
+@pytest.mark.parametrize("error, expected", [
+    (HTTPError("Too Many Requests", 429), True),
+    (HTTPError("Bad Gateway", 502), True),
+    (HTTPError("Invalid input", 400), False),
+    # The text mentions 429 but the error is not a rate limit
+    (ValueError("chunk https://ask.herts.ac.uk/page#429 has 429 tokens"), False),
+    (HTTPError("Invalid input: 429 tokens", 400), False),
+])
+def test_is_rate_limit_error(error, expected):
+    assert is_rate_limit_error(error) is expected
+
+
+def test_retry_after_zero_is_a_hint():
+    assert retry_after_seconds(HTTPError("Too Many Requests", 429, {"retry-after": "0"})) == 0.0
+    assert retry_after_seconds(HTTPError("Too Many Requests", 429)) is None
+
+
+def test_retry_after_zero_retries_immediately(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("bulk_upsert.time.sleep", sleeps.append)
+    calls = []
+
+    def embed(texts):
+        calls.append(texts)
+        if len(calls) == 1:
+            raise HTTPError("Too Many Requests", 429, {"retry-after": "0"})
+        return [[1.0, 0.0] for _ in texts]
+
+    class Collection:
+        def upsert(self, **kwargs):
+            pass
+
+    upserter = BatchUpserter(Collection(), embed, max_retries=2)
+    assert upserter._write_batch(["a"], ["text"], [{}], 1) == (1, 1)
+    assert sleeps == [0.0]
@@ -0,0 +1,66 @@
+# tests/test_chunk_ids.py
+
+import pytest
+
+from chunking import chunk_page
+from ingest_manifest import chunk_ids
+
+URL = "https://ask.herts.ac.uk/replacement-id-cards-lost-damaged-stolen"
+
+
+def page(sections: list[tuple[str, str]]) -> tuple[str, list]:
+    """Page text with one heading per section, and its outline."""
+    text, outline = "", []
+    for title, body in sections:
+        outline.append((len(text), "heading", title))
+        text += f"{title}\n{body}\n"
+    return text, outline
+
+
+SECTIONS = [
+    ("Lost cards", "Report a lost or stolen ID card to the helpdesk straight away. " * 7),
+    ("Fees", "The fee for a replacement ID card is £10, payable through the online store. " * 6),
+    ("Collection", "Replacement cards can be collected from the Forum helpdesk after two days. " * 6),
+]
+
+
+def test_inserting_a_paragraph_keeps_the_ids_of_later_chunks():
+    before_text, before_outline = page(SECTIONS)
+    edited = [(SECTIONS[0][0], "Cards are free for the first replacement. " + SECTIONS[0][1])] + SECTIONS[1:]
+    after_text, after_outline = page(edited)
+
+    before = chunk_ids(URL, [chunk.text for chunk in chunk_page(before_text, before_outline, "structured")])
+    after = chunk_ids(URL, [chunk.text for chunk in chunk_page(after_text, after_outline, "structured")])
+
+    assert len(before) == len(after) >= 3
+    assert before[0] != after[0]
+    assert before[1:] == after[1:]
+
+
+def test_repeated_chunks_get_distinct_ids():
+    ids = chunk_ids(URL, ["Opening hours", "Fees", "Opening hours"])
+
+    assert len(set(ids)) == 3
+    assert all(chunk_id.startswith(f"{URL}#") for chunk_id in ids)
+    assert ids[2] == f"{ids[0]}-2"
+
+
+def test_incremental_ingestion_embeds_only_the_edited_chunk(tmp_path, monkeypatch):
+    pytest.importorskip("chromadb")
+    # Importing ingestion creates its HTTP cache in the working directory
+    monkeypatch.chdir(tmp_path)
+    from benchmarks.incremental_ingest import CountingEmbeddingFunction
+    from ingestion import ProcessedPage, rag_ingest_urls
+
+    for sections in (SECTIONS, [(SECTIONS[0][0], "Cards are free the first time. " + SECTIONS[0][1])] + SECTIONS[1:]):
+        text, outline = page(sections)
+        embedding_function = CountingEmbeddingFunction()
+        collection = rag_ingest_urls([URL], "test_collection", str(tmp_path), incremental=True,
+                                     embedding_function=embedding_function, chunker="structured",
+                                     pages=[ProcessedPage(URL, text, None, None, outline)])
+
+    assert embedding_function.texts == 1
+    stored = collection.get(include=["metadatas", "documents"])
+    assert len(stored["ids"]) == 3
+    for document, metadata in zip(stored["documents"], stored["metadatas"]):
+        assert text[metadata["start_index"]:metadata["end_index"]] == document
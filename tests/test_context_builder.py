@@ -0,0 +1,27 @@
+# tests/test_context_builder.py
+
+import context_builder
+from benchmarks.fakes import CountingEmbeddings, FakeLatencyChatModel, build_vectorstore
+from pipeline import RAGPipeline
+
+
+def test_pipeline_counts_context_tokens_with_its_llm(monkeypatch, capsys):
+    requested = []
+    get_encoding = context_builder.get_encoding
+
+    def recording_get_encoding(model_name):
+        requested.append(model_name)
+        return get_encoding(model_name)
+
+    monkeypatch.setattr(context_builder, "get_encoding", recording_get_encoding)
+    embeddings = CountingEmbeddings()
+    pipeline = RAGPipeline(embedding_function=embeddings, vectorstore=build_vectorstore(embeddings),
+                           llm=FakeLatencyChatModel(latency=0), llm_model_name="gpt-4o-mini")
+    capsys.readouterr()
+
+    result = pipeline.invoke("replacement id card fees?")
+
+    assert set(requested) == {"gpt-4o-mini"}
+    assert result["context_tokens"]["prompt"] > 0
+    # The sources are returned, not printed on every call
+    assert "Context:" not in capsys.readouterr().out
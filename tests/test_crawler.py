@@ -0,0 +1,111 @@
+# tests/test_crawler.py
+
+import pytest
+import requests
+
+from benchmarks.fixture_server import fixture_names, serve_fixtures
+from crawler import Crawler, canonicalize_url
+
+pytest.importorskip("chromadb")
+requests_cache = pytest.importorskip("requests_cache")
+
+
+@pytest.fixture
+def base_url(tmp_path, monkeypatch):
+    # Importing ingestion (benchmarks.crawler does too) creates its HTTP cache in the working directory
+    monkeypatch.chdir(tmp_path)
+    with serve_fixtures() as base_url, requests_cache.disabled():
+        yield base_url
+
+
+def seed_urls(base_url: str) -> list[str]:
+    from benchmarks.crawler import seed_urls
+
+    return seed_urls(base_url)
+
+
+def seed_url(base_url: str) -> str:
+    """The seed page alone; it links to one other fixture."""
+    from benchmarks.crawler import SEED
+
+    return f"{base_url}/{SEED}"
+
+
+def crawl(crawler, session=None):
+    from ingestion import fetch_page, preprocess_page
+
+    session = session or requests.Session()
+    return [fetched.url for fetched, _, _ in
+            crawler.crawl(lambda url: fetch_page(session, url), preprocess_page, session)]
+
+
+def ingest(seeds, persist_directory, **crawler_options):
+    from benchmarks.incremental_ingest import CountingEmbeddingFunction
+    from ingestion import rag_ingest_crawl
+
+    crawler = Crawler(seeds, persist_directory, delay=0, **crawler_options)
+    collection = rag_ingest_crawl(crawler.seeds, "test_collection", persist_directory, crawler=crawler,
+                                  incremental=True, embedding_function=CountingEmbeddingFunction())
+    # By page name: of two pages with the same text, whichever is fetched first is kept
+    return {metadata["source"].rsplit("/", 1)[-1] for metadata in collection.get(include=["metadatas"])["metadatas"]}
+
+
+def test_canonicalize_url():
+    assert (canonicalize_url("HTTPS://Ask.Herts.ac.uk:443/laundry/?utm_source=x&b=2&a=1#hours")
+            == "https://ask.herts.ac.uk/laundry?a=1&b=2")
+
+
+def test_each_page_is_crawled_once(base_url, tmp_path):
+    crawler = Crawler(seed_urls(base_url), str(tmp_path / "db"), delay=0)
+
+    urls = crawl(crawler)
+
+    # The mirror seed has the same text as a page the first seed links to
+    assert sorted(url.rsplit("/", 1)[-1] for url in urls) == fixture_names()
+    assert crawler.frontier.counts()["duplicate"] == 1
+
+
+def test_robots_txt_is_fetched_once_through_the_crawl_session(base_url, tmp_path):
+    requested = []
+
+    class RecordingSession(requests.Session):
+        def get(self, url, **kwargs):
+            requested.append(url)
+            return super().get(url, **kwargs)
+
+    crawl(Crawler(seed_urls(base_url), str(tmp_path / "db"), delay=0, workers=4), RecordingSession())
+
+    assert [url for url in requested if url.endswith("/robots.txt")] == [f"{base_url}/robots.txt"]
+
+
+def test_partial_crawl_delists_nothing(base_url, tmp_path):
+    persist_directory = str(tmp_path / "db")
+    complete = ingest(seed_urls(base_url), persist_directory)
+    assert complete == set(fixture_names())
+
+    # Stops at the page cap with pages pending: the pages not visited yet must stay
+    assert ingest([seed_url(base_url)], persist_directory, max_pages=1) == complete
+    # The resumed crawl completes and finds every page again
+    assert ingest(seed_urls(base_url), persist_directory) == complete
+
+
+def test_complete_crawl_delists_unreachable_pages(base_url, tmp_path):
+    persist_directory = str(tmp_path / "db")
+    ingest(seed_urls(base_url), persist_directory)
+
+    # A complete crawl of the seed alone no longer reaches the other pages
+    assert ingest([seed_url(base_url)], persist_directory, max_depth=0) == {seed_url(base_url).rsplit("/", 1)[-1]}
+
+
+def test_ingesting_the_url_list_keeps_crawled_pages(base_url, tmp_path):
+    from benchmarks.incremental_ingest import CountingEmbeddingFunction
+    from ingestion import rag_ingest_urls
+
+    persist_directory = str(tmp_path / "db")
+    crawled = ingest(seed_urls(base_url), persist_directory)
+
+    collection = rag_ingest_urls([seed_url(base_url)], "test_collection", persist_directory, incremental=True,
+                                 embedding_function=CountingEmbeddingFunction())
+
+    assert {metadata["source"].rsplit("/", 1)[-1]
+            for metadata in collection.get(include=["metadatas"])["metadatas"]} == crawled
@@ -0,0 +1,33 @@
+# tests/test_embedding_cache.py
+
+from benchmarks.fakes import CountingEmbeddings
+from embedding_cache import CachedQueryEmbeddings
+
+
+def test_hits_do_not_write_until_flushed(tmp_path):
+    cache = CachedQueryEmbeddings(CountingEmbeddings(), "fake", str(tmp_path / "q.sqlite"), max_entries=10)
+    cache.embed_query("replacement id card fees?")
+    cache._conn.execute("UPDATE query_embeddings SET last_used = 0")
+    cache._conn.commit()
+
+    cache.embed_query("Replacement ID card  fees?")
+
+    assert cache._conn.execute("SELECT last_used FROM query_embeddings").fetchone()[0] == 0
+    cache.flush()
+    assert cache._conn.execute("SELECT last_used FROM query_embeddings").fetchone()[0] > 0
+
+
+def test_eviction_sees_pending_hits(tmp_path):
+    embeddings = CountingEmbeddings()
+    cache = CachedQueryEmbeddings(embeddings, "fake", str(tmp_path / "q.sqlite"), max_entries=2)
+    cache.embed_query("first")
+    cache.embed_query("second")
+    cache.embed_query("first")  # now the most recently used
+
+    cache.embed_query("third")  # evicts "second"
+
+    calls = embeddings.query_calls
+    cache.embed_query("first")
+    assert embeddings.query_calls == calls
+    cache.embed_query("second")
+    assert embeddings.query_calls == calls + 1
@@ -0,0 +1,73 @@
+# tests/test_faq_index.py
+
+import pytest
+
+from benchmarks.fakes import CountingEmbeddings, FakeLatencyChatModel, build_vectorstore
+from collection_version import bump_collection_version
+from faq_index import FAQIndex, load_faq_questions, refresh_faq_index
+from pipeline import RAGPipeline
+
+QUESTIONS = ["How much is a replacement ID card?", "Where is the laundry on campus?"]
+
+
+def make_pipeline(tmp_path, name: str, k_retriever: int = 6) -> RAGPipeline:
+    embeddings = CountingEmbeddings()
+    persist_directory = tmp_path / name
+    persist_directory.mkdir(exist_ok=True)
+    return RAGPipeline(embedding_function=embeddings, vectorstore=build_vectorstore(embeddings),
+                       llm=FakeLatencyChatModel(latency=0), persist_directory=str(persist_directory),
+                       k_retriever=k_retriever)
+
+
+def refresh(tmp_path, pipeline, questions=None):
+    return refresh_faq_index(pipeline=pipeline, questions=questions, path=str(tmp_path / "faq.sqlite"),
+                             persist_directory=str(tmp_path / "db"))
+
+
+def index_for(tmp_path, pipeline) -> FAQIndex:
+    return FAQIndex(str(tmp_path / "faq.sqlite"), persist_directory=str(tmp_path / "db"),
+                    namespace=pipeline.namespace)
+
+
+def test_a_new_index_needs_a_curated_question_list(tmp_path):
+    (tmp_path / "db").mkdir()
+    pipeline = make_pipeline(tmp_path, "db")
+
+    with pytest.raises(ValueError):
+        refresh(tmp_path, pipeline)
+    assert refresh(tmp_path, pipeline, QUESTIONS) == 2
+    # Later refreshes reuse the stored list
+    assert refresh(tmp_path, pipeline, None) is None
+    assert refresh_faq_index(pipeline=pipeline, path=str(tmp_path / "faq.sqlite"),
+                             persist_directory=str(tmp_path / "db"), force=True) == 2
+
+
+def test_pipelines_do_not_share_faq_answers(tmp_path):
+    (tmp_path / "db").mkdir()
+    first, other = make_pipeline(tmp_path, "db"), make_pipeline(tmp_path, "db", k_retriever=3)
+    refresh(tmp_path, first, QUESTIONS)
+
+    assert index_for(tmp_path, first).is_current()
+    assert index_for(tmp_path, other).questions() == []
+    assert index_for(tmp_path, other).lookup(first.embedding_function.embed_query(QUESTIONS[0])) is None
+
+
+def test_collection_change_drops_the_answers_but_keeps_the_questions(tmp_path):
+    (tmp_path / "db").mkdir()
+    pipeline = make_pipeline(tmp_path, "db")
+    refresh(tmp_path, pipeline, QUESTIONS)
+
+    bump_collection_version(str(tmp_path / "db"))
+
+    index = index_for(tmp_path, pipeline)
+    assert not index.is_current()
+    assert index.questions() == QUESTIONS
+    assert refresh(tmp_path, pipeline) == 2
+
+
+def test_load_faq_questions(tmp_path):
+    path = tmp_path / "faq_questions.txt"
+    path.write_text("# Curated from the help desk logs\nHow much is a replacement ID card?\n\n"
+                    "  Where is the laundry on campus?  \n", encoding="utf-8")
+
+    assert load_faq_questions(str(path)) == QUESTIONS
@@ -0,0 +1,117 @@
+# tests/test_flat_index.py
+
+import numpy as np
+import pytest
+
+from benchmarks.quantized_flat_index import synthetic_vectors
+from flat_index import (
+    FLAT_CODES_FILENAME,
+    FLAT_MATRIX_FILENAME,
+    FlatVectorStore,
+    export_flat_index,
+    write_flat_index,
+)
+
+K = 5
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    vectors = synthetic_vectors(rng, 2000, 768)
+    # Perturbed copies of random chunks, as in the benchmark
+    queries = vectors[rng.choice(len(vectors), size=20)] + synthetic_vectors(rng, 20, 768) * 0.5
+    return vectors, queries
+
+
+def open_index(tmp_path, vectors, quantization=None, dimensions=None, rescore_factor=4) -> FlatVectorStore:
+    tmp_path.mkdir(exist_ok=True)
+    ids = [f"chunk-{i}" for i in range(len(vectors))]
+    write_flat_index(str(tmp_path), vectors, ids, [""] * len(ids), [{}] * len(ids),
+                     quantization=quantization, dimensions=dimensions)
+    # Stands in for the ChromaDB collection that holds the full-precision vectors
+    by_id = dict(zip(ids, vectors))
+    return FlatVectorStore.load(str(tmp_path), rescore_factor=rescore_factor,
+                                vectors=lambda chunk_ids: {i: by_id[i] for i in chunk_ids})
+
+
+def overlap(store, exact, queries) -> float:
+    hits = store.search_vectors(queries, K)
+    return np.mean([len({i for i, _ in h} & {i for i, _ in e}) / K
+                    for h, e in zip(hits, exact.search_vectors(queries, K))])
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_rescored_scores_are_full_precision(tmp_path, data, quantization):
+    vectors, queries = data
+    exact = open_index(tmp_path / "exact", vectors)
+    store = open_index(tmp_path / quantization, vectors, quantization)
+    assert store.codes is not None and exact.codes is None
+
+    for query, hits in zip(queries, store.search_vectors(queries, K)):
+        scores = [score for _, score in hits]
+        assert scores == sorted(scores, reverse=True)
+        normalized = query / np.linalg.norm(query)
+        for row, score in hits:
+            assert score == pytest.approx(float(exact.matrix[row] @ normalized), abs=1e-5)
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_quantized_top_k_matches_exact_search(tmp_path, data, quantization):
+    vectors, queries = data
+    exact = open_index(tmp_path / "exact", vectors)
+    store = open_index(tmp_path / quantization, vectors, quantization)
+    assert overlap(store, exact, queries) >= 0.9
+
+
+def test_truncated_codes_are_rescored_at_full_dimensions(tmp_path, data):
+    vectors, queries = data
+    exact = open_index(tmp_path / "exact", vectors)
+    store = open_index(tmp_path / "int8", vectors, "int8", dimensions=256)
+    assert store.codes.shape == (len(vectors), 256)
+    assert store.codes.dtype == np.int8
+    assert overlap(store, exact, queries) >= 0.8
+    for row, score in store.search_vector(queries[0], K):
+        assert score == pytest.approx(float(exact.matrix[row] @ (queries[0] / np.linalg.norm(queries[0]))), abs=1e-5)
+
+
+def test_compressed_index_stores_only_the_codes(tmp_path, data):
+    vectors, _ = data
+    open_index(tmp_path, vectors)
+    assert (tmp_path / FLAT_MATRIX_FILENAME).exists()
+    store = open_index(tmp_path, vectors, "int8")
+    assert store.matrix is None
+    assert not (tmp_path / FLAT_MATRIX_FILENAME).exists()
+    assert (tmp_path / FLAT_CODES_FILENAME).stat().st_size < vectors.nbytes / 3
+
+    store = open_index(tmp_path, vectors)
+    assert store.codes is None
+    assert not (tmp_path / FLAT_CODES_FILENAME).exists()
+
+
+def test_candidates_missing_from_the_collection_are_skipped(tmp_path, data):
+    vectors, queries = data
+    store = open_index(tmp_path, vectors, "int8")
+    expected = store.search_vector(queries[0], K + 1)
+    deleted = store.ids[expected[0][0]]
+    fetch = store.vectors
+    store.vectors = lambda chunk_ids: {i: v for i, v in fetch(chunk_ids).items() if i != deleted}
+    assert store.search_vector(queries[0], K) == expected[1:]
+
+
+def test_rescoring_reads_the_vectors_from_chromadb(tmp_path, data):
+    chromadb = pytest.importorskip("chromadb")
+    vectors, queries = data[0][:500], data[1]
+    ids = [f"chunk-{i}" for i in range(len(vectors))]
+    collection = chromadb.PersistentClient(path=str(tmp_path)).create_collection("flat_test")
+    collection.add(ids=ids, embeddings=vectors, documents=[f"chunk {i}" for i in ids])
+
+    export_flat_index(collection, str(tmp_path), quantization="int8")
+    store = FlatVectorStore.load(str(tmp_path))
+    assert store.matrix is None
+    for query, hits in zip(queries, store.search_vectors(queries, K)):
+        normalized = query / np.linalg.norm(query)
+        exact = {ids[i]: float(v @ normalized) / float(np.linalg.norm(v)) for i, v in enumerate(vectors)}
+        assert len(hits) == K
+        for row, score in hits:
+            assert score == pytest.approx(exact[store.ids[row]], abs=1e-5)
@@ -0,0 +1,77 @@
+# tests/test_hybrid_retrieval.py
+
+import pytest
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeCrossEncoder
+from config import CHROMA_COLLECTION_NAME
+from reranker import CrossEncoderReranker
+from retrievers import reciprocal_rank_fusion
+
+QUESTIONS = ["How much does it cost to replace a lost or damaged student ID card?",
+             "What should I do if my ID card is stolen?",
+             "laundry on campus"]
+
+
+@pytest.fixture(scope="module")
+def persist_directory(tmp_path_factory):
+    # Importing ingestion creates its HTTP cache in the working directory
+    directory = tmp_path_factory.mktemp("hybrid")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(directory)
+        from retrieval_benchmark import build_stub_index
+
+        build_stub_index(str(directory / "db"))
+    return str(directory / "db")
+
+
+@pytest.fixture(scope="module")
+def retriever(persist_directory):
+    from retrieval_benchmark import STUB_EMBEDDING_MODEL, open_retriever
+
+    return open_retriever(persist_directory, CHROMA_COLLECTION_NAME, STUB_EMBEDDING_MODEL, k=4, hybrid=True)
+
+
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_hybrid_results_are_unique_chunks_with_ids(retriever, question):
+    docs = retriever.invoke(question)
+
+    assert len(docs) == 4
+    assert all(doc.id for doc in docs)
+    assert len({doc.id for doc in docs}) == len(docs)
+
+
+def test_batch_retrieval_matches_the_retriever(retriever):
+    from retrievers import retrieve_batch
+
+    vectorstore = retriever.vector_retriever.vectorstore
+    vectors = [vectorstore.embeddings.embed_query(question) for question in QUESTIONS]
+    batched = retrieve_batch(vectorstore, QUESTIONS, vectors, k=4, bm25_index=retriever.bm25_index)
+
+    assert [[doc.id for doc in docs] for docs in batched] == [[doc.id for doc in retriever.invoke(question)]
+                                                             for question in QUESTIONS]
+
+
+def chunk(id_, text="Laundry is on College Lane."):
+    return Document(id=id_, page_content=text, metadata={"source": "https://ask.herts.ac.uk/laundry-on-campus"})
+
+
+def test_fusion_merges_a_chunk_found_by_both_searches():
+    fused = reciprocal_rank_fusion([[chunk("a"), chunk("b")], [chunk("b"), chunk("c")]])
+
+    assert [doc.id for doc in fused] == ["b", "a", "c"]
+
+
+def test_fusion_refuses_chunks_without_ids():
+    with pytest.raises(ValueError):
+        reciprocal_rank_fusion([[chunk("a")], [chunk(None)]])
+
+
+def test_reranker_caches_scores_by_chunk_text():
+    model = FakeCrossEncoder(latency=0)
+    reranker = CrossEncoderReranker(model=model, top_n=1, latency_budget_ms=None)
+    docs = [chunk(None, "Laundry is on College Lane."), chunk(None, "Council tax exemption.")]
+
+    assert reranker.rerank("laundry on campus", docs)[0].page_content == docs[0].page_content
+    reranker.rerank("laundry on campus", [chunk("a", docs[0].page_content), chunk("b", docs[1].page_content)])
+    assert model.pairs_scored == 2
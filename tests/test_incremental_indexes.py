@@ -0,0 +1,115 @@
+# tests/test_incremental_indexes.py
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("chromadb")
+
+PAGES = {
+    "https://ask.herts.ac.uk/laundry-on-campus": "Laundry facilities are on College Lane and de Havilland. " * 20,
+    "https://ask.herts.ac.uk/council-tax-exemption": "Full-time students are exempt from Council Tax. " * 20,
+    "https://ask.herts.ac.uk/student-letters": "Request a student letter through the Student Letters portal. " * 20,
+}
+
+
+@pytest.fixture
+def ingest(tmp_path, monkeypatch):
+    # Importing ingestion creates its HTTP cache in the working directory and checks for an API key
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-offline-test")
+    import ingestion
+    from benchmarks.incremental_ingest import CountingEmbeddingFunction
+
+    monkeypatch.setattr(ingestion, "VECTOR_STORE_BACKEND", "flat")
+    persist_directory = str(tmp_path / "db")
+
+    def run(pages: dict):
+        return ingestion.rag_ingest_urls(
+            list(pages), "test_collection", persist_directory, incremental=True,
+            embedding_function=CountingEmbeddingFunction(),
+            pages=[ingestion.ProcessedPage(url, text, None, None, None) for url, text in pages.items()])
+
+    return run, persist_directory
+
+
+def full_rebuild_forbidden(monkeypatch):
+    import bm25_index
+    import flat_index
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the whole collection was read")
+
+    monkeypatch.setattr(bm25_index.BM25Index, "from_collection", fail)
+    monkeypatch.setattr(flat_index, "export_flat_index", fail)
+
+
+def test_a_changed_page_updates_the_indexes_from_its_chunks(ingest, monkeypatch):
+    from bm25_index import BM25Index, load_bm25_index
+    from flat_index import FlatVectorStore
+
+    run, persist_directory = ingest
+    run(PAGES)
+    edited = dict(PAGES)
+    edited["https://ask.herts.ac.uk/laundry-on-campus"] = "Laundry is open from 7am to 11pm every day. " * 20
+    del edited["https://ask.herts.ac.uk/student-letters"]
+
+    with monkeypatch.context() as patched:
+        full_rebuild_forbidden(patched)
+        collection = run(edited)
+
+    expected = BM25Index.from_collection(collection)
+    bm25 = load_bm25_index(persist_directory)
+    assert sorted(bm25.ids) == sorted(expected.ids)
+    for query in ("laundry hours", "council tax", "student letters"):
+        assert ({bm25.ids[i]: score for i, score in bm25.search(query, 10)}
+                == pytest.approx({expected.ids[i]: score for i, score in expected.search(query, 10)}))
+
+    store = FlatVectorStore.load(persist_directory)
+    data = collection.get(include=["embeddings"])
+    assert sorted(store.ids) == sorted(data["ids"])
+    rows = {chunk_id: row for row, chunk_id in enumerate(store.ids)}
+    for chunk_id, embedding in zip(data["ids"], data["embeddings"]):
+        vector = np.asarray(embedding) / np.linalg.norm(embedding)
+        assert np.asarray(store.matrix[rows[chunk_id]]) == pytest.approx(vector, abs=1e-6)
+
+
+def test_an_unchanged_run_leaves_the_indexes_alone(ingest, monkeypatch):
+    import ingestion
+
+    run, _ = ingest
+    run(PAGES)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("an index was rebuilt")
+
+    monkeypatch.setattr(ingestion, "refresh_bm25_index", fail)
+    monkeypatch.setattr(ingestion, "refresh_flat_index", fail)
+    run(PAGES)
+
+
+def test_a_changed_page_updates_the_compressed_flat_index(ingest, monkeypatch):
+    import ingestion
+    from flat_index import FLAT_MATRIX_FILENAME, FlatVectorStore, refresh_flat_index
+
+    monkeypatch.setattr(ingestion, "refresh_flat_index",
+                        lambda *args: refresh_flat_index(*args, quantization="int8"))
+    run, persist_directory = ingest
+    run(PAGES)
+    edited = dict(PAGES)
+    edited["https://ask.herts.ac.uk/laundry-on-campus"] = "Laundry is open from 7am to 11pm every day. " * 20
+
+    with monkeypatch.context() as patched:
+        full_rebuild_forbidden(patched)
+        collection = run(edited)
+
+    store = FlatVectorStore.load(persist_directory)
+    assert store.matrix is None
+    assert not os.path.exists(os.path.join(persist_directory, FLAT_MATRIX_FILENAME))
+    data = collection.get(include=["embeddings"])
+    assert sorted(store.ids) == sorted(data["ids"])
+    for chunk_id, embedding in zip(data["ids"], data["embeddings"]):
+        hits = store.search_vector(embedding, 1)
+        assert store.ids[hits[0][0]] == chunk_id
+        assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,53 @@
+# tests/test_retrieval_cache.py
+
+from langchain_core.documents import Document
+
+from collection_version import bump_collection_version
+from retrieval_cache import RetrievalCache
+
+DOCS = [Document(id="a#1", page_content="Replacement cards cost £10.", metadata={"source": "a"})]
+
+
+def open_cache(tmp_path, **kwargs) -> RetrievalCache:
+    (tmp_path / "db").mkdir(exist_ok=True)
+    return RetrievalCache(str(tmp_path / "retrieval.sqlite"), persist_directory=str(tmp_path / "db"), **kwargs)
+
+
+def last_used(cache) -> float:
+    return cache._conn.execute("SELECT last_used FROM retrieval_results").fetchone()[0]
+
+
+def test_disk_hits_do_not_write_until_flushed(tmp_path):
+    open_cache(tmp_path).store("fees?", DOCS)
+    cache = open_cache(tmp_path)
+    cache._conn.execute("UPDATE retrieval_results SET last_used = 0")
+    cache._conn.commit()
+
+    assert cache.lookup("Fees?")[0].page_content == DOCS[0].page_content
+    assert cache.stats()["disk_hits"] == 1
+
+    assert last_used(cache) == 0
+    cache.flush()
+    assert last_used(cache) > 0
+
+
+def test_eviction_sees_pending_hits(tmp_path):
+    cache = open_cache(tmp_path, max_entries=2, memory_entries=0)
+    cache.store("first", DOCS)
+    cache.store("second", DOCS)
+    cache.lookup("first")  # now the most recently used
+
+    cache.store("third", DOCS)  # evicts "second"
+
+    assert cache.lookup("first") is not None
+    assert cache.lookup("second") is None
+
+
+def test_namespaces_and_collection_version(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.store("fees?", DOCS, "k=6")
+
+    assert cache.lookup("fees?", "k=3") is None
+    assert cache.lookup("fees?", "k=6") is not None
+    bump_collection_version(str(tmp_path / "db"))
+    assert cache.lookup("fees?", "k=6") is None
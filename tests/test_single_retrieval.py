@@ -0,0 +1,60 @@
+# tests/test_single_retrieval.py
+
+import asyncio
+
+import pytest
+
+from answer_cache import SemanticAnswerCache
+from benchmarks.fakes import CountingEmbeddings, FakeLatencyChatModel, build_vectorstore
+from pipeline import RAGPipeline
+
+
+@pytest.fixture
+def pipeline_and_fakes():
+    embeddings = CountingEmbeddings()
+    store = build_vectorstore(embeddings)
+    pipeline = RAGPipeline(embedding_function=embeddings, vectorstore=store, llm=FakeLatencyChatModel(latency=0))
+    return pipeline, embeddings, store
+
+
+@pytest.mark.parametrize("question", ["replacement id card fees?", "council tax excemptions",
+                                      "on campus laundry facilities?"])
+def test_invoke_embeds_and_searches_once(pipeline_and_fakes, question):
+    pipeline, embeddings, store = pipeline_and_fakes
+
+    result = pipeline.invoke(question)
+
+    assert embeddings.query_calls == 1
+    assert store.search_calls == 1
+    assert len(result["context"]) == len(result["metadata"])
+    assert all("chunk_index" in metadata for metadata in result["metadata"])
+
+
+def run(pipeline, mode: str, question: str):
+    """Answers question through invoke, ainvoke, stream or astream."""
+    if mode == "invoke":
+        return pipeline.invoke(question)
+    if mode == "ainvoke":
+        return asyncio.run(pipeline.ainvoke(question))
+    if mode == "stream":
+        return list(pipeline.stream(question))
+
+    async def collect():
+        return [event async for event in pipeline.astream(question)]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("mode", ["invoke", "ainvoke", "stream", "astream"])
+def test_cache_lookup_and_retrieval_share_one_embedding(tmp_path, mode):
+    embeddings = CountingEmbeddings()
+    store = build_vectorstore(embeddings)
+    cache = SemanticAnswerCache(str(tmp_path / "answers.sqlite"), persist_directory=str(tmp_path))
+    pipeline = RAGPipeline(embedding_function=embeddings, vectorstore=store, llm=FakeLatencyChatModel(latency=0),
+                           answer_cache=cache, persist_directory=str(tmp_path))
+
+    run(pipeline, mode, "replacement id card fees?")
+
+    assert embeddings.query_calls == 1
+    assert store.search_calls == 1
+    assert cache.stats()["size"] == 1
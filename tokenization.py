@@ -0,0 +1,21 @@
+# tokenization.py
+
+import tiktoken
+
+
+def get_encoding(model_name: str):
+    """
+    Returns the local tiktoken encoding for model_name. Models tiktoken does
+    not know (e.g. sentence-transformers) get cl100k_base, which is close
+    enough for budgeting.
+    """
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def make_token_counter(model_name: str):
+    """Returns a function counting the tokens of a text for model_name."""
+    encoding = get_encoding(model_name)
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,235 @@
+# tracing.py
+
+import json
+import logging
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config import TRACING_ENABLED
+
+# Per-request trace records are logged as one JSON object per line on this logger.
+TRACE_LOGGER_NAME = "askherts.trace"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 1500, 2000, 4000, 8000)
+CHAR_BUCKETS = (500, 1000, 2500, 5000, 10000, 25000, 50000)
+
+logger = logging.getLogger(TRACE_LOGGER_NAME)
+
+
+class Histogram:
+    """A Prometheus-style histogram with optional labels."""
+
+    def __init__(self, name: str, documentation: str, buckets, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> dict:
+        """Returns {label values: {"buckets": cumulative counts, "sum", "count"}}."""
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        result = {}
+        for key, counts, total, count in items:
+            cumulative, running = [], 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            result[key] = {"buckets": cumulative, "sum": total, "count": count}
+        return result
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.snapshot().items()):
+            labels = [f'{name}="{value}"' for name, value in zip(self.label_names, key)]
+            for bound, count in zip([*map(str, self.buckets), "+Inf"], series["buckets"]):
+                bucket_labels = ",".join([*labels, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {series['sum']}")
+            lines.append(f"{self.name}_count{suffix} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process's histograms and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, buckets=LATENCY_BUCKETS, label_names=()) -> Histogram:
+        """Returns the histogram called name, creating it on first use."""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, documentation, buckets, label_names)
+            return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_seconds", "Time spent in each pipeline stage.", label_names=("stage",))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "rag_request_seconds", "End-to-end time of a pipeline call.", label_names=("operation", "outcome"))
+PROMPT_TOKENS = REGISTRY.histogram(
+    "rag_prompt_tokens", "Prompt tokens sent to the LLM per request.", TOKEN_BUCKETS)
+COMPLETION_TOKENS = REGISTRY.histogram(
+    "rag_completion_tokens", "Completion tokens generated by the LLM per request.", TOKEN_BUCKETS)
+RETRIEVED_CHARS = REGISTRY.histogram(
+    "rag_retrieved_chars", "Characters of retrieved chunk text per request.", CHAR_BUCKETS)
+
+
+class Trace:
+    """
+    Timing and size record of one pipeline call. Stages are timed by the
+    pipeline's tracing hooks; a stage hit more than once in a call is summed.
+    """
+
+    def __init__(self, question: str, operation: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.question = question
+        self.operation = operation
+        self.stages = {}
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.retrieved_chars = None
+        # Chunks retrieved, passages they were merged into and tokens that saved
+        self.context_chunks = None
+        self.context_passages = None
+        self.context_tokens_saved = None
+        self.first_token_seconds = None
+        self.cache_hit = False
+        self.started = time.perf_counter()
+        # Set when the trace is finished
+        self.total_seconds = None
+        self.outcome = None
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.id,
+            "operation": self.operation,
+            "question": self.question,
+            "cache_hit": self.cache_hit,
+            "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()},
+            "first_token_ms": None if self.first_token_seconds is None else round(self.first_token_seconds * 1000, 2),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "retrieved_chars": self.retrieved_chars,
+            "context_chunks": self.context_chunks,
+            "context_passages": self.context_passages,
+            "context_tokens_saved": self.context_tokens_saved,
+        }
+
+
+_current_trace = ContextVar("current_trace", default=None)
+# Lists that finished traces are appended to, see collect_traces
+_trace_sinks = ContextVar("trace_sinks", default=())
+
+
+def current_trace():
+    """Returns the Trace of the pipeline call in progress, or None outside one."""
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(question: str, operation: str):
+    """
+    Opens a Trace for one pipeline call and makes it the current trace.
+    When the block exits the trace is added to the metrics registry and
+    logged as JSON. Yields None when TRACING_ENABLED is off.
+    """
+    if not TRACING_ENABLED:
+        yield None
+        return
+
+    trace = Trace(question, operation)
+    token = _current_trace.set(trace)
+    outcome = "error"
+    try:
+        yield trace
+        outcome = "cache_hit" if trace.cache_hit else "ok"
+    finally:
+        total = trace.elapsed()
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # A generator finished in a different context than it started in
+            _current_trace.set(None)
+        record_trace(trace, total, outcome)
+
+
+@contextmanager
+def collect_traces():
+    """
+    Yields a list that receives every trace finished inside the block,
+    including those of tasks started from it, e.g. to report on one batch.
+    """
+    collected = []
+    token = _trace_sinks.set(_trace_sinks.get() + (collected,))
+    try:
+        yield collected
+    finally:
+        _trace_sinks.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """Times the enclosed block as a stage of the current trace, if there is one."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_stage(name, time.perf_counter() - start)
+
+
+def record_trace(trace: Trace, total: float, outcome: str):
+    """Adds a finished trace to the histograms and writes its structured log line."""
+    trace.total_seconds = total
+    trace.outcome = outcome
+    REQUEST_SECONDS.observe(total, operation=trace.operation, outcome=outcome)
+    for name, seconds in trace.stages.items():
+        STAGE_SECONDS.observe(seconds, stage=name)
+    if trace.prompt_tokens is not None:
+        PROMPT_TOKENS.observe(trace.prompt_tokens)
+    if trace.completion_tokens is not None:
+        COMPLETION_TOKENS.observe(trace.completion_tokens)
+    if trace.retrieved_chars is not None:
+        RETRIEVED_CHARS.observe(trace.retrieved_chars)
+    for sink in _trace_sinks.get():
+        sink.append(trace)
+    logger.info(json.dumps({**trace.as_dict(), "outcome": outcome, "total_ms": round(total * 1000, 2)},
+                           ensure_ascii=False))
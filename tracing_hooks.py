@@ -0,0 +1,172 @@
+# tracing_hooks.py
+
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import get_buffer_string
+
+from config import LLM_MODEL_NAME
+from tracing import current_trace, stage
+
+# Chain steps timed as stages, by LangChain run type or runnable name
+RUN_TYPE_STAGES = {"prompt": "prompt", "parser": "parse"}
+NAMED_STAGES = {"rerank": "rerank", "build_context": "build_context"}
+
+
+class TracedEmbeddings(Embeddings):
+    """Times query embeddings as the "embed_query" stage of the current trace."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts):
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text):
+        with stage("embed_query"):
+            return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text):
+        with stage("embed_query"):
+            return await self.embeddings.aembed_query(text)
+
+    def __getattr__(self, name):
+        # Expose the wrapped model's extras, e.g. CachedQueryEmbeddings.stats()
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+
+def _usage_from_result(response):
+    """Returns (prompt_tokens, completion_tokens) reported by the LLM, or None."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage["input_tokens"], usage["output_tokens"]
+    token_usage = (response.llm_output or {}).get("token_usage")
+    if token_usage:
+        return token_usage.get("prompt_tokens"), token_usage.get("completion_tokens")
+    return None
+
+
+class PipelineTracer(BaseCallbackHandler):
+    """
+    LangChain callback handler that records the retrieval, prompt, LLM and
+    parser steps of the pipeline into the current trace (see tracing.py),
+    along with token counts and the amount of retrieved text.
+
+    The search stage excludes time spent embedding the query, which
+    TracedEmbeddings records separately. Token counts come from the LLM's
+    usage report and are estimated with tiktoken when it has none.
+    """
+
+    # Run in the caller's context, where the current trace is set
+    run_inline = True
+
+    def __init__(self, model_name: str = LLM_MODEL_NAME):
+        """
+        Args:
+            model_name: The pipeline's LLM, whose tokenizer estimates missing token counts.
+        """
+        self.model_name = model_name
+        # run_id -> [stage, start time, trace, extra]
+        self._runs = {}
+        # Retrievers running inside a timed retriever
+        self._nested = set()
+
+    def _start(self, run_id, name, extra=None):
+        trace = current_trace()
+        if trace is not None:
+            self._runs[run_id] = [name, time.perf_counter(), trace, extra]
+
+    def _finish(self, run_id):
+        entry = self._runs.pop(run_id, None)
+        if entry is None:
+            return None
+        name, start, trace, extra = entry
+        return name, time.perf_counter() - start, trace, extra
+
+    def _discard(self, run_id, **kwargs):
+        self._runs.pop(run_id, None)
+        self._nested.discard(run_id)
+
+    # --- retrieval ---
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id in self._runs or parent_run_id in self._nested:
+            # A retriever nested in the cached or hybrid retriever; the outermost one is timed
+            self._nested.add(run_id)
+            return
+        trace = current_trace()
+        embedded = trace.stages.get("embed_query", 0.0) if trace is not None else 0.0
+        self._start(run_id, "search", embedded)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        if run_id in self._nested:
+            self._nested.discard(run_id)
+            return
+        finished = self._finish(run_id)
+        if finished is None:
+            return
+        name, elapsed, trace, embedded_before = finished
+        embedding_time = trace.stages.get("embed_query", 0.0) - embedded_before
+        trace.add_stage(name, max(0.0, elapsed - embedding_time))
+        trace.retrieved_chars = (trace.retrieved_chars or 0) + sum(len(doc.page_content) for doc in documents)
+
+    on_retriever_error = _discard
+
+    # --- chain steps ---
+
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        name = RUN_TYPE_STAGES.get(kwargs.get("run_type")) or NAMED_STAGES.get(kwargs.get("name"))
+        if name is not None:
+            self._start(run_id, name)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        finished = self._finish(run_id)
+        if finished is None:
+            return
+        name, elapsed, trace, _ = finished
+        if name == "parse" and trace.first_token_seconds is not None:
+            # A streaming parser lives as long as the LLM stream; that time is already under "llm"
+            return
+        trace.add_stage(name, elapsed)
+
+    on_chain_error = _discard
+
+    # --- LLM ---
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm", "\n".join(get_buffer_string(m) for m in messages))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm", "\n".join(prompts))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        entry = self._runs.get(run_id)
+        if entry is not None and entry[2].first_token_seconds is None:
+            entry[2].first_token_seconds = entry[2].elapsed()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        finished = self._finish(run_id)
+        if finished is None:
+            return
+        name, elapsed, trace, prompt_text = finished
+        trace.add_stage(name, elapsed)
+
+        usage = _usage_from_result(response)
+        if usage is None:
+            from context_builder import count_tokens
+
+            completion = "".join(g.text for generations in response.generations for g in generations)
+            usage = count_tokens(prompt_text, self.model_name), count_tokens(completion, self.model_name)
+        prompt_tokens, completion_tokens = usage
+        trace.prompt_tokens = (trace.prompt_tokens or 0) + (prompt_tokens or 0)
+        trace.completion_tokens = (trace.completion_tokens or 0) + (completion_tokens or 0)
+
+    on_llm_error = _discard